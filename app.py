@@ -7,9 +7,17 @@ from dotenv import load_dotenv
 from mysql.connector import InterfaceError, DatabaseError
 
 # Core helpers
-from python.conexion import get_conn                 # conexión central MariaDB
-from python.authz import user_roles, has_role        # roles y helper para plantillas
+from python.conexion import get_conn, init_app as init_db  # conexión central MariaDB
+from python.authz import identidad, has_role         # usuario+roles cacheados y helper para plantillas
 from python.seed_admin import bootstrap_admin        # siembra admin al arrancar
+from python import esquema                            # catálogo del esquema en memoria
+from python import catalogo                           # servicios/repuestos en memoria
+from python import saldos                             # totales por orden (orden_saldo)
+from python import busqueda                           # búsqueda de texto en órdenes (orden_busqueda)
+from python import perfil_sql                         # instrumentación de SQL (opcional)
+from python import metricas                           # /metrics (Prometheus)
+from python import hashing                            # hash de contraseñas (pool de procesos opcional)
+from python import idempotencia                       # claves de idempotencia en formularios POST
 
 load_dotenv()
 
@@ -29,8 +37,18 @@ def create_app():
     app.jinja_env.globals.update(
         config=app.config,
         has_role=has_role,  # uso en plantillas: {% if has_role('administrador') %} ... {% endif %}
+        clave_idempotencia=idempotencia.clave_idempotencia,  # <input type="hidden" name="_idem" ...>
     )
 
+    # ===== Conexión por request (una sola por página, commit/rollback al final) =====
+    init_db(app)
+
+    # ===== Perfil de SQL por request (SQL_PERFIL=1: cabecera X-SQL, aviso N+1, /debug/sql) =====
+    perfil_sql.init_app(app)
+
+    # ===== Métricas Prometheus en /metrics (METRICAS=1 + METRICAS_TOKEN) =====
+    metricas.init_app(app)
+
     # ===== Flask-Login =====
     login_manager = LoginManager()
     login_manager.login_view = "auth.login_form"
@@ -41,20 +59,18 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id: str):
-        """Carga el usuario desde la BD para Flask-Login."""
+        """Carga usuario + roles (una consulta, cacheada) para Flask-Login."""
         try:
-            cn = get_conn(); cur = cn.cursor()
-            cur.execute(
-                """SELECT id_usuario, usuario_login, hash_password
-                   FROM usuario
-                   WHERE id_usuario=%s AND activo=1""",
-                (user_id,),
-            )
-            row = cur.fetchone()
-            cur.close(); cn.close()
-        except (InterfaceError, DatabaseError):
+            ident = identidad(int(user_id))
+        except (InterfaceError, DatabaseError, ValueError):
+            return None
+        if not ident:
             return None
-        return Usuario(row[0], row[1], row[2]) if row else None
+        g.user_roles = set(ident["roles"])
+        return Usuario(ident["id_usuario"], ident["usuario_login"], ident["hash_password"])
+
+    # ===== Pool de hash de contraseñas (HASH_PROCESOS > 0), antes de que haya otros hilos =====
+    hashing.precalentar()
 
     # ===== Seed del admin por defecto (idempotente) =====
     # Crea/asegura un usuario admin si no existe. No rompe el arranque si la DB aún no responde.
@@ -67,10 +83,37 @@ def create_app():
     except Exception:
         pass
 
+    # ===== Tabla resumen de totales por orden (antes de leer el esquema) =====
+    try:
+        saldos.asegurar_tabla()
+    except Exception:
+        pass
+
+    # ===== Índice de búsqueda de órdenes (se llena solo la primera vez) =====
+    try:
+        busqueda.asegurar_tabla()
+    except Exception:
+        pass
+
+    # ===== Catálogo del esquema en memoria (columnas/PK/FK de todas las tablas) =====
+    # Si la DB no responde aún, se cargará en la primera consulta.
+    try:
+        esquema.cargar()
+    except Exception:
+        pass
+
+    # ===== Catálogos de servicios y repuestos en memoria (facturación) =====
+    try:
+        catalogo.cargar()
+    except Exception:
+        pass
+
     # ===== Inyectar roles al contexto de cada request (para menús/permisos) =====
+    # load_user ya los deja en g (misma identidad cacheada); aquí solo el caso anónimo.
     @app.before_request
     def inject_roles():
-        g.user_roles = user_roles(int(current_user.id)) if current_user.is_authenticated else set()
+        if not current_user.is_authenticated:
+            g.user_roles = set()
 
     # ===== Blueprints =====
     # Auth / Registro
@@ -115,6 +158,14 @@ def create_app():
     app.register_blueprint(cat_servicio_bp, url_prefix="/cat-servicio")
     app.register_blueprint(repuesto_bp, url_prefix="/repuesto")
 
+    # Búsqueda paginada de opciones FK (formularios genéricos con tablas grandes)
+    from python.fk_opciones import bp as fk_bp
+    app.register_blueprint(fk_bp)
+
+    # Diagnóstico: consultas lentas (SLOW_QUERY_MS) con su EXPLAIN
+    from python.consultas_lentas import bp as lentas_bp
+    app.register_blueprint(lentas_bp)
+
     # ===== Rutas base =====
     @app.get("/")
     @login_required
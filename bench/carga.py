@@ -0,0 +1,189 @@
+# bench/carga.py
+"""
+Prueba de carga del flujo orden -> factura a través de la app Flask (test_client).
+
+    python -m bench.carga                       # todos los escenarios, 200 requests c/u
+    python -m bench.carga -n 1000 --hilos 4     # 4 hilos concurrentes
+    python -m bench.carga -e orden.imprimir -e admin.usuarios
+
+Requiere una base sembrada (python -m bench.sembrar). Por escenario reporta
+requests/s, p50/p95/p99 y sentencias SQL por request, y guarda todo en
+bench/resultados/carga-<fecha>-<commit>.json (comparar con bench.comparar).
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+from bench.comun import activar_conteo_sql, sentencias, resumen, guardar, tabla
+
+def _ids(cur, sql: str, params: tuple = ()) -> list:
+    cur.execute(sql, params)
+    return [r[0] for r in cur.fetchall()]
+
+def _contexto(muestras: int, rnd: random.Random) -> dict:
+    """IDs reales para armar los requests (muestreados una vez, fuera de la medición)."""
+    from python.conexion import get_conn
+    cn = get_conn(); cur = cn.cursor()
+    try:
+        login = os.getenv("ADMIN_BOOT_USER", "admin")
+        cur.execute("SELECT id_usuario FROM usuario WHERE usuario_login=%s", (login,))
+        fila = cur.fetchone()
+        if not fila:
+            raise SystemExit(f"No existe el usuario {login!r} (arranca la app una vez para sembrarlo).")
+        cur.execute("SELECT MIN(id_equipo), MAX(id_equipo) FROM equipo")
+        e_min, e_max = cur.fetchone()
+        cur.execute("SELECT MIN(id_orden), MAX(id_orden) FROM orden_trabajo")
+        o_min, o_max = cur.fetchone()
+        if not e_min or not o_min:
+            raise SystemExit("Base vacía: corre primero python -m bench.sembrar")
+        equipos = []
+        for _ in range(muestras):
+            cur.execute("SELECT id_equipo, id_cliente FROM equipo WHERE id_equipo >= %s ORDER BY id_equipo LIMIT 1",
+                        (rnd.randint(e_min, e_max),))
+            equipos += cur.fetchall()
+        abiertas = _ids(cur, "SELECT id_orden FROM orden_trabajo WHERE estado='ABIERTA' "
+                             "ORDER BY id_orden DESC LIMIT %s", (muestras * 10,))
+        return {"id_usuario": fila[0], "equipos": equipos, "o_min": o_min, "o_max": o_max,
+                "abiertas": abiertas, "abiertas_lock": threading.Lock()}
+    finally:
+        cur.close(); cn.close()
+
+# ---------- escenarios: (cliente, rnd, ctx) -> respuesta ----------
+def _crear(c, rnd, ctx):
+    id_equipo, id_cliente = rnd.choice(ctx["equipos"])
+    return c.post("/orden/crear", data={
+        "id_cliente": id_cliente, "id_equipo": id_equipo,
+        "descripcion": "Bench: no enciende", "abono_monto": rnd.choice(("", "10", "25.50")),
+    })
+
+def _imprimir(c, rnd, ctx):
+    return c.get(f"/orden/imprimir/{rnd.randint(ctx['o_min'], ctx['o_max'])}")
+
+def _emitir_form(c, rnd, ctx):
+    return c.get(f"/facturacion/emitir/{rnd.randint(ctx['o_min'], ctx['o_max'])}")
+
+def _emitir_post(c, rnd, ctx):
+    with ctx["abiertas_lock"]:                 # cada orden abierta se factura una sola vez
+        id_orden = ctx["abiertas"].pop() if ctx["abiertas"] else None
+    if id_orden is None:
+        return None
+    return c.post(f"/facturacion/emitir/{id_orden}")
+
+def _listado(c, rnd, ctx):
+    qs = {"estado": rnd.choice(("", "ABIERTA", "FACTURADA"))}
+    if rnd.random() < 0.3:
+        qs["desde"] = f"{rnd.randint(2023, 2025)}-{rnd.randint(1, 12):02d}-01"
+    if rnd.random() < 0.2:
+        qs["id_cliente"] = rnd.choice(ctx["equipos"])[1]
+    r = c.get("/orden/", query_string=qs)
+    if r.status_code == 200 and rnd.random() < 0.5:           # y la página siguiente
+        m = re.search(rb'antes=([^&"]+)', r.data)
+        if m:
+            r = c.get("/orden/", query_string={**qs, "antes": unquote(m.group(1).decode())})
+    return r
+
+def _buscar(c, rnd, ctx):
+    from bench.sembrar import APELLIDOS, FALLAS, MODELOS, NOMBRES
+    q = rnd.choice((
+        lambda: rnd.choice(FALLAS),                                        # término muy frecuente
+        lambda: f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}",
+        lambda: f"{rnd.choice(MODELOS).split()[0]} {rnd.choice(FALLAS).split()[0]}",
+        lambda: rnd.choice(APELLIDOS)[:4],                                 # prefijo
+    ))()
+    qs = {"q": q}
+    if rnd.random() < 0.3:
+        qs["estado"] = rnd.choice(("ABIERTA", "FACTURADA"))
+    r = c.get("/orden/", query_string=qs)
+    if r.status_code == 200 and rnd.random() < 0.3:           # y la página siguiente
+        r = c.get("/orden/", query_string={**qs, "pag": 2})
+    return r
+
+def _usuarios(c, rnd, ctx):
+    return c.get("/admin/usuarios", query_string={"q": rnd.choice(("", "a", "adm", "bench"))})
+
+ESCENARIOS = {
+    "orden.crear":              _crear,
+    "orden.imprimir":           _imprimir,
+    "facturacion.emitir_form":  _emitir_form,
+    "facturacion.emitir_post":  _emitir_post,
+    "orden.listado":            _listado,
+    "orden.buscar":             _buscar,
+    "admin.usuarios":           _usuarios,
+}
+
+def _cliente(app, id_usuario: int):
+    c = app.test_client()
+    with c.session_transaction() as s:       # sesión de Flask-Login sin pasar por reCAPTCHA
+        s["_user_id"] = str(id_usuario)
+        s["_fresh"] = True
+    return c
+
+def correr(app, nombre: str, fn, ctx: dict, n: int, hilos: int, calentamiento: int, semilla: int) -> dict:
+    tiempos, sql, errores = [], [], [0]
+    lock = threading.Lock()
+
+    def trabajador(k: int, cuantos: int):
+        rnd = random.Random(semilla * 1000 + k)
+        c = _cliente(app, ctx["id_usuario"])
+        for _ in range(calentamiento):
+            fn(c, rnd, ctx)
+        locales_t, locales_q, err = [], [], 0
+        for _ in range(cuantos):
+            q0 = sentencias(); t0 = time.perf_counter()
+            r = fn(c, rnd, ctx)
+            dt = (time.perf_counter() - t0) * 1000.0
+            if r is None:
+                break
+            locales_t.append(dt); locales_q.append(sentencias() - q0)
+            if r.status_code >= 400:
+                err += 1
+        with lock:
+            tiempos.extend(locales_t); sql.extend(locales_q); errores[0] += err
+
+    por_hilo = [n // hilos + (1 if i < n % hilos else 0) for i in range(hilos)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ex:
+        list(ex.map(trabajador, range(hilos), por_hilo))
+    return resumen(tiempos, time.perf_counter() - t0, sql, errores[0])
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=200, help="requests medidos por escenario")
+    ap.add_argument("--hilos", type=int, default=1)
+    ap.add_argument("--calentamiento", type=int, default=10, help="requests previos por hilo (no se miden)")
+    ap.add_argument("-e", "--escenario", action="append", choices=list(ESCENARIOS),
+                    help="repetible; por defecto todos")
+    ap.add_argument("--semilla", type=int, default=42)
+    ap.add_argument("--salida", help="ruta del JSON (por defecto bench/resultados/)")
+    a = ap.parse_args()
+
+    os.environ.setdefault("SQL_PERFIL", "0")
+    activar_conteo_sql()
+    from app import app
+    app.config["TESTING"] = True
+
+    rnd = random.Random(a.semilla)
+    ctx = _contexto(max(50, a.n // 4), rnd)
+    nombres = a.escenario or list(ESCENARIOS)
+    filas = {}
+    for nombre in nombres:
+        print(f"· {nombre} ...", flush=True)
+        filas[nombre] = correr(app, nombre, ESCENARIOS[nombre], ctx, a.n, a.hilos, a.calentamiento, a.semilla)
+
+    print()
+    print(tabla(filas, ["n", "errores", "rps", "p50_ms", "p95_ms", "p99_ms", "sql_por_request"]))
+    from python.conexion import pool_stats
+    ruta = guardar("carga", {
+        "parametros": {"n": a.n, "hilos": a.hilos, "calentamiento": a.calentamiento, "semilla": a.semilla},
+        "pool": pool_stats(), "escenarios": filas,
+    }, a.salida)
+    print(f"\nResultados: {ruta}")
+
+if __name__ == "__main__":
+    main()
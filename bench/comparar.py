@@ -0,0 +1,33 @@
+# bench/comparar.py
+"""
+Compara dos resultados JSON de bench/ (carga o micro).
+
+    python -m bench.comparar bench/resultados/carga-A.json bench/resultados/carga-B.json
+"""
+from __future__ import annotations
+import argparse
+import json
+
+def _metricas(datos: dict) -> dict:
+    return datos.get("escenarios") or datos.get("casos") or {}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("antes"); ap.add_argument("despues")
+    a = ap.parse_args()
+    with open(a.antes, encoding="utf-8") as f: A = json.load(f)
+    with open(a.despues, encoding="utf-8") as f: B = json.load(f)
+    print(f"antes:   {A.get('commit')} ({A.get('fecha')})")
+    print(f"después: {B.get('commit')} ({B.get('fecha')})\n")
+    ma, mb = _metricas(A), _metricas(B)
+    for nombre in [n for n in ma if n in mb]:
+        print(nombre)
+        for k, va in ma[nombre].items():
+            vb = mb[nombre].get(k)
+            if not isinstance(va, (int, float)) or not isinstance(vb, (int, float)):
+                continue
+            cambio = f"{(vb - va) / va * 100:+.1f}%" if va else "   -"
+            print(f"  {k:<18} {va:>12} -> {vb:<12} {cambio}")
+
+if __name__ == "__main__":
+    main()
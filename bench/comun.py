@@ -0,0 +1,83 @@
+# bench/comun.py
+"""Utilidades compartidas por los scripts de bench/ (no son tests)."""
+from __future__ import annotations
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS = os.path.join(RAIZ, "bench", "resultados")
+
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# ---------- conteo de sentencias por hilo ----------
+_hilo = threading.local()
+
+def _contar(_ev) -> None:
+    _hilo.n = getattr(_hilo, "n", 0) + 1
+
+def activar_conteo_sql() -> None:
+    from python.conexion import agregar_observador
+    agregar_observador(_contar)
+
+def sentencias() -> int:
+    """Sentencias ejecutadas por el hilo actual desde que arrancó."""
+    return getattr(_hilo, "n", 0)
+
+# ---------- estadística ----------
+def percentil(valores: list, p: float) -> float:
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    k = max(0, min(len(valores) - 1, math.ceil(p / 100.0 * len(valores)) - 1))
+    return valores[k]
+
+def resumen(tiempos_ms: list, segundos: float, sql: list, errores: int) -> dict:
+    t = sorted(tiempos_ms)
+    return {
+        "n": len(t),
+        "errores": errores,
+        "rps": round(len(t) / segundos, 2) if segundos > 0 else 0.0,
+        "p50_ms": round(percentil(t, 50), 3),
+        "p95_ms": round(percentil(t, 95), 3),
+        "p99_ms": round(percentil(t, 99), 3),
+        "max_ms": round(t[-1], 3) if t else 0.0,
+        "sql_por_request": round(sum(sql) / len(sql), 2) if sql else 0.0,
+    }
+
+# ---------- resultados ----------
+def commit_actual() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "desconocido"
+
+def guardar(tipo: str, datos: dict, destino: str | None = None) -> str:
+    """Escribe bench/resultados/<tipo>-<fecha>-<commit>.json y devuelve la ruta."""
+    commit = commit_actual()
+    datos = {
+        "tipo": tipo, "commit": commit, "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "plataforma": platform.platform(), **datos,
+    }
+    if destino is None:
+        os.makedirs(RESULTADOS, exist_ok=True)
+        destino = os.path.join(RESULTADOS, f"{tipo}-{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    return destino
+
+def tabla(filas: dict, columnas: list, titulo: str = "escenario") -> str:
+    """Tabla de texto simple {nombre: {col: valor}}."""
+    ancho = max([len(n) for n in filas] + [10])
+    out = [f"{titulo:<{ancho}} " + " ".join(f"{c:>14}" for c in columnas)]
+    for nombre, r in filas.items():
+        out.append(f"{nombre:<{ancho}} " + " ".join(f"{r.get(c, ''):>14}" for c in columnas))
+    return "\n".join(out)
@@ -0,0 +1,125 @@
+# bench/login.py
+"""
+Throughput del login por núcleo según el costo del hash y dónde corre
+(hilo del request vs. pool de procesos de python/hashing.py).
+
+    python -m bench.login                                  # métodos por defecto, 0 y nproc procesos
+    python -m bench.login -m scrypt:16384:8:1 -p 0 -p 2 --hilos 8 -n 64
+    python -m bench.login --app                            # además, POST /login completo
+
+Por escenario: verificaciones/s, verificaciones/s por núcleo, p50/p95 (ms) y
+el peor retraso de un hilo "vecino" que hace trabajo Python cada 1 ms
+(cuánto le quita el hash a los demás requests del proceso).
+
+--app arranca la app contra DB_BACKEND (usar sqlite) y un siteverify local
+(bench.recaptcha_stub), con HASH_METODO/HASH_PROCESOS del entorno.
+"""
+from __future__ import annotations
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.comun import guardar, percentil, tabla
+
+METODOS = ("scrypt:32768:8:1", "scrypt:16384:8:1", "pbkdf2:sha256:600000", "pbkdf2:sha256:100000")
+CLAVE = "clave-de-prueba-123"
+
+class _Vecino:
+    """Hilo que debería despertar cada 1 ms; mide el peor retraso (GIL/CPU ocupado)."""
+    def __init__(self):
+        self.peor_ms = 0.0
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, daemon=True)
+
+    def _correr(self):
+        while not self._fin.is_set():
+            t0 = time.perf_counter()
+            time.sleep(0.001)
+            sum(range(200))
+            self.peor_ms = max(self.peor_ms, (time.perf_counter() - t0) * 1000 - 1)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+
+def _medir(fn, n: int, hilos: int) -> dict:
+    tiempos = []
+    def uno(_):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    with _Vecino() as vecino, ThreadPoolExecutor(hilos) as ex:
+        t0 = time.perf_counter()
+        list(ex.map(uno, range(n)))
+        seg = time.perf_counter() - t0
+    t = sorted(tiempos)
+    nucleos = os.cpu_count() or 1
+    return {"n": n, "ops_s": round(n / seg, 2), "ops_s_nucleo": round(n / seg / nucleos, 2),
+            "p50_ms": round(percentil(t, 50), 2), "p95_ms": round(percentil(t, 95), 2),
+            "vecino_max_ms": round(vecino.peor_ms, 2)}
+
+def escenario_hash(metodo: str, procesos: int, n: int, hilos: int) -> dict:
+    from python.hashing import _Hasher
+    hs = _Hasher(metodo, procesos, cola=max(hilos, 1), espera=60)
+    try:
+        h = hs.generar(CLAVE)
+        hs.precalentar()
+        hs.verificar(h, CLAVE)
+        return _medir(lambda: hs.verificar(h, CLAVE), n, hilos)
+    finally:
+        hs.cerrar()
+
+def escenario_app(n: int, hilos: int) -> dict:
+    """POST /login completo (reCAPTCHA local + SELECT + verificación + INSERT sesion)."""
+    from bench.recaptcha_stub import en_hilo
+    srv = en_hilo()
+    os.environ.setdefault("RECAPTCHA_SECRET", "bench")
+    os.environ["RECAPTCHA_URL"] = f"http://127.0.0.1:{srv.server_port}/siteverify"
+    os.environ["ADMIN_BOOT_PASSWORD"] = CLAVE
+    from app import app as aplicacion          # después del entorno: recaptcha lee la URL al importar
+    login = os.getenv("ADMIN_BOOT_USER", "admin")
+    errores = []
+    def uno():
+        with aplicacion.test_client() as c:
+            r = c.post("/login", data={"usuario": login, "password": CLAVE,
+                                       "g-recaptcha-response": "ok"})
+            if r.status_code != 302 or not r.location.endswith("/"):
+                errores.append(r.status_code)
+    uno()
+    res = _medir(uno, n, hilos)
+    res["errores"] = len(errores)
+    srv.shutdown()
+    return res
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-m", "--metodo", action="append", help="método de werkzeug (repetible)")
+    ap.add_argument("-p", "--procesos", action="append", type=int, help="HASH_PROCESOS (repetible)")
+    ap.add_argument("-n", type=int, default=32, help="verificaciones por escenario")
+    ap.add_argument("--hilos", type=int, default=4, help="logins concurrentes")
+    ap.add_argument("--app", action="store_true", help="medir también POST /login de la app")
+    ap.add_argument("--salida", help="ruta del JSON (por defecto bench/resultados/)")
+    a = ap.parse_args()
+
+    metodos = a.metodo or list(METODOS)
+    procesos = a.procesos or sorted({0, os.cpu_count() or 1})
+    escenarios = {}
+    for m in metodos:
+        for p in procesos:
+            escenarios[f"{m} p={p}"] = escenario_hash(m, p, a.n, a.hilos)
+    if a.app:
+        escenarios[f"POST /login ({os.getenv('HASH_METODO', 'scrypt')} p={os.getenv('HASH_PROCESOS', '0')})"] = \
+            escenario_app(a.n, a.hilos)
+    print(tabla(escenarios, ["ops_s", "ops_s_nucleo", "p50_ms", "p95_ms", "vecino_max_ms"]))
+    ruta = guardar("login", {"parametros": {"n": a.n, "hilos": a.hilos, "nucleos": os.cpu_count()},
+                             "escenarios": escenarios}, a.salida)
+    print(f"\nResultados: {ruta}")
+
+if __name__ == "__main__":
+    main()
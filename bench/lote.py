@@ -0,0 +1,72 @@
+# bench/lote.py
+"""
+Emisión de facturas por lote (python/facturacion.emitir_lote) según el
+tamaño del bloque: 1 orden por transacción (lo que cuesta emitir una por una)
+contra bloques con totales y escrituras multi-fila.
+
+    python -m bench.lote                      # 300 órdenes por escenario, bloques 1, 25, 100
+    python -m bench.lote -n 1000 -b 1 -b 250
+
+MODIFICA LA BASE: factura órdenes ABIERTA con importe (cada escenario toma
+otras). Usar una base sembrada de prueba (python -m bench.sembrar).
+Por escenario: órdenes/s, ms por orden y sentencias SQL por orden.
+"""
+from __future__ import annotations
+import argparse
+import os
+import time
+
+from bench.comun import activar_conteo_sql, guardar, sentencias, tabla
+
+def _pendientes(n: int, saltar: set) -> list:
+    from python.conexion import get_conn
+    cn = get_conn(); cur = cn.cursor()
+    try:
+        cur.execute("""
+            SELECT o.id_orden FROM orden_trabajo o
+            JOIN orden_saldo s ON s.id_orden = o.id_orden
+            WHERE o.estado = 'ABIERTA' AND s.subtotal > 0
+            ORDER BY o.id_orden DESC LIMIT %s
+        """, (n + len(saltar),))
+        return [r[0] for r in cur.fetchall() if r[0] not in saltar][:n]
+    finally:
+        cur.close(); cn.close()
+
+def escenario(ids: list, bloque: int, id_usuario: int) -> dict:
+    from python.facturacion import emitir_lote
+    s0, t0 = sentencias(), time.perf_counter()
+    res = emitir_lote(ids, id_usuario, bloque)
+    seg = time.perf_counter() - t0
+    n = max(1, len(ids))
+    return {"n": len(ids), "emitidas": len(res["emitidas"]), "fallidas": len(res["fallidas"]),
+            "ordenes_s": round(len(ids) / seg, 1), "ms_orden": round(seg * 1000 / n, 3),
+            "sql_orden": round((sentencias() - s0) / n, 2)}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=300, help="órdenes por escenario")
+    ap.add_argument("-b", "--bloque", action="append", type=int, help="órdenes por transacción (repetible)")
+    ap.add_argument("--salida", help="ruta del JSON (por defecto bench/resultados/)")
+    a = ap.parse_args()
+
+    from python.conexion import query_one
+    activar_conteo_sql()
+    fila = query_one("SELECT id_usuario FROM usuario WHERE usuario_login=%s",
+                     (os.getenv("ADMIN_BOOT_USER", "admin"),))
+    if not fila:
+        raise SystemExit("No existe el usuario admin (arranca la app una vez para sembrarlo).")
+
+    usadas: set = set()
+    escenarios = {}
+    for b in a.bloque or [1, 25, 100]:
+        ids = _pendientes(a.n, usadas)
+        if len(ids) < a.n:
+            raise SystemExit(f"Quedan {len(ids)} órdenes ABIERTA con importe; siembra una base más grande.")
+        usadas.update(ids)
+        escenarios[f"bloque={b}"] = escenario(ids, b, fila["id_usuario"])
+    print(tabla(escenarios, ["emitidas", "fallidas", "ordenes_s", "ms_orden", "sql_orden"]))
+    ruta = guardar("lote", {"parametros": {"n": a.n}, "escenarios": escenarios}, a.salida)
+    print(f"\nResultados: {ruta}")
+
+if __name__ == "__main__":
+    main()
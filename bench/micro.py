@@ -0,0 +1,112 @@
+# bench/micro.py
+"""
+Microbenchmarks del armado de formularios genéricos (sin base de datos):
+specs de columnas y conversión fila -> form / form -> valores SQL en equipo,
+cliente, cat_servicio, detalle_servicio y orden_trabajo.
+
+    python -m bench.micro                 # tabla en consola + JSON en bench/resultados/
+    python -m bench.micro --repeticiones 7 --numero 2000
+
+El esquema se simula en memoria (10 columnas de todos los tipos por tabla).
+Tiempos en microsegundos por operación sobre TODAS las columnas de la tabla
+(mejor de N repeticiones).
+"""
+from __future__ import annotations
+import argparse
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from werkzeug.datastructures import MultiDict
+
+from bench.comun import guardar, tabla
+
+def _col(nombre, dt, ctype, nulo="YES", extra="", largo=None):
+    return {"COLUMN_NAME": nombre, "DATA_TYPE": dt, "COLUMN_TYPE": ctype,
+            "IS_NULLABLE": nulo, "EXTRA": extra, "CHARACTER_MAXIMUM_LENGTH": largo}
+
+def _columnas(pk: str) -> list:
+    return [
+        _col(pk, "int", "int(11)", "NO", "auto_increment"),
+        _col("id_cliente", "int", "int(11)", "NO"),
+        _col("nombre", "varchar", "varchar(120)", "NO", largo=120),
+        _col("observaciones", "text", "text"),
+        _col("precio", "decimal", "decimal(10,2)"),
+        _col("activo", "tinyint", "tinyint(1)", "NO"),
+        _col("fecha", "date", "date"),
+        _col("creado_en", "datetime", "datetime", "NO"),
+        _col("estado", "enum", "enum('ABIERTA','EN_PROCESO','FACTURADA','ENTREGADA')", "NO"),
+        _col("cantidad", "smallint", "smallint(6)"),
+    ]
+
+_PKS = {"equipo": "id_equipo", "cliente": "id_cliente", "cat_servicio": "id_servicio",
+        "detalle_servicio": "id_detalle_servicio", "orden_trabajo": "id_orden"}
+
+_FORM = MultiDict({"id_cliente": "12", "nombre": "Galaxy A14", "observaciones": "Pantalla rota",
+                   "precio": "25.50", "activo": "on", "fecha": "2025-03-01",
+                   "creado_en": "2025-03-01T10:30", "estado": "ABIERTA", "cantidad": ""})
+
+_FILA = {"id_cliente": 12, "nombre": "Galaxy A14", "observaciones": None, "precio": Decimal("25.50"),
+         "activo": 1, "fecha": "2025-03-01", "creado_en": datetime(2025, 3, 1, 10, 30),
+         "estado": "ABIERTA", "cantidad": 1}
+
+def _simular_esquema() -> None:
+    """Catálogo en memoria sin DB (misma estructura que esquema.cargar())."""
+    from python import esquema
+    columnas = {t: _columnas(pk) for t, pk in _PKS.items()}
+    esquema.TTL = 10 ** 9
+    esquema._version += 1
+    esquema._actual = esquema._Catalogo(columnas, dict(_PKS), {}, ("micro", ""), esquema._version)
+
+def _casos() -> dict:
+    """Los mismos caminos que recorren form()/guardar() de cada módulo."""
+    from python import codec, orden_trabajo as ot
+    fila = {**_FILA}
+    for pk in _PKS.values():
+        fila.setdefault(pk, 1)
+    casos = {}
+    for t in ("equipo", "cliente", "cat_servicio", "detalle_servicio"):
+        casos[f"{t}: specs"]      = lambda t=t: codec.specs(t)
+        casos[f"{t}: form->sql"]  = lambda t=t: [c.a_sql(_FORM) for c in codec.tabla(t).values()]
+        casos[f"{t}: fila->form"] = lambda t=t: codec.a_form(t, fila)
+    meta = ot.TableMeta("orden_trabajo")
+    casos["orden_trabajo: TableMeta()"] = lambda: ot.TableMeta("orden_trabajo")
+    casos["orden_trabajo: specs"]       = lambda: {c.name: meta.spec_for(c) for c in meta.columns}
+    def a_sql():
+        fc = ot.FormCodec("orden_trabajo")
+        return [fc.to_sql(c, _FORM) for c in meta.columns]
+    def a_form():
+        fc = ot.FormCodec("orden_trabajo")
+        return {c.name: fc.to_form(c, fila[c.name]) for c in meta.columns}
+    casos["orden_trabajo: form->sql"]   = a_sql
+    casos["orden_trabajo: fila->form"]  = a_form
+    return casos
+
+def medir(fn, numero: int, repeticiones: int) -> float:
+    """Mejor tiempo (µs por llamada) de `repeticiones` tandas de `numero` llamadas."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        for _ in range(numero):
+            fn()
+        mejor = min(mejor, (time.perf_counter() - t0) / numero)
+    return mejor * 1e6
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--numero", type=int, default=2000)
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--salida", help="ruta del JSON (por defecto bench/resultados/)")
+    a = ap.parse_args()
+
+    _simular_esquema()
+    casos = {}
+    for nombre, fn in _casos().items():
+        casos[nombre] = {"us_por_op": round(medir(fn, a.numero, a.repeticiones), 3)}
+    print(tabla(casos, ["us_por_op"], "caso"))
+    ruta = guardar("micro", {"parametros": {"numero": a.numero, "repeticiones": a.repeticiones},
+                             "casos": casos}, a.salida)
+    print(f"\nResultados: {ruta}")
+
+if __name__ == "__main__":
+    main()
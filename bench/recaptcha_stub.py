@@ -0,0 +1,75 @@
+# bench/recaptcha_stub.py
+"""
+Servidor local que imita siteverify de reCAPTCHA (para pruebas y benchmarks del login).
+
+    python -m bench.recaptcha_stub --puerto 8099                 # responde al toque
+    python -m bench.recaptcha_stub --demora 3000                 # Google lento (ms)
+    python -m bench.recaptcha_stub --error 0.5                   # 50% de respuestas 503
+
+y en la app:  RECAPTCHA_URL=http://127.0.0.1:8099/siteverify RECAPTCHA_SECRET=x
+
+El token "invalido" da success=false; cualquier otro, success=true.
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+def servidor(puerto: int = 0, demora_ms: float = 0.0, error: float = 0.0) -> ThreadingHTTPServer:
+    """Crea el servidor (puerto 0 = uno libre; ver .server_port). Llamar serve_forever()."""
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"          # keep-alive, como Google
+
+        def do_POST(self):
+            largo = int(self.headers.get("Content-Length") or 0)
+            datos = parse_qs(self.rfile.read(largo).decode())
+            if demora_ms:
+                time.sleep(demora_ms / 1000.0)
+            if error and random.random() < error:
+                cuerpo, estado = b'{"success": false}', 503
+            else:
+                token = (datos.get("response") or [""])[0]
+                cuerpo = json.dumps({"success": token != "invalido",
+                                     "hostname": "localhost"}).encode()
+                estado = 200
+            try:
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+            except (BrokenPipeError, ConnectionResetError):
+                pass        # el cliente ya se fue (plazo vencido)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+    srv.daemon_threads = True
+    return srv
+
+def en_hilo(**kw) -> ThreadingHTTPServer:
+    """Arranca el servidor en un hilo de fondo y lo devuelve (para scripts de bench)."""
+    srv = servidor(**kw)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--puerto", type=int, default=8099)
+    ap.add_argument("--demora", type=float, default=0.0, help="ms antes de responder")
+    ap.add_argument("--error", type=float, default=0.0, help="fracción de respuestas 503")
+    a = ap.parse_args()
+    srv = servidor(a.puerto, a.demora, a.error)
+    print(f"siteverify de prueba en http://127.0.0.1:{srv.server_port}/siteverify")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# bench/sembrar.py
+"""
+Siembra una base LOCAL de pruebas con volúmenes realistas para los benchmarks.
+
+    python -m bench.sembrar                  # 100k clientes, 300k equipos, 1M órdenes
+    python -m bench.sembrar --escala 0.01    # 1% (prueba rápida)
+
+Usa la misma configuración MYSQL_* que la app. ¡No correr contra producción!
+Solo llena las columnas que la app usa (resueltas desde el esquema real).
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from python.conexion import get_conn, DATABASE
+from python import busqueda, esquema, saldos
+from python.orden import _equipo_cols, _orden_cols, _abono_cols
+
+CLIENTES, EQUIPOS, ORDENES = 100_000, 300_000, 1_000_000
+MODELOS = ["Galaxy A14", "Galaxy S21", "iPhone 11", "iPhone 13", "Redmi Note 12",
+           "Moto G54", "Honor X8", "Poco X5", "Xiaomi 13T", "Nokia G21"]
+FALLAS  = ["Pantalla rota", "No carga", "Batería inflada", "Sin señal", "Se reinicia",
+           "Cámara borrosa", "Mojado", "Altavoz no suena", "Pin de carga flojo", "Software"]
+NOMBRES = ["Ana", "Luis", "María", "José", "Carla", "Pedro", "Lucía", "Jorge", "Sofía", "Diego"]
+APELLIDOS = ["Pérez", "García", "Loor", "Zambrano", "Mendoza", "Vera", "Cedeño", "Moreira"]
+
+def _insertar(cn, tabla: str, cols: list, filas, lote: int) -> tuple[int, int]:
+    """executemany por lotes (mysql.connector lo convierte en INSERT multi-fila)."""
+    pkc = esquema.pk(tabla)
+    cur = cn.cursor()
+    cur.execute(f"SELECT COALESCE(MAX(`{pkc}`),0) FROM `{tabla}`"); desde = cur.fetchone()[0]
+    sql = f"INSERT INTO `{tabla}` ({', '.join(f'`{c}`' for c in cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
+    buf, n, t0 = [], 0, time.perf_counter()
+    for fila in filas:
+        buf.append(fila)
+        if len(buf) >= lote:
+            cur.executemany(sql, buf); cn.commit(); n += len(buf); buf = []
+            print(f"\r  {tabla}: {n:,} filas ({n / (time.perf_counter() - t0):,.0f}/s)", end="", flush=True)
+    if buf:
+        cur.executemany(sql, buf); cn.commit(); n += len(buf)
+    cur.execute(f"SELECT COALESCE(MAX(`{pkc}`),0) FROM `{tabla}`"); hasta = cur.fetchone()[0]
+    cur.close()
+    print(f"\r  {tabla}: {n:,} filas en {time.perf_counter() - t0:.1f}s" + " " * 20)
+    return desde + 1, hasta
+
+def _fecha(rnd: random.Random, dias: int = 3 * 365) -> datetime:
+    return datetime.now() - timedelta(seconds=rnd.randrange(dias * 86400))
+
+def _precio_col(tabla: str) -> str | None:
+    cols = esquema.nombres(tabla)
+    return next((c for c in ("precio_unitario", "precio_unit") if c in cols), None)
+
+def sembrar(escala: float, lote: int, semilla: int) -> None:
+    rnd = random.Random(semilla)
+    n_cli, n_eq, n_ot = (max(1, int(x * escala)) for x in (CLIENTES, EQUIPOS, ORDENES))
+    print(f"Sembrando {DATABASE}: {n_cli:,} clientes, {n_eq:,} equipos, {n_ot:,} órdenes")
+    saldos.asegurar_tabla()
+    busqueda.asegurar_tabla()
+    esquema.cargar()
+    cn = get_conn()
+    try:
+        cur = cn.cursor()
+        cur.execute("SELECT MIN(id_usuario) FROM usuario"); id_usuario = cur.fetchone()[0]
+        cur.close()
+
+        # --- clientes ---
+        ccols = esquema.nombres("cliente")
+        doc = next((c for c in ("identificacion", "cedula") if c in ccols), None)
+        tel = next((c for c in ("telefono", "celular") if c in ccols), None)
+        cols = ["nombres", "apellidos"] + [c for c in (doc, tel) if c] + (["email"] if "email" in ccols else [])
+        base = int(time.time()) % 10_000_000
+        def clientes():
+            for i in range(n_cli):
+                f = [rnd.choice(NOMBRES), f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"]
+                if doc: f.append(f"9{base:07d}{i:07d}"[-13:])
+                if tel: f.append(f"09{rnd.randrange(10**8):08d}")
+                if "email" in ccols: f.append(f"bench{base}.{i}@example.com")
+                yield f
+        c_desde, c_hasta = _insertar(cn, "cliente", cols, clientes(), lote)
+
+        # --- equipos (cada uno de un cliente) ---
+        imei, serie, modelo = _equipo_cols()
+        cols = ["id_cliente"] + [c for c in (modelo, imei, serie) if c]
+        duenos = [rnd.randint(c_desde, c_hasta) for _ in range(n_eq)]
+        def equipos():
+            for i, cli in enumerate(duenos):
+                f = [cli]
+                if modelo: f.append(rnd.choice(MODELOS))
+                if imei:   f.append(f"35{base:07d}{i:07d}"[-15:])
+                if serie:  f.append(f"SN{base}{i:08d}")
+                yield f
+        e_desde, _ = _insertar(cn, "equipo", cols, equipos(), lote)
+
+        # --- órdenes ---
+        oc = _orden_cols()
+        cols = ["id_cliente", "id_equipo"] + [c for c in (oc["desc_col"], oc["estado"], oc["creado_por"],
+                                                         oc["creado_en"], oc["fecha_recepcion"]) if c]
+        def ordenes():
+            for _ in range(n_ot):
+                j = rnd.randrange(n_eq)
+                f = [duenos[j], e_desde + j]
+                if oc["desc_col"]:   f.append(rnd.choice(FALLAS))
+                if oc["estado"]:     f.append("FACTURADA" if rnd.random() < 0.6 else "ABIERTA")
+                if oc["creado_por"]: f.append(id_usuario)
+                cuando = _fecha(rnd)
+                if oc["creado_en"]:       f.append(cuando)
+                if oc["fecha_recepcion"]: f.append(cuando)
+                yield f
+        o_desde, o_hasta = _insertar(cn, "orden_trabajo", cols, ordenes(), lote)
+
+        # --- detalle de servicios y repuestos (0-3 y 0-2 por orden) ---
+        for tabla, maximo in (("detalle_servicio", 3), ("detalle_repuesto", 2)):
+            dcols = esquema.nombres(tabla)
+            precio = _precio_col(tabla)
+            cols = ["id_orden"] + [c for c in ("descripcion", "cantidad") if c in dcols] + ([precio] if precio else [])
+            def lineas(maximo=maximo, dcols=dcols, precio=precio):
+                for id_orden in range(o_desde, o_hasta + 1):
+                    for _ in range(rnd.randint(0, maximo)):
+                        f = [id_orden]
+                        if "descripcion" in dcols: f.append(rnd.choice(FALLAS))
+                        if "cantidad" in dcols:    f.append(rnd.choice((1, 1, 1, 2)))
+                        if precio:                 f.append(f"{rnd.uniform(5, 120):.2f}")
+                        yield f
+            _insertar(cn, tabla, cols, lineas(), lote)
+
+        # --- abonos (0-2 por orden) ---
+        ac = _abono_cols()
+        cols = ["id_orden", "monto"] + [c for c in (ac["id_usuario"], ac["fecha"]) if c]
+        def abonos():
+            for id_orden in range(o_desde, o_hasta + 1):
+                for _ in range(rnd.choice((0, 1, 1, 2))):
+                    f = [id_orden, f"{rnd.uniform(5, 60):.2f}"]
+                    if ac["id_usuario"]: f.append(id_usuario)
+                    if ac["fecha"]:      f.append(_fecha(rnd))
+                    yield f
+        _insertar(cn, "abono", cols, abonos(), lote)
+
+        # --- totales por orden ---
+        t0 = time.perf_counter()
+        cur = cn.cursor()
+        saldos.reconstruir(cur); cn.commit(); cur.close()
+        print(f"  orden_saldo reconstruida en {time.perf_counter() - t0:.1f}s")
+
+        # --- índice de búsqueda ---
+        t0 = time.perf_counter()
+        cur = cn.cursor()
+        busqueda.reconstruir(cur); cn.commit(); cur.close()
+        print(f"  orden_busqueda reconstruida en {time.perf_counter() - t0:.1f}s")
+    finally:
+        cn.close()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--escala", type=float, default=1.0, help="fracción de los volúmenes (1.0 = completos)")
+    ap.add_argument("--lote", type=int, default=5000, help="filas por INSERT")
+    ap.add_argument("--semilla", type=int, default=42)
+    a = ap.parse_args()
+    sembrar(a.escala, a.lote, a.semilla)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+-- database/orden_busqueda.sql
+-- Búsqueda de texto en órdenes (python/busqueda.py, cuadro "Buscar" de /orden/):
+-- un documento por orden con descripción + cliente + equipo e índice FULLTEXT.
+-- La app lo mantiene al crear órdenes y al editar clientes/equipos; si la
+-- tabla no existe la crea y la llena al arrancar, pero con muchas órdenes
+-- conviene correr esto antes (cargar sin el índice y crearlo al final es
+-- bastante más rápido que mantenerlo fila por fila).
+--
+-- El índice no guarda palabras de menos de innodb_ft_min_token_size letras
+-- (3 por defecto, igual que BUSQUEDA_MIN_LARGO). La lista de stopwords por
+-- defecto de InnoDB es en inglés; no afecta nombres ni IMEI.
+
+CREATE TABLE IF NOT EXISTS orden_busqueda (
+  id_orden  INT  NOT NULL PRIMARY KEY,
+  texto     TEXT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Ajustar las columnas si el esquema usa otros nombres (p.ej. diagnostico, serial).
+INSERT INTO orden_busqueda (id_orden, texto)
+SELECT o.id_orden, CONCAT_WS(' ', o.descripcion, c.nombres, c.apellidos, c.identificacion,
+                             e.marca, e.modelo, e.imei, e.serie)
+FROM orden_trabajo o
+JOIN cliente c ON c.id_cliente = o.id_cliente
+LEFT JOIN equipo e ON e.id_equipo = o.id_equipo
+ON DUPLICATE KEY UPDATE texto=VALUES(texto);
+
+ALTER TABLE orden_busqueda ADD FULLTEXT KEY ft_orden_busqueda (texto);
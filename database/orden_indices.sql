@@ -0,0 +1,15 @@
+-- database/orden_indices.sql
+-- Listado y tablero de órdenes (/orden/, python/orden.py): cada filtro
+-- recorre su índice ya ordenado por (creado_en, id_orden) y corta en la
+-- página, sin leer las filas (InnoDB guarda la PK en cada índice secundario).
+-- ix_ot_cliente_creado empieza por id_cliente, así que también sirve a la FK.
+-- El script NO borra el índice simple de id_cliente que ya exista (su nombre
+-- depende del dump); queda redundante y se puede quitar a mano:
+--   SHOW INDEX FROM orden_trabajo WHERE Column_name = 'id_cliente';
+--   ALTER TABLE orden_trabajo DROP INDEX <nombre>;   -- el de una sola columna
+
+ALTER TABLE orden_trabajo
+  ADD INDEX ix_ot_estado_creado  (estado, creado_en, id_orden),
+  ADD INDEX ix_ot_tecnico_creado (id_tecnico, creado_en, id_orden),
+  ADD INDEX ix_ot_cliente_creado (id_cliente, creado_en, id_orden),
+  ADD INDEX ix_ot_creado         (creado_en, id_orden);
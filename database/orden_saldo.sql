@@ -0,0 +1,28 @@
+-- database/orden_saldo.sql
+-- Totales por orden de trabajo, mantenidos por la app (python/saldos.py)
+-- en la misma transacción que agrega líneas de detalle o abonos.
+-- La app también la crea al arrancar si no existe.
+
+CREATE TABLE IF NOT EXISTS orden_saldo (
+  id_orden            INT           NOT NULL PRIMARY KEY,
+  subtotal_servicios  DECIMAL(12,2) NOT NULL DEFAULT 0,
+  subtotal_repuestos  DECIMAL(12,2) NOT NULL DEFAULT 0,
+  subtotal            DECIMAL(12,2) NOT NULL DEFAULT 0,
+  pagado              DECIMAL(12,2) NOT NULL DEFAULT 0,
+  saldo               DECIMAL(12,2) NOT NULL DEFAULT 0,
+  actualizado_en      DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  KEY ix_orden_saldo_saldo (saldo)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Relleno inicial (opcional: si no se corre, cada orden se calcula la primera vez que se lee).
+-- Ajustar precio_unitario si el esquema usa otra columna (p.ej. precio_unit).
+INSERT INTO orden_saldo (id_orden, subtotal_servicios, subtotal_repuestos, subtotal, pagado, saldo)
+SELECT o.id_orden, COALESCE(s.t,0), COALESCE(r.t,0), COALESCE(s.t,0) + COALESCE(r.t,0),
+       COALESCE(a.t,0), COALESCE(s.t,0) + COALESCE(r.t,0) - COALESCE(a.t,0)
+FROM orden_trabajo o
+LEFT JOIN (SELECT id_orden, SUM(cantidad*precio_unitario) AS t FROM detalle_servicio GROUP BY id_orden) s ON s.id_orden=o.id_orden
+LEFT JOIN (SELECT id_orden, SUM(cantidad*precio_unitario) AS t FROM detalle_repuesto GROUP BY id_orden) r ON r.id_orden=o.id_orden
+LEFT JOIN (SELECT id_orden, SUM(monto) AS t FROM abono GROUP BY id_orden) a ON a.id_orden=o.id_orden
+ON DUPLICATE KEY UPDATE
+  subtotal_servicios=VALUES(subtotal_servicios), subtotal_repuestos=VALUES(subtotal_repuestos),
+  subtotal=VALUES(subtotal), pagado=VALUES(pagado), saldo=VALUES(saldo);
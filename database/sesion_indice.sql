@@ -0,0 +1,10 @@
+-- database/sesion_indice.sql
+-- El registro de sesiones es diferido (python/bitacora.py): el cierre de una
+-- sesión se busca por un token aleatorio puesto por la app en vez de por
+-- id_sesion. (id_usuario, inicio) no alcanza: inicio tiene resolución de un
+-- segundo y dos logins del mismo usuario en ese segundo compartirían clave.
+-- Las sesiones anteriores quedan con token NULL (el índice único lo admite).
+
+ALTER TABLE sesion
+  ADD COLUMN token CHAR(32) NULL AFTER id_usuario,
+  ADD UNIQUE INDEX ux_sesion_token (token);
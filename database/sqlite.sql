@@ -0,0 +1,206 @@
+-- database/sqlite.sql
+-- Esquema mínimo para correr la app con DB_BACKEND=sqlite (pruebas locales,
+-- CI y benchmarks sin servidor MySQL). Solo las columnas que el código usa.
+-- Tipos escritos "a lo MySQL" para que las vistas de information_schema de
+-- python/conexion_sqlite.py den los mismos DATA_TYPE / COLUMN_TYPE:
+--   INTEGER PRIMARY KEY  -> int(11) auto_increment
+--   TINYINT(1)           -> checkbox en los formularios genéricos
+-- Los ENUM de MySQL quedan como VARCHAR. orden_saldo la crea la app
+-- (saldos.asegurar_tabla) con la misma DDL que en MySQL; orden_busqueda
+-- también, como tabla virtual FTS5 (busqueda.asegurar_tabla).
+
+PRAGMA foreign_keys = ON;
+
+-- ===== Usuarios y roles =====
+CREATE TABLE rol (
+  id_rol        INTEGER PRIMARY KEY,
+  nombre        VARCHAR(50)  NOT NULL COLLATE NOCASE UNIQUE,
+  descripcion   VARCHAR(255),
+  activo        TINYINT(1)   NOT NULL DEFAULT 1
+);
+
+CREATE TABLE usuario (
+  id_usuario      INTEGER PRIMARY KEY,
+  nombre_completo VARCHAR(120) NOT NULL,
+  usuario_login   VARCHAR(60)  NOT NULL COLLATE NOCASE UNIQUE,
+  email           VARCHAR(120) NOT NULL COLLATE NOCASE UNIQUE,
+  hash_password   VARCHAR(255) NOT NULL,
+  activo          TINYINT(1)   NOT NULL DEFAULT 1,
+  mfa_habilitado  TINYINT(1)   NOT NULL DEFAULT 0,
+  creado_en       DATETIME     NOT NULL DEFAULT (datetime('now','localtime'))
+);
+
+CREATE TABLE usuario_rol (
+  id_usuario  INT NOT NULL REFERENCES usuario(id_usuario),
+  id_rol      INT NOT NULL REFERENCES rol(id_rol),
+  PRIMARY KEY (id_usuario, id_rol)
+);
+
+CREATE TABLE sesion (
+  id_sesion   INTEGER PRIMARY KEY,
+  id_usuario  INT NOT NULL REFERENCES usuario(id_usuario),
+  token       CHAR(32),
+  inicio      DATETIME NOT NULL,
+  fin         DATETIME,
+  ip          VARCHAR(45),
+  user_agent  VARCHAR(255),
+  estado      VARCHAR(20) NOT NULL DEFAULT 'activa'
+);
+CREATE UNIQUE INDEX ux_sesion_token ON sesion (token);
+
+CREATE TABLE auditoria (
+  id_auditoria  INTEGER PRIMARY KEY,
+  id_usuario    INT REFERENCES usuario(id_usuario),
+  id_sesion     INT REFERENCES sesion(id_sesion),
+  entidad       VARCHAR(60) NOT NULL,
+  entidad_id    VARCHAR(60),
+  accion        VARCHAR(20) NOT NULL,
+  resumen       VARCHAR(255),
+  antes_json    TEXT,
+  despues_json  TEXT,
+  fecha_hora    DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
+
+-- ===== Clientes y equipos =====
+CREATE TABLE cliente (
+  id_cliente      INTEGER PRIMARY KEY,
+  nombres         VARCHAR(80)  NOT NULL,
+  apellidos       VARCHAR(80),
+  identificacion  VARCHAR(20),
+  cedula          VARCHAR(20),
+  telefono        VARCHAR(20),
+  email           VARCHAR(120),
+  direccion       VARCHAR(200),
+  creado_en       DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX ix_cliente_identificacion ON cliente (identificacion);
+
+CREATE TABLE equipo (
+  id_equipo      INTEGER PRIMARY KEY,
+  id_cliente     INT NOT NULL REFERENCES cliente(id_cliente),
+  marca          VARCHAR(60),
+  modelo         VARCHAR(80),
+  imei           VARCHAR(20),
+  serie          VARCHAR(60),
+  observaciones  TEXT,
+  creado_en      DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX ix_equipo_cliente ON equipo (id_cliente);
+
+-- ===== Catálogos =====
+CREATE TABLE cat_servicio (
+  id_servicio  INTEGER PRIMARY KEY,
+  nombre       VARCHAR(120) NOT NULL,
+  descripcion  TEXT,
+  precio_base  DECIMAL(10,2) NOT NULL DEFAULT 0,
+  activo       TINYINT(1) NOT NULL DEFAULT 1
+);
+
+CREATE TABLE repuesto (
+  id_repuesto     INTEGER PRIMARY KEY,
+  nombre          VARCHAR(120) NOT NULL,
+  compatibilidad  VARCHAR(255),
+  costo_ref       DECIMAL(10,2),
+  precio_ref      DECIMAL(10,2),
+  stock_actual    INT NOT NULL DEFAULT 0,
+  activo          TINYINT(1) NOT NULL DEFAULT 1
+);
+
+-- ===== Órdenes de trabajo =====
+CREATE TABLE orden_trabajo (
+  id_orden            INTEGER PRIMARY KEY,
+  id_cliente          INT NOT NULL REFERENCES cliente(id_cliente),
+  id_equipo           INT REFERENCES equipo(id_equipo),
+  descripcion         TEXT,
+  estado              VARCHAR(20) NOT NULL DEFAULT 'ABIERTA',
+  id_tecnico          INT REFERENCES usuario(id_usuario),
+  id_equipo_prestado  INT REFERENCES equipo(id_equipo),
+  fecha_recepcion     DATETIME,
+  creado_por          INT REFERENCES usuario(id_usuario),
+  creado_en           DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX ix_orden_trabajo_equipo ON orden_trabajo (id_equipo);
+-- listado / tablero de órdenes (database/orden_indices.sql)
+CREATE INDEX ix_ot_estado_creado  ON orden_trabajo (estado, creado_en, id_orden);
+CREATE INDEX ix_ot_tecnico_creado ON orden_trabajo (id_tecnico, creado_en, id_orden);
+CREATE INDEX ix_ot_cliente_creado ON orden_trabajo (id_cliente, creado_en, id_orden);
+CREATE INDEX ix_ot_creado         ON orden_trabajo (creado_en, id_orden);
+
+-- precio_unit y subtotal: columnas generadas (alias de los nombres viejos que
+-- usan la impresión de la OT y los formularios); no aparecen en el catálogo.
+CREATE TABLE detalle_servicio (
+  id_detalle_servicio  INTEGER PRIMARY KEY,
+  id_orden             INT NOT NULL REFERENCES orden_trabajo(id_orden),
+  id_servicio          INT REFERENCES cat_servicio(id_servicio),
+  descripcion          VARCHAR(255),
+  cantidad             DECIMAL(10,2) NOT NULL DEFAULT 1,
+  precio_unitario      DECIMAL(10,2) NOT NULL DEFAULT 0,
+  precio_unit          DECIMAL(10,2) GENERATED ALWAYS AS (precio_unitario) VIRTUAL,
+  subtotal             DECIMAL(12,2) GENERATED ALWAYS AS (cantidad * precio_unitario) VIRTUAL
+);
+CREATE INDEX ix_detalle_servicio_orden ON detalle_servicio (id_orden);
+
+CREATE TABLE detalle_repuesto (
+  id_detalle_repuesto  INTEGER PRIMARY KEY,
+  id_orden             INT NOT NULL REFERENCES orden_trabajo(id_orden),
+  id_repuesto          INT REFERENCES repuesto(id_repuesto),
+  descripcion          VARCHAR(255),
+  cantidad             DECIMAL(10,2) NOT NULL DEFAULT 1,
+  precio_unitario      DECIMAL(10,2) NOT NULL DEFAULT 0,
+  precio_unit          DECIMAL(10,2) GENERATED ALWAYS AS (precio_unitario) VIRTUAL,
+  subtotal             DECIMAL(12,2) GENERATED ALWAYS AS (cantidad * precio_unitario) VIRTUAL
+);
+CREATE INDEX ix_detalle_repuesto_orden ON detalle_repuesto (id_orden);
+
+CREATE TABLE abono (
+  id_abono     INTEGER PRIMARY KEY,
+  id_orden     INT NOT NULL REFERENCES orden_trabajo(id_orden),
+  monto        DECIMAL(10,2) NOT NULL,
+  metodo       VARCHAR(20) NOT NULL DEFAULT 'EFECTIVO',
+  referencia   VARCHAR(60),
+  estado       VARCHAR(20) NOT NULL DEFAULT 'APLICADO',
+  observacion  VARCHAR(255),
+  id_usuario   INT REFERENCES usuario(id_usuario),
+  creado_en    DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX ix_abono_orden ON abono (id_orden);
+
+-- ===== Facturación y caja =====
+CREATE TABLE comprobante (
+  id_comprobante  INTEGER PRIMARY KEY,
+  id_orden        INT NOT NULL REFERENCES orden_trabajo(id_orden),
+  tipo            VARCHAR(20) NOT NULL DEFAULT 'FACTURA',
+  numero          VARCHAR(30),
+  subtotal        DECIMAL(12,2) NOT NULL DEFAULT 0,
+  iva             DECIMAL(12,2) NOT NULL DEFAULT 0,
+  total           DECIMAL(12,2) NOT NULL DEFAULT 0,
+  estado          VARCHAR(20) NOT NULL DEFAULT 'EMITIDO',
+  creado_por      INT REFERENCES usuario(id_usuario),
+  creado_en       DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
+CREATE INDEX ix_comprobante_orden ON comprobante (id_orden);
+
+CREATE TABLE caja (
+  id_caja         INTEGER PRIMARY KEY,
+  id_usuario      INT REFERENCES usuario(id_usuario),
+  fecha_apertura  DATETIME NOT NULL DEFAULT (datetime('now','localtime')),
+  fecha_cierre    DATETIME,
+  saldo_inicial   DECIMAL(12,2) NOT NULL DEFAULT 0,
+  saldo_final     DECIMAL(12,2),
+  estado          VARCHAR(20) NOT NULL DEFAULT 'ABIERTA'
+);
+
+CREATE TABLE mov_caja (
+  id_mov_caja     INTEGER PRIMARY KEY,
+  id_caja         INT REFERENCES caja(id_caja),
+  tipo            VARCHAR(20) NOT NULL,
+  monto           DECIMAL(12,2) NOT NULL,
+  motivo          VARCHAR(255),
+  metodo          VARCHAR(20),
+  referencia      VARCHAR(60),
+  id_orden        INT REFERENCES orden_trabajo(id_orden),
+  id_comprobante  INT REFERENCES comprobante(id_comprobante),
+  id_abono        INT REFERENCES abono(id_abono),
+  creado_por      INT REFERENCES usuario(id_usuario),
+  creado_en       DATETIME NOT NULL DEFAULT (datetime('now','localtime'))
+);
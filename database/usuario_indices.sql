@@ -0,0 +1,11 @@
+-- database/usuario_indices.sql
+-- Búsqueda por prefijo y paginación por cursor en /admin/usuarios
+-- (python/admin.py). Si usuario_login / email ya tienen un índice UNIQUE en
+-- el dump, esas dos líneas sobran (MySQL usa el UNIQUE igual).
+
+ALTER TABLE usuario
+  ADD INDEX ix_usuario_login (usuario_login),
+  ADD INDEX ix_usuario_email (email);
+
+-- Roles de los usuarios de la página: WHERE id_usuario IN (...)
+ALTER TABLE usuario_rol ADD INDEX ix_usuario_rol_usuario (id_usuario, id_rol);
@@ -1,11 +1,12 @@
 # python/admin.py
 from __future__ import annotations
+import os
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
-from werkzeug.security import generate_password_hash
 from mysql.connector import Error
-from python.conexion import get_conn
-from python.authz import roles_required
+from python.conexion import get_conn, request_conn
+from python.authz import roles_required, invalidar_identidad
+from python import fk_opciones, hashing
 
 bp = Blueprint("admin", __name__, url_prefix="/admin", template_folder="../templates")
 
@@ -16,36 +17,74 @@ def panel():
     # atajo: manda al listado de usuarios
     return redirect(url_for("admin.usuarios"))
 
+# -------- listado (keyset) ----------
+USUARIOS_PAGINA     = int(os.getenv("ADMIN_USUARIOS_PAGINA", "50"))
+USUARIOS_PAGINA_MAX = 200
+
+def _buscar_usuarios(cur, q: str, antes: int | None, limite: int) -> list:
+    """
+    Página de usuarios por id descendente con id < `antes` (cursor).
+    Con q: prefijo de login o de email. Cada rama es un rango sobre su
+    índice (ix_usuario_login / ix_usuario_email), así que el costo depende de
+    cuántos coinciden con el prefijo y no del total de usuarios.
+    """
+    tope = antes if antes else 2 ** 31
+    if not q:
+        cur.execute("""SELECT id_usuario, usuario_login, email, activo
+                       FROM usuario WHERE id_usuario < %s
+                       ORDER BY id_usuario DESC LIMIT %s""", (tope, limite + 1))
+        return cur.fetchall()
+    patron = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    cur.execute("""
+        SELECT u.id_usuario, u.usuario_login, u.email, u.activo
+        FROM (SELECT id_usuario FROM (SELECT id_usuario FROM usuario
+                                      WHERE usuario_login LIKE %s AND id_usuario < %s
+                                      ORDER BY id_usuario DESC LIMIT %s) a
+              UNION
+              SELECT id_usuario FROM (SELECT id_usuario FROM usuario
+                                      WHERE email LIKE %s AND id_usuario < %s
+                                      ORDER BY id_usuario DESC LIMIT %s) b) m
+        JOIN usuario u ON u.id_usuario = m.id_usuario
+        ORDER BY u.id_usuario DESC LIMIT %s
+    """, (patron, tope, limite + 1, patron, tope, limite + 1, limite + 1))
+    return cur.fetchall()
+
+def _roles_de(cur, ids: list) -> dict:
+    """{id_usuario: 'rol1, rol2'} solo para los usuarios de la página."""
+    if not ids:
+        return {}
+    cur.execute(f"""SELECT ur.id_usuario, r.nombre
+                    FROM usuario_rol ur JOIN rol r ON r.id_rol = ur.id_rol
+                    WHERE ur.id_usuario IN ({', '.join(['%s'] * len(ids))})
+                    ORDER BY r.nombre""", tuple(ids))
+    roles: dict = {}
+    for idu, nombre in cur.fetchall():
+        roles.setdefault(idu, []).append(nombre)
+    return {idu: ", ".join(n) for idu, n in roles.items()}
+
 @bp.get("/usuarios")
 @login_required
 @roles_required("administrador")
 def usuarios():
     q = (request.args.get("q") or "").strip()
-    cn = get_conn(); cur = cn.cursor()
-    sql = """
-        SELECT u.id_usuario, u.usuario_login, u.email, u.activo,
-               COALESCE(GROUP_CONCAT(r.nombre ORDER BY r.nombre SEPARATOR ', '), '')
-        FROM usuario u
-        LEFT JOIN usuario_rol ur ON ur.id_usuario = u.id_usuario
-        LEFT JOIN rol r ON r.id_rol = ur.id_rol
-        {where}
-        GROUP BY u.id_usuario, u.usuario_login, u.email, u.activo
-        ORDER BY u.id_usuario DESC
-    """
-    if q:
-        cur.execute(sql.format(where="WHERE u.usuario_login LIKE %s OR u.email LIKE %s"),
-                    (f"%{q}%", f"%{q}%"))
-    else:
-        cur.execute(sql.format(where=""))
-    rows = cur.fetchall()
+    antes = request.args.get("antes", type=int)          # cursor: último id de la página anterior
+    limite = min(max(request.args.get("limite", type=int) or USUARIOS_PAGINA, 1), USUARIOS_PAGINA_MAX)
+    cn = request_conn(); cur = cn.cursor()
+    filas = _buscar_usuarios(cur, q, antes, limite)
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    roles = _roles_de(cur, [f[0] for f in filas])
     cur.close(); cn.close()
-    return render_template("admin/usuarios.html", rows=rows, q=q)
+    rows = [(idu, login, email, activo, roles.get(idu, "")) for idu, login, email, activo in filas]
+    siguiente = filas[-1][0] if (hay_mas and filas) else None
+    return render_template("admin/usuarios.html", rows=rows, q=q, limite=limite,
+                           antes=antes, siguiente=siguiente)
 
 @bp.get("/usuarios/<int:id_usuario>/editar")
 @login_required
 @roles_required("administrador")
 def editar_usuario(id_usuario: int):
-    cn = get_conn(); cur = cn.cursor()
+    cn = request_conn(); cur = cn.cursor()
     cur.execute("""SELECT id_usuario, nombre_completo, usuario_login, email, activo, mfa_habilitado
                    FROM usuario WHERE id_usuario=%s""", (id_usuario,))
     u = cur.fetchone()
@@ -79,6 +118,13 @@ def actualizar_usuario(id_usuario: int):
     # Combo único: 'administrador' o 'facturador'
     rol_seleccionado = request.form.get("rol")  # puede venir vacío
 
+    # el hash va antes de tomar la conexión: no se la retiene mientras se calcula
+    try:
+        hp = hashing.generar(nuevo_pwd) if nuevo_pwd else None
+    except hashing.HashOcupado:
+        flash("El servidor está ocupado. Intenta de nuevo en unos segundos.", "warning")
+        return redirect(url_for("admin.editar_usuario", id_usuario=id_usuario))
+
     cn = get_conn(); cur = cn.cursor()
     try:
         # Unicidad login/email (excluyendo al propio usuario)
@@ -93,8 +139,7 @@ def actualizar_usuario(id_usuario: int):
             return redirect(url_for("admin.editar_usuario", id_usuario=id_usuario))
 
         # Update de datos básicos + password si cambió
-        if nuevo_pwd:
-            hp = generate_password_hash(nuevo_pwd)
+        if hp:
             cur.execute("""UPDATE usuario
                            SET nombre_completo=%s, usuario_login=%s, email=%s,
                                activo=%s, mfa_habilitado=%s, hash_password=%s
@@ -116,6 +161,8 @@ def actualizar_usuario(id_usuario: int):
                 cur.execute("INSERT INTO usuario_rol (id_usuario, id_rol) VALUES (%s, %s)", (id_usuario, r[0]))
 
         cn.commit()
+        invalidar_identidad(id_usuario)
+        fk_opciones.invalidar("usuario")
         flash("Usuario actualizado correctamente.", "success")
         return redirect(url_for("admin.usuarios"))
 
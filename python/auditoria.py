@@ -1,5 +1,7 @@
 from __future__ import annotations
 from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import current_user
+from python import bitacora
 
 bp = Blueprint("auditoria", __name__, template_folder="../templates")
 
@@ -9,7 +11,27 @@ def form():
 
 @bp.post("/guardar")
 def guardar():
-    # TODO: insertar/actualizar en BD usando mysql-connector
-    # Los campos llegarán en request.form
-    flash("Guardado pendiente de implementar", "info")
+    f = request.form
+    entidad = (f.get("entidad") or "").strip()
+    accion = (f.get("accion") or "").strip()
+    if not entidad or not accion:
+        flash("Entidad y acción son obligatorias.", "warning")
+        return redirect(url_for("auditoria.form"))
+    id_usuario = f.get("id_usuario") or (current_user.id if current_user.is_authenticated else None)
+    try:
+        # Se encola (python/bitacora.py); la escritura en BD va por lotes en segundo plano
+        bitacora.auditar(
+            entidad, accion,
+            id_usuario=int(id_usuario) if id_usuario else None,
+            id_sesion=int(f["id_sesion"]) if f.get("id_sesion") else None,
+            entidad_id=f.get("entidad_id") or None,
+            resumen=f.get("resumen"),
+            antes=f.get("antes_json") or None,
+            despues=f.get("despues_json") or None,
+            fecha_hora=(f.get("fecha_hora") or "").replace("T", " ") or None,
+        )
+    except Exception as err:
+        flash(f"No se pudo registrar: {err}", "danger")
+        return redirect(url_for("auditoria.form"))
+    flash("Evento de auditoría registrado.", "success")
     return redirect(url_for("index"))
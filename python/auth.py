@@ -1,18 +1,15 @@
 # python/auth.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, login_required, UserMixin, current_user
-from werkzeug.security import check_password_hash
-import os, requests, time
+import os
 from urllib.parse import urlparse, urljoin
 from mysql.connector import InterfaceError, DatabaseError
 from python.conexion import get_conn  # ✅ conexión central a MariaDB
+from python import recaptcha, hashing, bitacora, limitador
+from python.authz import invalidar_identidad
 
 bp = Blueprint("auth", __name__)
 
-# === Config de intentos ===
-MAX_ATTEMPTS = 3
-LOCK_SECONDS = 5 * 60  # 5 minutos
-
 class Usuario(UserMixin):
     def __init__(self, id_usuario, usuario_login, hash_password):
         self.id = id_usuario
@@ -20,28 +17,16 @@ class Usuario(UserMixin):
         self.hash_password = hash_password
 
 # === Helpers ===
-def _is_locked():
-    lock_until = session.get("lock_until", 0)
-    now = int(time.time())
-    if lock_until and now < lock_until:
-        return True
-    if lock_until and now >= lock_until:
-        session.pop("lock_until", None)
-        session.pop("login_attempts", None)
-    return False
-
-def _remaining_minutes():
-    lock_until = session.get("lock_until", 0)
-    if not lock_until:
-        return 0
-    rem = lock_until - int(time.time())
-    return max(1, rem // 60) if rem > 0 else 0
-
-def _bump_attempts():
-    attempts = int(session.get("login_attempts", 0)) + 1
-    session["login_attempts"] = attempts
-    if attempts >= MAX_ATTEMPTS:
-        session["lock_until"] = int(time.time()) + LOCK_SECONDS
+# Intentos limitados en el servidor por IP y por usuario (python/limitador.py).
+def _minutos(seg):
+    return max(1, int(-(-seg // 60)))
+
+def _intento(ip, u):
+    """Gasta una ficha de la IP y del usuario; 0 = puede intentar, si no seg. de espera."""
+    seg = limitador.tomar(limitador.clave_ip(ip), *limitador.POR_IP)
+    if u and not seg:
+        seg = limitador.tomar(limitador.clave_usuario(u), *limitador.POR_USUARIO)
+    return seg
 
 def _is_safe_next(target):
     if not target:
@@ -59,8 +44,9 @@ def login_form():
     if current_user.is_authenticated:
         return redirect(url_for("index"))
 
-    if _is_locked():
-        flash(f"Demasiados intentos fallidos. Inténtalo en ~{_remaining_minutes()} min.", "warning")
+    seg = limitador.espera(limitador.clave_ip(request.remote_addr), *limitador.POR_IP)
+    if seg:
+        flash(f"Demasiados intentos fallidos. Inténtalo en ~{_minutos(seg)} min.", "warning")
 
     # Guarda 'next' (si venías de una ruta protegida)
     next_url = request.args.get("next")
@@ -72,40 +58,26 @@ def login_form():
 
 @bp.post("/login")
 def login_post():
-    if _is_locked():
-        flash("Acceso temporalmente bloqueado.", "warning")
-        return redirect(url_for("auth.login_form"))
-
     u = (request.form.get("usuario") or request.form.get("usuario_login") or "").strip()
     p = request.form.get("password", "")
 
+    # Antes de cualquier trabajo caro (reCAPTCHA, DB, hash)
+    seg = _intento(request.remote_addr, u)
+    if seg:
+        flash(f"Acceso temporalmente bloqueado. Inténtalo en ~{_minutos(seg)} min.", "warning")
+        return redirect(url_for("auth.login_form"))
+
     if not u or not p:
-        _bump_attempts()
         flash("Ingrese sus credenciales (usuario y contraseña).", "warning")
         return redirect(url_for("auth.login_form"))
 
-    # --- reCAPTCHA ---
+    # --- reCAPTCHA (sesión keep-alive, plazo corto y cortacircuitos; ver python/recaptcha.py) ---
     token = request.form.get("g-recaptcha-response", "")
-    secret = os.getenv("RECAPTCHA_SECRET", "")
-    if not token or not secret:
-        _bump_attempts()
+    if not token or not os.getenv("RECAPTCHA_SECRET", ""):
         flash("Falta verificar reCAPTCHA.", "warning")
         return redirect(url_for("auth.login_form"))
-    try:
-        resp = requests.post(
-            "https://www.google.com/recaptcha/api/siteverify",
-            data={"secret": secret, "response": token},
-            timeout=6,
-        ).json()
-    except requests.RequestException:
-        _bump_attempts()
-        flash("No se pudo verificar reCAPTCHA (red). Intenta de nuevo.", "danger")
-        return redirect(url_for("auth.login_form"))
-
-    if not resp.get("success"):
-        _bump_attempts()
-        flash("reCAPTCHA inválido.", "danger")
-        return redirect(url_for("auth.login_form"))
+    # con RECAPTCHA_ASYNC=1 la verificación corre mientras se consulta el usuario
+    verificacion = recaptcha.iniciar(token, request.remote_addr)
 
     # --- Autenticación en BD (MariaDB) ---
     try:
@@ -119,39 +91,57 @@ def login_post():
         row = cur.fetchone()
         cur.close(); cn.close()
     except (InterfaceError, DatabaseError, RuntimeError):
-        _bump_attempts()
         flash("No se puede conectar a MariaDB. Verifica que el servicio esté en ejecución y .env (host/puerto/usuario/clave) sea correcto.", "danger")
         return redirect(url_for("auth.login_form"))
 
-    if row and check_password_hash(row[2], p):
+    veredicto = recaptcha.resultado(verificacion)
+    if veredicto == recaptcha.NO_DISPONIBLE:
+        flash("No se pudo verificar reCAPTCHA (red). Intenta de nuevo.", "danger")
+        return redirect(url_for("auth.login_form"))
+    if veredicto != recaptcha.OK:
+        flash("reCAPTCHA inválido.", "danger")
+        return redirect(url_for("auth.login_form"))
+
+    # --- Contraseña (hash en el pool de python/hashing.py; rehash si cambió HASH_METODO) ---
+    try:
+        ok, nuevo_hash = hashing.verificar(row[2], p) if row else (False, None)
+    except hashing.HashOcupado:
+        flash("El servidor está ocupado. Intenta de nuevo en unos segundos.", "warning")
+        return redirect(url_for("auth.login_form"))
+
+    if ok:
+        if nuevo_hash:
+            # Condicionado al hash viejo: si otro login ya lo actualizó, no se pisa.
+            try:
+                cn = get_conn(); cur = cn.cursor()
+                cur.execute("UPDATE usuario SET hash_password=%s WHERE id_usuario=%s AND hash_password=%s",
+                            (nuevo_hash, row[0], row[2]))
+                cn.commit()
+                cur.close(); cn.close()
+                invalidar_identidad(row[0])
+                row = (row[0], row[1], nuevo_hash)
+            except Exception:
+                pass  # se reintenta en el próximo login
         # Reset intentos y login
-        session.pop("login_attempts", None)
-        session.pop("lock_until", None)
+        limitador.reiniciar(limitador.clave_usuario(u))
+        limitador.devolver(limitador.clave_ip(request.remote_addr), *limitador.POR_IP)
         login_user(Usuario(row[0], row[1], row[2]))
 
-        # === Registrar sesión en tabla `sesion` ===
+        # === Registrar sesión en tabla `sesion` (diferido: python/bitacora.py) ===
         try:
-            cn = get_conn(); cur = cn.cursor()
-            cur.execute("""
-                INSERT INTO sesion (id_usuario, inicio, ip, user_agent, estado)
-                VALUES (%s, NOW(), %s, %s, 'activa')
-            """, (
+            session["sesion_token"] = bitacora.abrir_sesion(
                 int(current_user.id),
                 request.headers.get("X-Forwarded-For", request.remote_addr),
-                (request.user_agent.string or "")[:255]
-            ))
-            cn.commit()
-            session["sesion_id"] = cur.lastrowid
-            cur.close(); cn.close()
+                request.user_agent.string,
+            )
         except Exception:
             # No interrumpir si falla el registro de sesión
-            session.pop("sesion_id", None)
+            session.pop("sesion_token", None)
 
         flash("Bienvenido.", "success")
         next_url = session.pop("next_url", None)
         return redirect(next_url if _is_safe_next(next_url) else url_for("index"))
 
-    _bump_attempts()
     flash("Usuario o contraseña incorrectos.", "danger")
     return redirect(url_for("auth.login_form"))
 
@@ -160,15 +150,12 @@ def login_post():
 def logout():
     # Cerrar la sesión en BD si la tenemos
     try:
-        sid = session.get("sesion_id")
-        if sid:
-            cn = get_conn(); cur = cn.cursor()
-            cur.execute("UPDATE sesion SET fin=NOW(), estado='cerrada' WHERE id_sesion=%s", (sid,))
-            cn.commit()
-            cur.close(); cn.close()
+        token = session.get("sesion_token")
+        if token:
+            bitacora.cerrar_sesion(int(current_user.id), token)
     except Exception:
         pass
-    session.pop("sesion_id", None)
+    session.pop("sesion_token", None)
 
     logout_user()
     flash("Sesión cerrada.", "info")
@@ -1,10 +1,12 @@
 # python/authz.py
 from __future__ import annotations
+import os
 from functools import wraps
-from typing import Iterable, Set
+from typing import Any, Dict, Iterable, Set
 from flask import flash, redirect, url_for, request, g
 from flask_login import current_user
-from python.conexion import get_conn
+from python.conexion import query
+from python.cache import CacheLRU
 
 # Mapea sinónimos a un nombre canónico
 _ROLE_ALIAS = {
@@ -16,30 +18,57 @@ def _canon(name: str) -> str:
     n = (name or "").strip().lower()
     return _ROLE_ALIAS.get(n, n)
 
+# ===== Identidad (usuario + roles) cacheada =====
+# Una sola consulta por usuario; se guarda hasta IDENTIDAD_TTL segundos o hasta
+# que admin.actualizar_usuario la invalide (otros procesos la ven al vencer).
+_identidades = CacheLRU("identidad",
+                        maximo=int(os.getenv("IDENTIDAD_CACHE_MAX", "1024")),
+                        ttl=float(os.getenv("IDENTIDAD_TTL", "60")))
+
+def identidad(id_usuario: int) -> Dict[str, Any] | None:
+    """
+    {'id_usuario', 'usuario_login', 'hash_password', 'roles'} del usuario ACTIVO,
+    o None si no existe / está inactivo. Los errores de DB se propagan.
+    """
+    ident = _identidades.get(id_usuario, default=False)
+    if ident is not False:
+        return ident
+    rows = query(
+        """
+        SELECT u.id_usuario, u.usuario_login, u.hash_password, r.nombre AS rol
+        FROM usuario u
+        LEFT JOIN usuario_rol ur ON ur.id_usuario = u.id_usuario
+        LEFT JOIN rol r ON r.id_rol = ur.id_rol AND r.activo=1
+        WHERE u.id_usuario=%s AND u.activo=1
+        """,
+        (id_usuario,),
+    )
+    ident = None
+    if rows:
+        ident = {
+            "id_usuario": rows[0]["id_usuario"],
+            "usuario_login": rows[0]["usuario_login"],
+            "hash_password": rows[0]["hash_password"],
+            "roles": frozenset(_canon(r["rol"]) for r in rows if r["rol"]),
+        }
+    _identidades.set(id_usuario, ident)
+    return ident
+
+def invalidar_identidad(id_usuario: int) -> None:
+    """Llamar cuando cambian los roles, el estado activo o los datos del usuario."""
+    _identidades.pop(id_usuario)
+
 def user_roles(id_usuario: int) -> Set[str]:
     """
     Devuelve el conjunto de nombres de rol ACTIVOS del usuario, en minúsculas.
-    Lee de usuario_rol + rol.
+    Sale de la identidad cacheada (usuario_rol + rol).
     """
-    roles: Set[str] = set()
     try:
-        cn = get_conn(); cur = cn.cursor()
-        cur.execute(
-            """
-            SELECT r.nombre
-            FROM usuario_rol ur
-            JOIN rol r ON r.id_rol = ur.id_rol
-            WHERE ur.id_usuario=%s AND r.activo=1
-            """,
-            (id_usuario,),
-        )
-        for (nombre,) in cur.fetchall():
-            roles.add(_canon(nombre))
-        cur.close(); cn.close()
+        ident = identidad(id_usuario)
     except Exception:
         # Si la DB no está disponible, devolvemos set() sin romper la app
         return set()
-    return roles
+    return set(ident["roles"]) if ident else set()
 
 def _ensure_roles_loaded() -> Set[str]:
     """Usa roles precargados en g si existen (app.before_request), si no los consulta."""
@@ -92,6 +121,8 @@ def has_role(name: str) -> bool:
     return _canon(name) in _ensure_roles_loaded()
 
 __all__ = [
+    "identidad",
+    "invalidar_identidad",
     "user_roles",
     "role_required",
     "roles_required",
@@ -0,0 +1,315 @@
+# python/bitacora.py
+"""
+Escritura diferida (write-behind) de `sesion` y `auditoria`.
+
+El request solo encola el evento (append a una deque, sin DB); un hilo de
+fondo lo escribe por lotes cada BITACORA_INTERVALO seg. o al juntar
+BITACORA_LOTE eventos: un executemany por tipo (mysql.connector lo convierte
+en un INSERT multi-fila) y un solo commit. Así la latencia del login no
+depende de la contención en esas tablas.
+
+- BITACORA_ASYNC=0 vuelve a escribir en el momento (mismo SQL).
+- BITACORA_MAX: eventos en memoria como máximo. Lleno -> al spool si hay,
+  si no se descarta el evento (contador `descartados`).
+- BITACORA_SPOOL: archivo local (JSON por línea) donde van los lotes que no
+  se pudieron escribir (DB caída, cola llena, apagado). Se reintenta desde ahí
+  y se vacía al arrancar el proceso siguiente. Mientras tenga algo, se vacía
+  antes de cada lote nuevo o el lote va detrás: se mantiene el orden.
+
+Como el INSERT de la sesión es diferido, la sesión se identifica por un
+`token` aleatorio puesto por la app (columna única), no por lastrowid. No
+sirve (id_usuario, inicio): dos logins del mismo usuario en el mismo segundo
+compartirían la clave y un logout cerraría los dos.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from mysql.connector import DataError, Error, IntegrityError, ProgrammingError
+
+from python.conexion import get_conn
+
+ASYNC     = bool(int(os.getenv("BITACORA_ASYNC", "1")))
+MAX       = int(os.getenv("BITACORA_MAX", "10000"))
+LOTE      = int(os.getenv("BITACORA_LOTE", "500"))
+INTERVALO = float(os.getenv("BITACORA_INTERVALO", "1"))
+SPOOL     = os.getenv("BITACORA_SPOOL", "")
+
+log = logging.getLogger(__name__)
+
+# tipo de evento -> SQL (en un lote se aplican en este orden: el cierre de una
+# sesión va después de su INSERT aunque ambos caigan en el mismo lote)
+_SQL = {
+    "sesion": """INSERT INTO sesion (id_usuario, token, inicio, ip, user_agent, estado)
+                 VALUES (%s, %s, %s, %s, %s, 'activa')""",
+    "auditoria": """INSERT INTO auditoria (id_usuario, id_sesion, entidad, entidad_id, accion,
+                                           resumen, antes_json, despues_json, fecha_hora)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+    "cierre": """UPDATE sesion SET fin=%s, estado='cerrada'
+                 WHERE token=%s AND id_usuario=%s AND estado='activa'""",
+}
+
+def ahora() -> str:
+    """Marca de tiempo en segundos (lo que guarda un DATETIME sin fracción)."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# ---------- cola y contadores ----------
+_cola: deque = deque()
+_cond = threading.Condition()
+_cont = {"encolados": 0, "escritos": 0, "descartados": 0, "al_spool": 0, "fallos": 0, "lotes": 0}
+_hilo: threading.Thread | None = None
+_pid = 0
+
+def _sumar(clave: str, n: int = 1) -> None:
+    with _cond:
+        _cont[clave] += n
+
+def estado() -> dict:
+    """Profundidad de la cola y contadores (para /metrics)."""
+    with _cond:
+        st = dict(_cont, cola=len(_cola))
+    st["spool"] = _lineas_spool()
+    return st
+
+# ---------- escritura ----------
+def _escribir(eventos: list) -> None:
+    """Un lote en una transacción. Lanza Error si la DB falla (el lote no se aplica)."""
+    por_tipo: dict = {t: [] for t in _SQL}
+    for tipo, params in eventos:
+        por_tipo[tipo].append(tuple(params))
+    cn = get_conn(); cur = cn.cursor()
+    try:
+        for tipo, filas in por_tipo.items():
+            if filas:
+                cur.executemany(_SQL[tipo], filas)
+        cn.commit()
+    except Exception:
+        cn.rollback()
+        raise
+    finally:
+        cur.close(); cn.close()
+
+class _Parcial(Error):
+    """La conexión falló a mitad de la escritura de a uno: los primeros `procesados` ya están."""
+    def __init__(self, procesados: int, escritos: int):
+        super().__init__(msg=f"lote cortado tras {procesados} eventos")
+        self.procesados, self.escritos = procesados, escritos
+
+def _escribir_lote(eventos: list) -> int:
+    """
+    Escribe el lote y devuelve cuántos eventos quedaron en la base. Si la base
+    lo rechaza por los datos (FK, largo, etc.) se reintenta de a uno y se
+    descartan solo los rechazados: un evento malo no traba la cola. Los
+    errores de conexión se propagan (el lote se reintenta después); si pasan
+    durante la escritura de a uno se lanza _Parcial con lo ya confirmado, para
+    no volver a insertarlo.
+    """
+    try:
+        _escribir(eventos)
+        return len(eventos)
+    except (IntegrityError, DataError, ProgrammingError):
+        if len(eventos) == 1:
+            log.warning("bitácora: evento descartado %r", eventos[0], exc_info=True)
+            _sumar("descartados")
+            return 0
+    escritos = 0
+    for i, ev in enumerate(eventos):
+        try:
+            escritos += _escribir_lote([ev])
+        except Error as err:
+            raise _Parcial(i, escritos) from err
+    return escritos
+
+def _hechos(err: Error) -> int:
+    """Eventos del lote que ya no hay que reintentar (cuenta los escritos)."""
+    if isinstance(err, _Parcial):
+        _sumar("escritos", err.escritos)
+        return err.procesados
+    return 0
+
+# ---------- spool ----------
+_spool_lock = threading.Lock()
+
+def _al_spool(eventos: list) -> bool:
+    if not SPOOL or not eventos:
+        return False
+    with _spool_lock:
+        with open(SPOOL, "a", encoding="utf-8") as f:
+            for tipo, params in eventos:
+                f.write(json.dumps([tipo, list(params)], ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    _sumar("al_spool", len(eventos))
+    return True
+
+def _lineas_spool() -> int:
+    n = 0
+    for ruta in ((SPOOL, SPOOL + ".enviando") if SPOOL else ()):
+        try:
+            with open(ruta, "rb") as f:
+                n += sum(1 for _ in f)
+        except OSError:
+            pass
+    return n
+
+def _hay_spool() -> bool:
+    return bool(SPOOL) and (os.path.exists(SPOOL) or os.path.exists(SPOOL + ".enviando"))
+
+def _reintentar_spool() -> None:
+    """
+    Escribe lo pendiente del spool, lo más viejo primero (.enviando y después
+    el spool); si la DB sigue caída queda donde estaba.
+    """
+    if not _hay_spool():
+        return
+    with _spool_lock:
+        tmp = SPOOL + ".enviando"
+        while True:
+            if not os.path.exists(tmp):
+                if not os.path.exists(SPOOL):
+                    return
+                os.replace(SPOOL, tmp)
+            _enviar_spool(tmp)
+
+def _enviar_spool(tmp: str) -> None:
+    """Escribe el archivo `tmp` por lotes y lo borra. Con _spool_lock tomado."""
+    eventos = []
+    with open(tmp, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                tipo, params = json.loads(linea)
+            except ValueError:
+                continue            # línea cortada por un apagado brusco
+            if tipo in _SQL:
+                eventos.append((tipo, params))
+    for i in range(0, len(eventos), LOTE):
+        try:
+            escritos = _escribir_lote(eventos[i:i + LOTE])
+        except Error as err:
+            resto = eventos[i + _hechos(err):]
+            with open(tmp, "w", encoding="utf-8") as f:     # solo lo que falta, sin duplicar
+                for tipo, params in resto:
+                    f.write(json.dumps([tipo, params], ensure_ascii=False) + "\n")
+            raise
+        _sumar("escritos", escritos)
+        _sumar("lotes")
+    os.remove(tmp)
+
+# ---------- hilo de fondo ----------
+def _vaciar(eventos: list) -> bool:
+    if _hay_spool():
+        # lo del spool es más viejo y va primero: un cierre de sesión no puede
+        # escribirse antes que su INSERT (el UPDATE no encontraría la fila)
+        try:
+            _reintentar_spool()
+        except (Error, OSError):
+            pass
+        if _hay_spool() and _al_spool(eventos):
+            return False
+    try:
+        escritos = _escribir_lote(eventos)
+    except Error as err:
+        _sumar("fallos")
+        log.warning("bitácora: no se pudo escribir un lote de %d eventos", len(eventos), exc_info=True)
+        resto = eventos[_hechos(err):]
+        if not _al_spool(resto):
+            _devolver(resto)
+        return False
+    _sumar("escritos", escritos)
+    _sumar("lotes")
+    return True
+
+def _devolver(eventos: list) -> None:
+    """Sin spool: el lote vuelve al frente de la cola (lo que no entra se descarta)."""
+    with _cond:
+        lugar = max(0, MAX - len(_cola))
+        _cola.extendleft(reversed(eventos[:lugar]))
+        _cont["descartados"] += len(eventos) - lugar
+
+def _sacar(n: int = LOTE) -> list:
+    with _cond:
+        return [_cola.popleft() for _ in range(min(n, len(_cola)))]
+
+def _bucle() -> None:
+    while True:
+        with _cond:
+            if len(_cola) < LOTE:
+                _cond.wait(INTERVALO)
+        lote = _sacar()
+        if lote:
+            if not _vaciar(lote):
+                time.sleep(INTERVALO)       # DB caída: no reintentar en seguida
+            continue
+        try:
+            _reintentar_spool()
+        except (Error, OSError):
+            pass
+
+def _asegurar_hilo() -> None:
+    """Arranca el escritor (uno por proceso; tras un fork se vuelve a crear)."""
+    global _hilo, _pid
+    if _hilo is not None and _pid == os.getpid():
+        return
+    with _cond:
+        if _hilo is None or _pid != os.getpid():
+            _pid = os.getpid()
+            _hilo = threading.Thread(target=_bucle, name="bitacora", daemon=True)
+            _hilo.start()
+
+def vaciar() -> None:
+    """Escribe ya todo lo encolado (pruebas, benchmarks). Corta si la DB falla."""
+    while True:
+        lote = _sacar()
+        if not lote or not _vaciar(lote):
+            return
+
+def _al_salir() -> None:
+    """Con spool, lo encolado va al archivo (rápido y durable); sin spool se intenta escribir."""
+    if SPOOL:
+        _al_spool(_sacar(len(_cola)))
+    else:
+        vaciar()
+
+atexit.register(_al_salir)
+
+# ---------- API ----------
+def _encolar(tipo: str, params: tuple) -> None:
+    if not ASYNC:
+        _sumar("escritos", _escribir_lote([(tipo, params)]))
+        return
+    _asegurar_hilo()
+    with _cond:
+        if len(_cola) < MAX:
+            _cola.append((tipo, params))
+            _cont["encolados"] += 1
+            if len(_cola) >= LOTE:
+                _cond.notify()
+            return
+    if not _al_spool([(tipo, params)]):
+        _sumar("descartados")
+
+def abrir_sesion(id_usuario: int, ip: str | None, user_agent: str | None) -> str:
+    """Registra el inicio de sesión y devuelve su `token` (clave para cerrarla)."""
+    token = uuid.uuid4().hex
+    _encolar("sesion", (int(id_usuario), token, ahora(), ip, (user_agent or "")[:255]))
+    return token
+
+def cerrar_sesion(id_usuario: int, token: str) -> None:
+    _encolar("cierre", (ahora(), token, int(id_usuario)))
+
+def auditar(entidad: str, accion: str, *, id_usuario: int | None = None, id_sesion: int | None = None,
+            entidad_id=None, resumen: str | None = None, antes=None, despues=None,
+            fecha_hora: str | None = None) -> None:
+    """Evento de auditoría; antes/despues se guardan como JSON si no son texto."""
+    def _json(v):
+        return v if v is None or isinstance(v, str) else json.dumps(v, ensure_ascii=False, default=str)
+    _encolar("auditoria", (id_usuario, id_sesion, entidad[:60], None if entidad_id is None else str(entidad_id)[:60],
+                           accion[:20], (resumen or "")[:255] or None, _json(antes), _json(despues),
+                           fecha_hora or ahora()))
@@ -0,0 +1,214 @@
+# python/busqueda.py
+"""
+Búsqueda de texto sobre las órdenes de trabajo: descripción de la orden,
+cliente (nombres, apellidos, identificación) y equipo (marca, modelo, IMEI,
+serie).
+
+Cada orden tiene un documento en `orden_busqueda` con el texto de las tres
+tablas ya unido, indexado con FULLTEXT en MySQL/MariaDB y con FTS5 en el
+backend SQLite. Encontrar candidatos es una sola consulta al índice, sin
+joins ni LIKE '%...%' sobre las tablas grandes.
+
+- indexar() va en la MISMA transacción que crea la orden (orden.crear);
+  reindexar() cuando se editan el cliente o el equipo.
+- reconstruir() rehace todo (migración, cargas masivas).
+- buscar(): todas las palabras deben aparecer (la última como prefijo).
+  Se toman las BUSQUEDA_CANDIDATOS coincidencias más recientes y solo esas
+  se ordenan por relevancia. Un IMEI, una cédula o un nombre poco común caen
+  completos dentro de esa ventana.
+  Costo: en SQLite FTS5 recorre el índice por rowid descendente y corta en
+  la ventana, así que queda acotado aunque un término esté en medio millón
+  de órdenes. En MySQL/MariaDB no: FULLTEXT entrega todas las coincidencias
+  y el servidor las ordena por id antes del LIMIT, de modo que el costo
+  crece con el número de coincidencias (la ventana solo acota el ranking
+  y la página). Términos muy comunes siguen siendo caros ahí.
+"""
+from __future__ import annotations
+import os
+import re
+from typing import Dict, List, Sequence
+
+from python.conexion import BACKEND, execute, get_conn, query_one
+from python import esquema
+
+CANDIDATOS   = int(os.getenv("BUSQUEDA_CANDIDATOS", "2000"))   # tope de resultados rankeados
+MIN_LARGO    = int(os.getenv("BUSQUEDA_MIN_LARGO", "3"))       # innodb_ft_min_token_size
+MAX_TERMINOS = 8
+
+_SQLITE = BACKEND == "sqlite"
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS orden_busqueda (
+      id_orden  INT  NOT NULL PRIMARY KEY,
+      texto     TEXT NOT NULL,
+      FULLTEXT KEY ft_orden_busqueda (texto)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+# SQLite: tabla virtual FTS5, rowid = id_orden; sin acentos como utf8mb4_general_ci
+DDL_SQLITE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS orden_busqueda
+    USING fts5(texto, tokenize='unicode61 remove_diacritics 2')
+"""
+
+# (versión del esquema, {clave: sql}); se reemplaza el par entero al cambiar
+_SQL: tuple = (None, {})
+
+def asegurar_tabla() -> None:
+    """
+    Crea orden_busqueda si no existe (misma DDL que database/orden_busqueda.sql)
+    y, si se acaba de crear, la llena con las órdenes que ya hay.
+    """
+    fila = query_one("""
+        SELECT COUNT(*) AS n FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = 'orden_busqueda'
+    """)
+    if fila and fila["n"]:
+        return
+    cn = get_conn(); cur = cn.cursor()
+    try:
+        cur.execute(DDL_SQLITE if _SQLITE else DDL)
+        reconstruir(cur)
+        cn.commit()
+    finally:
+        cur.close(); cn.close()
+
+def _sentencias() -> Dict[tuple, str]:
+    """Sentencias armadas para la versión actual del esquema."""
+    global _SQL
+    ver = esquema.version()
+    vigente, sentencias = _SQL
+    if vigente != ver:
+        sentencias = {}
+        _SQL = (ver, sentencias)
+    return sentencias
+
+# ---------- documentos ----------
+def _texto() -> str:
+    """Expresión con el texto de la orden (alias o, c, e) según las columnas reales."""
+    from python.orden import _equipo_cols, _orden_cols      # diferido: orden importa este módulo
+    desc = _orden_cols()["desc_col"]
+    imei, serie, modelo = _equipo_cols()
+    ccols, ecols = esquema.nombres("cliente"), esquema.nombres("equipo")
+    partes  = [f"o.{desc}"] if desc else []
+    partes += [f"c.{x}" for x in ("nombres", "apellidos", "identificacion", "cedula") if x in ccols]
+    partes += [f"e.{x}" for x in ("marca", modelo, imei, serie) if x and x in ecols]
+    # CONCAT_WS salta los NULL (CONCAT daría NULL con uno solo)
+    return f"CONCAT_WS(' ', {', '.join(partes)})" if partes else "''"
+
+_POR = {
+    "orden":   "WHERE o.id_orden = %s",
+    "cliente": "WHERE o.id_cliente = %s",
+    "equipo":  "WHERE o.id_equipo = %s",
+    "todas":   "",
+}
+
+def _sql_documentos(por: str) -> str:
+    sentencias = _sentencias()
+    clave = ("documentos", por)
+    sql = sentencias.get(clave)
+    if sql is None:
+        select = f"""
+            SELECT o.id_orden, {_texto()}
+            FROM orden_trabajo o
+            JOIN cliente c ON c.id_cliente = o.id_cliente
+            LEFT JOIN equipo e ON e.id_equipo = o.id_equipo
+            {_POR[por]}
+        """
+        if _SQLITE:
+            sql = f"INSERT OR REPLACE INTO orden_busqueda (rowid, texto) {select}"
+        else:
+            sql = f"INSERT INTO orden_busqueda (id_orden, texto) {select} ON DUPLICATE KEY UPDATE texto=VALUES(texto)"
+        sentencias[clave] = sql
+    return sql
+
+def indexar(id_orden: int, cur=None) -> None:
+    """
+    (Re)escribe el documento de la orden. Con `cur` usa esa transacción; sin
+    él, la conexión del request (se confirma con el resto del request).
+    """
+    reindexar("orden", id_orden, cur)
+
+def reindexar(por: str, id_: int, cur=None) -> None:
+    """Documentos de las órdenes de un cliente o equipo (por = 'cliente' | 'equipo' | 'orden')."""
+    if not id_:
+        return
+    if cur is not None:
+        cur.execute(_sql_documentos(por), (id_,))
+    else:
+        execute(_sql_documentos(por), (id_,))
+
+def reconstruir(cur) -> int:
+    """Reescribe el documento de TODAS las órdenes en una sola sentencia."""
+    cur.execute(_sql_documentos("todas"))
+    n = cur.rowcount
+    if _SQLITE:
+        # FTS5 deja la carga en muchos segmentos; fundirlos acelera las consultas
+        cur.execute("INSERT INTO orden_busqueda (orden_busqueda) VALUES ('optimize')")
+    return n
+
+# ---------- consultas ----------
+_RE_TERMINO = re.compile(r"\w+")
+
+def terminos(q: str) -> List[str]:
+    """Palabras de la búsqueda que el índice puede encontrar (las cortas no se indexan)."""
+    return [t for t in _RE_TERMINO.findall((q or "").lower()) if len(t) >= MIN_LARGO][:MAX_TERMINOS]
+
+def consulta(q: str) -> str | None:
+    """
+    'luis moja' -> '+luis +moja*' (MySQL, modo booleano) o '"luis" "moja"*'
+    (FTS5). Solo la última palabra es prefijo (la que se está escribiendo):
+    un prefijo junta las listas de todas las palabras que empiezan así.
+    """
+    ts = terminos(q)
+    if not ts:
+        return None
+    fmt = '"{}"' if _SQLITE else "+{}"
+    return " ".join(fmt.format(t) + ("*" if i == len(ts) - 1 else "") for i, t in enumerate(ts))
+
+def _sql_buscar(where: tuple) -> str:
+    """
+    Ventana de candidatos: las CANDIDATOS coincidencias más recientes (con
+    los filtros del listado en `where`, alias o) y, de ellas, la página por
+    relevancia. En MySQL el ORDER BY b.id_orden DESC ordena todas las
+    coincidencias antes del LIMIT (ver el docstring del módulo).
+    """
+    sentencias = _sentencias()
+    clave = ("buscar",) + where
+    sql = sentencias.get(clave)
+    if sql is None:
+        if _SQLITE:
+            cand = """SELECT orden_busqueda.rowid AS id_orden, -bm25(orden_busqueda) AS score
+                      FROM orden_busqueda {join}
+                      WHERE orden_busqueda MATCH %s {filtros}
+                      ORDER BY orden_busqueda.rowid DESC"""
+            join = "JOIN orden_trabajo o ON o.id_orden = orden_busqueda.rowid"
+        else:
+            cand = """SELECT b.id_orden, MATCH(b.texto) AGAINST (%s IN BOOLEAN MODE) AS score
+                      FROM orden_busqueda b {join}
+                      WHERE MATCH(b.texto) AGAINST (%s IN BOOLEAN MODE) {filtros}
+                      ORDER BY b.id_orden DESC"""
+            join = "JOIN orden_trabajo o ON o.id_orden = b.id_orden"
+        cand = cand.format(join=join if where else "",
+                           filtros="".join(f" AND {w}" for w in where))
+        sql = sentencias[clave] = f"""
+            SELECT id_orden, score FROM ({cand} LIMIT %s) t
+            ORDER BY score DESC, id_orden DESC
+            LIMIT %s OFFSET %s
+        """
+    return sql
+
+def buscar(cur, q: str, where: Sequence[str] = (), params: Sequence = (),
+           limite: int = 50, desplazamiento: int = 0) -> list:
+    """
+    [{id_orden, score}] de mayor a menor relevancia. `where`/`params`:
+    condiciones extra sobre orden_trabajo (alias o), como las del listado.
+    Sin términos válidos devuelve [].
+    """
+    texto = consulta(q)
+    if texto is None or desplazamiento >= CANDIDATOS:
+        return []
+    sql = _sql_buscar(tuple(where))
+    coincide = (texto,) if _SQLITE else (texto, texto)
+    cur.execute(sql, coincide + tuple(params) + (CANDIDATOS, limite, desplazamiento))
+    return cur.fetchall()
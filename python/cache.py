@@ -0,0 +1,68 @@
+# python/cache.py
+"""
+Cache en memoria acotado (LRU) con vencimiento opcional, seguro entre hilos.
+Cada instancia queda registrada para poder reportar aciertos/fallos.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List
+
+_FALTA = object()
+_registro: List["CacheLRU"] = []
+
+class CacheLRU:
+    def __init__(self, nombre: str, maximo: int = 128, ttl: float | None = None):
+        self.nombre = nombre
+        self.maximo = max(1, maximo)
+        self.ttl = ttl                      # seg.; None = sin vencimiento
+        self._datos: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        _registro.append(self)
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._datos.get(clave, _FALTA)
+            if item is not _FALTA:
+                vence, valor = item
+                if vence >= time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+            self.fallos += 1
+            return default
+
+    def set(self, clave: Hashable, valor: Any) -> None:
+        vence = time.monotonic() + self.ttl if self.ttl else float("inf")
+        with self._lock:
+            self._datos[clave] = (vence, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def pop(self, clave: Hashable) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def borrar_si(self, pred: Callable[[Hashable], bool]) -> None:
+        """Elimina las claves para las que pred(clave) es True."""
+        with self._lock:
+            for k in [k for k in self._datos if pred(k)]:
+                del self._datos[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"nombre": self.nombre, "tamano": len(self._datos),
+                    "aciertos": self.aciertos, "fallos": self.fallos}
+
+def todas() -> List[CacheLRU]:
+    """Caches creados en el proceso (para diagnóstico/métricas)."""
+    return list(_registro)
@@ -1,13 +1,13 @@
 # python/cat_servicio.py
 from __future__ import annotations
 from dataclasses import dataclass
-import re
-from typing import Any, Dict, List
+from typing import List
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from flask_login import login_required, current_user
 
-from python.conexion import query, query_one, execute
+from python.conexion import query_one, execute, al_confirmar
+from python import esquema, fk_opciones, codec, catalogo
 
 bp = Blueprint("cat_servicio", __name__, template_folder="../templates")
 
@@ -15,10 +15,6 @@ TABLE = "cat_servicio"
 AUDIT_COLS = {"creado_en", "creado_por", "actualizado_en", "actualizado_por"}
 
 # ---------- infra mínima ----------
-def _db() -> str:
-    r = query_one("SELECT DATABASE() AS db")
-    return r["db"]
-
 @dataclass
 class Col:
     name: str
@@ -32,15 +28,6 @@ class Col:
         return "auto_increment" in (self.extra or "").lower()
 
 def _columns() -> List[Col]:
-    rows = query(
-        """
-        SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, EXTRA
-        FROM information_schema.columns
-        WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s
-        ORDER BY ORDINAL_POSITION
-        """,
-        (_db(), TABLE),
-    )
     return [
         Col(
             name=r["COLUMN_NAME"],
@@ -49,75 +36,11 @@ def _columns() -> List[Col]:
             is_nullable=(r["IS_NULLABLE"] == "YES"),
             extra=(r["EXTRA"] or ""),
         )
-        for r in rows
+        for r in esquema.columnas(TABLE)
     ]
 
 def _pk() -> str | None:
-    r = query_one(
-        """
-        SELECT k.COLUMN_NAME AS pk
-        FROM information_schema.table_constraints t
-        JOIN information_schema.key_column_usage k
-          ON t.CONSTRAINT_NAME=k.CONSTRAINT_NAME
-         AND t.TABLE_SCHEMA=k.TABLE_SCHEMA
-         AND t.TABLE_NAME=k.TABLE_NAME
-        WHERE t.TABLE_SCHEMA=%s AND t.TABLE_NAME=%s AND t.CONSTRAINT_TYPE='PRIMARY KEY'
-        LIMIT 1
-        """,
-        (_db(), TABLE),
-    )
-    return r["pk"] if r else None
-
-def _spec(col: Col) -> Dict[str, Any]:
-    """Input spec para el form."""
-    dt, ctype = col.data_type, col.column_type
-    spec = {"kind": "input", "type": "text", "step": None, "is_ai": col.is_ai}
-    if dt in ("tinyint","smallint","mediumint","int","bigint"):
-        if dt == "tinyint" and re.match(r"tinyint\(1\)", ctype or ""):
-            spec["kind"] = "checkbox"; spec["type"] = None
-        else:
-            spec["type"] = "number"
-    elif dt in ("decimal","float","double"):
-        spec["type"] = "number"; spec["step"] = "any"
-    elif dt == "date":
-        spec["type"] = "date"
-    elif dt in ("datetime","timestamp"):
-        spec["type"] = "datetime-local"
-    elif dt.endswith("text"):
-        spec["kind"] = "textarea"; spec["type"] = None
-    elif (ctype or "").startswith("enum("):
-        spec["kind"] = "select"
-        spec["options"] = [s.strip().strip("'") for s in ctype[5:-1].split(",")]
-    return spec
-
-def _to_form(col: Col, val: Any) -> Any:
-    if val is None: return ""
-    if col.data_type in ("datetime","timestamp"):
-        return str(val).replace(" ", "T")[:16]
-    if col.data_type == "tinyint" and re.match(r"tinyint\(1\)", col.column_type or ""):
-        return bool(val)
-    return val
-
-def _from_form(col: Col, form) -> Any:
-    raw = form.get(col.name)
-
-    # checkbox
-    if col.data_type == "tinyint" and re.match(r"tinyint\(1\)", col.column_type or ""):
-        return 1 if form.get(col.name) in ("on","1","true","True") else 0
-
-    if raw in (None, ""):
-        return None if col.is_nullable else ""
-
-    if col.data_type in ("tinyint","smallint","mediumint","int","bigint"):
-        try: return int(raw)
-        except: return 0
-    if col.data_type in ("decimal","float","double"):
-        try: return float(raw)
-        except: return 0.0
-    if col.data_type in ("date","datetime","timestamp"):
-        if "T" in raw: raw = raw.replace("T", " ") + ":00"
-        return raw
-    return raw
+    return esquema.pk(TABLE)
 
 # ---------- vistas ----------
 @bp.get("/")
@@ -131,10 +54,9 @@ def form():
     if record_id and pk:
         row = query_one(f"SELECT * FROM `{TABLE}` WHERE `{pk}`=%s", (record_id,))
         if not row: abort(404, "Registro no encontrado.")
-        for c in cols:
-            values[c.name] = _to_form(c, row[c.name])
+        values = codec.a_form(TABLE, row)
 
-    specs = {c.name: _spec(c) for c in cols}
+    specs = codec.specs(TABLE)   # precompiladas por columna
     mode = "edit" if record_id else "create"
     return render_template(
         "form_cat_servicio.html",
@@ -151,7 +73,8 @@ def guardar():
 
     edit_cols = [c for c in cols if (not c.is_ai) and (c.name not in AUDIT_COLS)]
     names = [c.name for c in edit_cols]
-    vals  = [_from_form(c, request.form) for c in edit_cols]
+    cc = codec.tabla(TABLE)
+    vals  = [cc[c.name].a_sql(request.form) for c in edit_cols]
 
     try:
         if record_id and pk:
@@ -160,6 +83,8 @@ def guardar():
                 sets += ", `actualizado_por`=%s"
                 vals.append(int(current_user.id))
             execute(f"UPDATE `{TABLE}` SET {sets} WHERE `{pk}`=%s", tuple(vals + [record_id]))
+            al_confirmar(lambda: fk_opciones.invalidar(TABLE))
+            al_confirmar(lambda: catalogo.invalidar(TABLE))
             flash("Catálogo de servicio actualizado.", "success")
         else:
             ins_names = list(names)
@@ -170,6 +95,8 @@ def guardar():
             cols_sql = ", ".join(f"`{n}`" for n in ins_names)
             ph = ", ".join(["%s"] * len(ins_vals))
             _, new_id = execute(f"INSERT INTO `{TABLE}` ({cols_sql}) VALUES ({ph})", tuple(ins_vals))
+            al_confirmar(lambda: fk_opciones.invalidar(TABLE))
+            al_confirmar(lambda: catalogo.invalidar(TABLE))
             flash(f"Catálogo de servicio creado (ID {new_id}).", "success")
     except Exception as e:
         flash(f"No se pudo guardar: {e}", "danger")
@@ -0,0 +1,105 @@
+# python/catalogo.py
+"""
+Catálogos de servicios (cat_servicio) y repuestos (repuesto) en memoria.
+
+Cada tabla se guarda como {id: {"id", "d", "t", "p", "activo"}} más la lista
+de activos ordenada por etiqueta (para los <select>). "d" es la etiqueta del
+<select> (nombre primero) y "t" el texto que va a la línea de detalle cuando
+no se escribe uno (descripción primero, como antes del cache). Se recarga:
+  - al escribir desde la app (invalidar(tabla), después del commit), o
+  - cuando vence CATALOGO_TTL (cambios hechos fuera de la app), o
+  - cuando cambia la versión del esquema.
+
+Los dicts que se devuelven son compartidos: tratarlos como solo lectura.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+from python.conexion import query
+from python import esquema
+
+TTL = int(os.getenv("CATALOGO_TTL", "300"))
+
+# tabla -> (candidatas etiqueta, candidatas texto de línea, candidatas precio)
+_TABLAS = {
+    "cat_servicio": (["nombre", "descripcion"], ["descripcion", "nombre"],
+                     ["precio_base", "precio_ref", "precio_unitario", "precio", "valor", "monto"]),
+    "repuesto":     (["nombre", "descripcion"], ["descripcion", "nombre"],
+                     ["precio_unitario", "precio_base", "precio", "valor", "monto"]),
+}
+
+class _Tabla:
+    def __init__(self, items: Dict[Any, Dict[str, Any]], version_esquema: int, version: int):
+        self.items = items
+        self.activos: List[Dict[str, Any]] = sorted(
+            (i for i in items.values() if i["activo"]), key=lambda i: str(i["d"] or ""))
+        self.version_esquema = version_esquema
+        self.version = version
+        self.cargado_en = time.monotonic()
+
+_tablas: Dict[str, _Tabla] = {}
+_version = 0
+_lock = threading.Lock()
+
+def _first(cols: set[str], candidates: list[str]) -> str | None:
+    return next((c for c in candidates if c in cols), None)
+
+def _leer(tabla: str) -> _Tabla:
+    global _version
+    ver = esquema.version()
+    cols = esquema.nombres(tabla)
+    items: Dict[Any, Dict[str, Any]] = {}
+    idc = esquema.pk(tabla) or _first(cols, [f"id_{tabla}", "id_servicio", "id_repuesto"])
+    if cols and idc:
+        etiquetas, textos, precios = _TABLAS[tabla]
+        label = _first(cols, etiquetas) or idc
+        texto = _first(cols, textos) or idc
+        price = _first(cols, precios)
+        sel = [f"`{idc}` AS id", f"`{label}` AS d", f"`{texto}` AS t",
+               f"`{price}` AS p" if price else "0 AS p",
+               "`activo` AS activo" if "activo" in cols else "1 AS activo"]
+        for r in query(f"SELECT {', '.join(sel)} FROM `{tabla}`"):
+            r["activo"] = bool(r["activo"])
+            items[r["id"]] = r
+    _version += 1
+    return _Tabla(items, ver, _version)
+
+def _tabla(tabla: str) -> _Tabla:
+    t = _tablas.get(tabla)
+    if (t is not None and time.monotonic() - t.cargado_en < TTL
+            and t.version_esquema == esquema.version()):
+        return t
+    with _lock:
+        t = _tablas.get(tabla)
+        if (t is None or time.monotonic() - t.cargado_en >= TTL
+                or t.version_esquema != esquema.version()):
+            t = _tablas[tabla] = _leer(tabla)
+        return t
+
+# ---------- API ----------
+def cargar() -> None:
+    """Carga ambos catálogos. Se llama al arrancar la app."""
+    with _lock:
+        for tabla in _TABLAS:
+            _tablas[tabla] = _leer(tabla)
+
+def invalidar(tabla: str | None = None) -> None:
+    """Descarta un catálogo (o todos); la próxima lectura lo recarga."""
+    with _lock:
+        for t in ([tabla] if tabla else list(_tablas)):
+            _tablas.pop(t, None)
+
+def activos(tabla: str) -> List[Dict[str, Any]]:
+    """Ítems activos [{id, d, t, p, activo}] ordenados por etiqueta."""
+    return _tabla(tabla).activos
+
+def item(tabla: str, id_) -> Dict[str, Any] | None:
+    """Un ítem por id (activo o no) o None."""
+    return _tabla(tabla).items.get(id_)
+
+def version(tabla: str) -> int:
+    """Cambia cada vez que el catálogo se recarga."""
+    return _tabla(tabla).version
@@ -0,0 +1,132 @@
+# python/codec.py
+"""
+Tabla precompilada por columna para los formularios genéricos.
+
+Por cada (versión del esquema, tabla) se clasifica UNA vez cada columna
+(checkbox, entero, decimal, fecha, texto, enum...) y se guardan:
+  - spec:    dict base del widget (kind, type, step, options, is_ai, nullable)
+  - a_form:  valor de la DB -> valor para el <input>
+  - a_sql:   request.form   -> valor para el INSERT/UPDATE
+Así armar o leer un formulario no hace regex ni comparaciones de tipo.
+"""
+from __future__ import annotations
+import re
+from typing import Any, Callable, Dict
+
+from python import esquema
+
+_ENTEROS = ("tinyint", "smallint", "mediumint", "int", "bigint")
+_DECIMALES = ("decimal", "float", "double")
+_SI = frozenset(("on", "1", "true", "True"))
+_RE_BOOL = re.compile(r"tinyint\(1\)")
+_RE_ENUM = re.compile(r"enum\((.+)\)")
+
+class Columna:
+    __slots__ = ("name", "nullable", "is_ai", "spec", "a_form", "a_sql")
+
+    def __init__(self, name: str, nullable: bool, is_ai: bool, spec: Dict[str, Any],
+                 a_form: Callable[[Any], Any], a_sql: Callable[[Any], Any]):
+        self.name = name
+        self.nullable = nullable
+        self.is_ai = is_ai
+        self.spec = spec            # compartido: usar nuevo_spec() si se va a modificar
+        self.a_form = a_form
+        self.a_sql = a_sql
+
+    def nuevo_spec(self) -> Dict[str, Any]:
+        return dict(self.spec)
+
+# ---------- conversores ----------
+def _form_igual(v):
+    return "" if v is None else v
+
+def _form_bool(v):
+    return "" if v is None else bool(v)
+
+def _form_fecha_hora(v):
+    return "" if v is None else str(v).replace(" ", "T")[:16]   # yyyy-mm-ddThh:mm
+
+def _sql_checkbox(name: str):
+    def conv(form):
+        return 1 if form.get(name) in _SI else 0
+    return conv
+
+def _sql_valor(name: str, nullable: bool, parse: Callable[[str], Any] | None):
+    vacio = None if nullable else ""
+    def conv(form):
+        raw = form.get(name)
+        if raw is None or raw == "":
+            return vacio
+        return parse(raw) if parse else raw
+    return conv
+
+def _a_int(raw: str):
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return 0
+
+def _a_float(raw: str):
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _a_fecha(raw: str):
+    return raw.replace("T", " ") + ":00" if "T" in raw else raw
+
+# ---------- compilación ----------
+def _compilar(col: Dict[str, Any]) -> Columna:
+    name  = col["COLUMN_NAME"]
+    dt    = (col["DATA_TYPE"] or "").lower()
+    ctype = (col["COLUMN_TYPE"] or "").lower()
+    nullable = col["IS_NULLABLE"] == "YES"
+    is_ai = "auto_increment" in (col["EXTRA"] or "").lower()
+
+    spec = {"kind": "input", "type": "text", "step": None, "options": None,
+            "is_ai": is_ai, "nullable": nullable}
+    a_form, parse = _form_igual, None
+
+    if dt in _ENTEROS:
+        if dt == "tinyint" and _RE_BOOL.match(ctype):
+            spec["kind"], spec["type"] = "checkbox", None
+            return Columna(name, nullable, is_ai, spec, _form_bool, _sql_checkbox(name))
+        spec["type"], parse = "number", _a_int
+    elif dt in _DECIMALES:
+        spec["type"], spec["step"], parse = "number", "any", _a_float
+    elif dt == "date":
+        spec["type"], parse = "date", _a_fecha
+    elif dt in ("datetime", "timestamp"):
+        spec["type"], parse, a_form = "datetime-local", _a_fecha, _form_fecha_hora
+    elif dt.endswith("text"):
+        spec["kind"], spec["type"] = "textarea", None
+    elif ctype.startswith("enum("):
+        m = _RE_ENUM.match(ctype)
+        spec["kind"], spec["type"] = "select", None
+        spec["options"] = [s.strip().strip("'") for s in m.group(1).split(",")] if m else []
+    return Columna(name, nullable, is_ai, spec, a_form, _sql_valor(name, nullable, parse))
+
+# (versión del esquema, {tabla: columnas}); al cambiar la versión se reemplaza
+# el par entero, sin vaciar el dict que otro hilo puede estar leyendo.
+_tablas: tuple = (None, {})
+
+def tabla(nombre: str) -> Dict[str, Columna]:
+    """{columna: Columna} en orden, compilado una vez por versión del esquema."""
+    global _tablas
+    ver = esquema.version()
+    vigente, compiladas = _tablas
+    if vigente != ver:
+        compiladas = {}
+        _tablas = (ver, compiladas)
+    cols = compiladas.get(nombre)
+    if cols is None:
+        cols = compiladas[nombre] = {c["COLUMN_NAME"]: _compilar(c) for c in esquema.columnas(nombre)}
+    return cols
+
+def specs(nombre: str) -> Dict[str, Dict[str, Any]]:
+    """Specs nuevos (modificables) de todas las columnas."""
+    return {n: c.nuevo_spec() for n, c in tabla(nombre).items()}
+
+def a_form(nombre: str, fila: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila de la DB -> valores del formulario."""
+    return {n: c.a_form(fila[n]) for n, c in tabla(nombre).items()}
@@ -1,7 +1,18 @@
 # python/conexion.py
+import logging
 import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
 import mysql.connector
+from mysql.connector import errors
+from flask import g, has_request_context
 
 # ===== Configuración (usa .env si existe; si no, defaults que tú pediste) =====
 HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
@@ -19,14 +30,304 @@ CFG = dict(
     autocommit=False,
 )
 
+# ===== Pool de conexiones =====
+POOL_SIZE         = int(os.getenv("DB_POOL_SIZE", "5"))            # conexiones que se mantienen abiertas
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))   # extra temporales en picos
+POOL_TIMEOUT      = float(os.getenv("DB_POOL_TIMEOUT", "10"))      # seg. de espera por una libre
+POOL_RECYCLE      = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # vida máxima (seg.); 0 = sin límite
+POOL_PRE_PING     = bool(int(os.getenv("DB_POOL_PRE_PING", "1")))  # ping al prestar
+
+# ===== Backend =====
+# mysql (por defecto) | sqlite: base local sin servidor para pruebas y benchmarks
+# (ver python/conexion_sqlite.py; DB_SQLITE_RUTA=":memory:" o un archivo).
+BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+if BACKEND == "sqlite":
+    from python import conexion_sqlite
+    _conectar = conexion_sqlite.connect
+    CFG = dict(ruta=os.getenv("DB_SQLITE_RUTA", ":memory:"), database=DATABASE,
+               esquema=os.getenv("DB_SQLITE_ESQUEMA", conexion_sqlite.ESQUEMA),
+               timeout=POOL_TIMEOUT)
+else:
+    _conectar = mysql.connector.connect
+
+class PoolAgotado(errors.PoolError, errors.InterfaceError):
+    """No hubo conexión libre dentro de DB_POOL_TIMEOUT."""
+
+# ===== Observadores de sentencias (instrumentación) =====
+# Con la lista vacía los cursores son los de mysql.connector, sin envoltura.
+_observadores: list = []
+
+def agregar_observador(fn) -> None:
+    """
+    fn(ev) se llama tras cada execute/executemany con un dict
+    {sql, norm, params, ms, filas, muchos}. `filas` y `ms` se actualizan al
+    leer resultados (fetch*), así que quien guarde `ev` ve los valores finales.
+    """
+    if fn not in _observadores:
+        _observadores.append(fn)
+
+_RE_CADENA = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA  = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)")
+_RE_BLANCO = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def normalizar(sql: str) -> str:
+    """Texto de la sentencia sin literales ni espacios de más (agrupa por "forma")."""
+    t = _RE_CADENA.sub("?", sql)
+    t = _RE_NUMERO.sub("?", t)
+    t = _RE_BLANCO.sub(" ", t).strip()
+    return _RE_LISTA.sub("(?)", t)
+
+class _CursorMedido:
+    """
+    Cursor que mide cada sentencia y avisa a los observadores.
+
+    Los cursores de mysql.connector no son buffered: una consulta puede tardar
+    más leyendo las filas que en execute(). Por eso el aviso de una sentencia
+    con resultado va cuando se consumió (fetchall, el fetch que llega al final,
+    close() o el siguiente execute), con el tiempo de lectura ya sumado.
+    """
+    def __init__(self, cur):
+        self._cur = cur
+        self._ev = None
+        self._leidas = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        while True:
+            fila = self.fetchone()
+            if fila is None:
+                return
+            yield fila
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            self._avisar()
+        except Exception:
+            pass
+
+    def _avisar(self):
+        ev, self._ev = self._ev, None
+        if ev is None:
+            return
+        for fn in _observadores:
+            try:
+                fn(ev)
+            except Exception:
+                pass    # la instrumentación nunca rompe una consulta
+
+    def _medir(self, metodo, sql, params, muchos: bool):
+        self._avisar()          # la anterior ya terminó
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            res = metodo(sql, params)
+            ok = True
+            return res
+        finally:
+            rc = self._cur.rowcount
+            self._leidas = 0
+            self._ev = {"sql": sql, "norm": normalizar(sql), "params": params,
+                        "ms": (time.perf_counter() - t0) * 1000.0,
+                        "filas": rc if rc is not None and rc >= 0 else 0,
+                        "muchos": muchos}
+            if not ok or self._cur.description is None:     # error o sin filas que leer
+                self._avisar()
+
+    def execute(self, sql, params=()):
+        return self._medir(self._cur.execute, sql, params, False)
+
+    def executemany(self, sql, seq_params):
+        return self._medir(self._cur.executemany, sql, seq_params, True)
+
+    def _leer(self, metodo, *args, fin):
+        t0 = time.perf_counter()
+        try:
+            res = metodo(*args)
+        except Exception:
+            self._avisar()
+            raise
+        ev = self._ev
+        if ev is not None:
+            ev["ms"] += (time.perf_counter() - t0) * 1000.0
+            self._leidas += len(res) if isinstance(res, list) else res is not None
+            ev["filas"] = max(ev["filas"], self._leidas)
+            if fin(res):
+                self._avisar()
+        return res
+
+    def fetchall(self):
+        return self._leer(self._cur.fetchall, fin=lambda res: True)
+
+    def fetchone(self):
+        return self._leer(self._cur.fetchone, fin=lambda res: res is None)
+
+    def fetchmany(self, size=1):
+        return self._leer(self._cur.fetchmany, size, fin=lambda res: len(res) < size)
+
+    def close(self):
+        self._avisar()
+        return self._cur.close()
+
+class _ConexionPool:
+    """
+    Envoltura de una conexión prestada por el pool.
+    Se usa igual que la de mysql.connector; close() la devuelve al pool.
+    """
+    def __init__(self, pool: "_Pool", raw, creada_en: float):
+        self._pool = pool
+        self._raw = raw
+        self._creada_en = creada_en
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise errors.InterfaceError("La conexión ya fue devuelta al pool.")
+        return getattr(raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cur = self.__getattr__("cursor")(*args, **kwargs)
+        return _CursorMedido(cur) if _observadores else cur
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._devolver(raw, self._creada_en)
+
+    def __del__(self):
+        # Si alguien olvidó cerrar, liberamos el cupo sin reutilizar la conexión
+        raw = self.__dict__.get("_raw")
+        if raw is not None:
+            self._raw = None
+            self._pool._descartar(raw)
+
+class _Pool:
+    def __init__(self, conectar, cfg: dict, size: int, max_overflow: int,
+                 timeout: float, recycle: int, pre_ping: bool):
+        self.conectar = conectar
+        self.cfg = cfg
+        self.size = max(1, size)
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._libres: deque = deque()      # (raw, creada_en); LIFO para reusar las "calientes"
+        self._abiertas = 0
+        self._esperas = 0
+        self._cond = threading.Condition()
+
+    # --- ciclo de vida ---
+    def _nueva(self):
+        return self.conectar(**self.cfg)
+
+    def _vencida(self, creada_en: float) -> bool:
+        return bool(self.recycle) and (time.monotonic() - creada_en) > self.recycle
+
+    def _cerrar(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _descartar(self, raw):
+        self._cerrar(raw)
+        with self._cond:
+            self._abiertas -= 1
+            self._cond.notify()
+
+    def obtener(self) -> _ConexionPool:
+        limite = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._libres:
+                    raw, creada_en = self._libres.pop()
+                    break
+                if self._abiertas < self.size + self.max_overflow:
+                    self._abiertas += 1
+                    raw, creada_en = None, 0.0
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PoolAgotado(
+                        f"Pool agotado: {self._abiertas} conexiones en uso (espera {self.timeout}s)."
+                    )
+                self._esperas += 1
+                self._cond.wait(restante)
+
+        # Conexión reutilizada: verificar vida máxima y salud antes de prestarla
+        if raw is not None and (self._vencida(creada_en) or not self._sana(raw)):
+            self._cerrar(raw)
+            raw = None
+
+        if raw is None:
+            try:
+                raw = self._nueva()
+            except Exception:
+                with self._cond:
+                    self._abiertas -= 1
+                    self._cond.notify()
+                raise
+            creada_en = time.monotonic()
+        return _ConexionPool(self, raw, creada_en)
+
+    def _sana(self, raw) -> bool:
+        if not self.pre_ping:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _devolver(self, raw, creada_en: float):
+        # Nunca devolver una transacción abierta ni resultados sin leer
+        try:
+            if raw.unread_result or raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._descartar(raw)
+            return
+        with self._cond:
+            if len(self._libres) < self.size and not self._vencida(creada_en):
+                self._libres.append((raw, creada_en))
+                self._cond.notify()
+                return
+        self._descartar(raw)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "abiertas": self._abiertas,
+                "libres": len(self._libres),
+                "en_uso": self._abiertas - len(self._libres),
+                "esperas": self._esperas,
+            }
+
+_pool = _Pool(_conectar, CFG, POOL_SIZE, POOL_MAX_OVERFLOW, POOL_TIMEOUT, POOL_RECYCLE, POOL_PRE_PING)
+
 def get_conn():
-    """Crea una conexión nueva (se abre al llamar y la cierras luego)."""
-    return mysql.connector.connect(**CFG)
+    """Presta una conexión del pool (al llamar close() vuelve al pool)."""
+    return _pool.obtener()
+
+def pool_stats() -> dict:
+    """Estado del pool: abiertas, libres, en uso y esperas acumuladas."""
+    return _pool.stats()
 
 @contextmanager
 def connect(dict_rows: bool = False):
     """
-    Context manager que abre conexión y cursor, y los cierra solo.
+    Context manager que toma conexión del pool y abre cursor; los libera solo.
     dict_rows=True => filas como dict (columnas por nombre).
     Uso:
         with connect(True) as (cn, cur):
@@ -47,23 +348,111 @@ def connect(dict_rows: bool = False):
         finally:
             cn.close()
 
+# ===== Conexión por request (Flask) =====
+class _ConexionCompartida:
+    """Conexión del request actual; close() no hace nada (la libera el teardown)."""
+    def __init__(self, cn):
+        self._cn = cn
+
+    def __getattr__(self, name):
+        return getattr(self._cn, name)
+
+    def close(self):
+        pass
+
+def _conn_de_request():
+    cn = g.get("_db_conn")
+    if cn is None:
+        cn = g._db_conn = get_conn()   # se abre perezosamente, una vez por request
+    return cn
+
+def request_conn():
+    """
+    Dentro de un request: la conexión compartida del request (close() es opcional).
+    Fuera de un request: una conexión normal del pool.
+    """
+    if has_request_context():
+        return _ConexionCompartida(_conn_de_request())
+    return get_conn()
+
+@contextmanager
+def _cursor(dict_rows: bool = False, buffered: bool = False):
+    """Cursor sobre la conexión del request si existe; si no, usa connect()."""
+    if not has_request_context():
+        with connect(dict_rows) as (cn, cur):
+            yield cn, cur
+        return
+    cn = _conn_de_request()
+    cur = cn.cursor(dictionary=dict_rows, buffered=buffered)
+    try:
+        yield cn, cur
+    finally:
+        cur.close()
+
+def al_confirmar(fn) -> None:
+    """
+    Ejecuta fn() cuando se confirme la transacción del request (p.ej. invalidar
+    caches: si se invalida antes, otro request podría recargar datos viejos).
+    Fuera de un request se ejecuta enseguida (execute() ya confirmó).
+    """
+    if has_request_context():
+        g.setdefault("_al_confirmar", []).append(fn)
+    else:
+        fn()
+
+def _commit_request(response):
+    """
+    Confirma solo si el request salió bien. Flask también corre after_request
+    al armar el 500 de una excepción no manejada: ahí se deshace lo escrito
+    y los al_confirmar se descartan (no hubo commit).
+    """
+    cn = g.get("_db_conn")
+    pendientes = g.pop("_al_confirmar", ())
+    if response.status_code >= 500:
+        if cn is not None:
+            cn.rollback()
+        return response
+    if cn is not None:
+        cn.commit()   # si falla, el request termina en error en vez de mentir "guardado"
+    for fn in pendientes:
+        fn()
+    return response
+
+def _liberar_request(exc):
+    cn = g.pop("_db_conn", None)
+    if cn is None:
+        return
+    try:
+        if exc is not None:
+            cn.rollback()
+    except Exception:
+        pass
+    finally:
+        cn.close()   # el pool hace rollback de lo que haya quedado pendiente
+
+def init_app(app):
+    """Registra el ciclo de vida de la conexión por request (commit / rollback + liberar)."""
+    app.after_request(_commit_request)
+    app.teardown_request(_liberar_request)
+
 def query(sql: str, params: tuple = (), *, dict_rows: bool = True):
-    """SELECT -> lista de filas (por defecto dicts). Abre/cierra por ti."""
-    with connect(dict_rows) as (_, cur):
+    """SELECT -> lista de filas (por defecto dicts). Usa la conexión del request."""
+    with _cursor(dict_rows) as (_, cur):
         cur.execute(sql, params)
         return cur.fetchall()
 
 def query_one(sql: str, params: tuple = (), *, dict_rows: bool = True):
-    """SELECT -> una fila o None. Abre/cierra por ti."""
-    with connect(dict_rows) as (_, cur):
+    """SELECT -> una fila o None. Usa la conexión del request."""
+    with _cursor(dict_rows, buffered=True) as (_, cur):
         cur.execute(sql, params)
         return cur.fetchone()
 
 def execute(sql: str, params: tuple = ()):
     """
-    INSERT/UPDATE/DELETE -> (rowcount, lastrowid). Abre/cierra por ti.
+    INSERT/UPDATE/DELETE -> (rowcount, lastrowid).
+    Dentro de un request se confirma al terminar el request; fuera, al salir.
     """
-    with connect(False) as (cn, cur):
+    with _cursor(False) as (cn, cur):
         cur.execute(sql, params)
         try:
             last_id = cur.lastrowid
@@ -72,8 +461,8 @@ def execute(sql: str, params: tuple = ()):
         return cur.rowcount, last_id
 
 def executemany(sql: str, seq_params: list[tuple]):
-    """Múltiples INSERT/UPDATE/DELETE. Abre/cierra por ti."""
-    with connect(False) as (cn, cur):
+    """Múltiples INSERT/UPDATE/DELETE. Misma regla de commit que execute()."""
+    with _cursor(False) as (cn, cur):
         cur.executemany(sql, seq_params)
         return cur.rowcount
 
@@ -87,3 +476,92 @@ def ping() -> bool:
     except Exception:
         return False
 
+
+# ===== Log de consultas lentas =====
+# SLOW_QUERY_MS > 0 registra toda sentencia que tarde más (parámetros redactados)
+# y guarda el EXPLAIN de la primera vez que aparece cada sentencia normalizada.
+SLOW_QUERY_MS   = float(os.getenv("SLOW_QUERY_MS", "0"))        # 0 = desactivado
+SLOW_QUERY_MAX  = int(os.getenv("SLOW_QUERY_MAX", "200"))       # sentencias distintas guardadas
+SLOW_QUERY_FILE = os.getenv("SLOW_QUERY_FILE", "")              # además, a este archivo
+
+_log_lentas = logging.getLogger("python.conexion.lentas")
+_lentas: dict = {}
+_lentas_lock = threading.Lock()
+_explicador = None
+_en_explain = threading.local()
+
+def _redactar(params) -> str:
+    """Solo tipo y tamaño de cada parámetro (nunca el valor)."""
+    def uno(v):
+        if v is None: return "NULL"
+        if isinstance(v, (bytes, bytearray)): return f"<bytes:{len(v)}>"
+        if isinstance(v, str): return f"<str:{len(v)}>"
+        if isinstance(v, bool): return "<bool>"
+        if isinstance(v, int): return "<int>"
+        if isinstance(v, (float, Decimal)): return "<num>"
+        if isinstance(v, (date, datetime)): return "<fecha>"
+        return f"<{type(v).__name__}>"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {uno(v)}" for k, v in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        if params and isinstance(params[0], (list, tuple, dict)):   # executemany
+            return f"[{len(params)} filas x {_redactar(params[0])}]"
+        return "(" + ", ".join(uno(v) for v in params) + ")"
+    return uno(params)
+
+def _explain(norm: str, sql: str, params) -> None:
+    """EXPLAIN en una conexión aparte del pool (fuera del request y su transacción)."""
+    _en_explain.activo = True
+    try:
+        with connect(True) as (_, cur):
+            cur.execute("EXPLAIN " + sql, params)
+            plan = cur.fetchall()
+    except Exception as e:
+        plan = [{"error": str(e)}]
+    finally:
+        _en_explain.activo = False
+    with _lentas_lock:
+        if norm in _lentas:
+            _lentas[norm]["explain"] = plan
+
+def _anotar_lenta(ev: dict) -> None:
+    if ev["ms"] < SLOW_QUERY_MS or getattr(_en_explain, "activo", False):
+        return
+    norm = ev["norm"]
+    redactados = _redactar(ev["params"])
+    _log_lentas.warning("Consulta lenta (%.1f ms): %s -- %s", ev["ms"], norm[:500], redactados)
+    primera = False
+    with _lentas_lock:
+        r = _lentas.get(norm)
+        if r is None:
+            if len(_lentas) >= SLOW_QUERY_MAX:
+                return
+            r = _lentas[norm] = {"norm": norm, "veces": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                 "params": redactados, "primera": time.time(), "explain": None}
+            primera = True
+        r["veces"] += 1
+        r["total_ms"] += ev["ms"]
+        r["max_ms"] = max(r["max_ms"], ev["ms"])
+        r["ultima"] = time.time()
+    op = norm.split(None, 1)[0].upper() if norm else ""
+    if primera and not ev["muchos"] and op in ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE"):
+        _explicador.submit(_explain, norm, ev["sql"], ev["params"])
+
+def consultas_lentas(orden: str = "total_ms") -> list:
+    """Sentencias lentas registradas, de peor a mejor según `orden`."""
+    with _lentas_lock:
+        filas = [dict(r) for r in _lentas.values()]
+    return sorted(filas, key=lambda r: r.get(orden) or 0, reverse=True)
+
+def limpiar_consultas_lentas() -> None:
+    with _lentas_lock:
+        _lentas.clear()
+
+if SLOW_QUERY_MS > 0:
+    # un solo hilo: los EXPLAIN no compiten con los requests por el pool
+    _explicador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+    if SLOW_QUERY_FILE:
+        _h = logging.FileHandler(SLOW_QUERY_FILE, encoding="utf-8")
+        _h.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _log_lentas.addHandler(_h)
+    agregar_observador(_anotar_lenta)
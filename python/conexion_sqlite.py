@@ -0,0 +1,451 @@
+# python/conexion_sqlite.py
+"""
+Backend SQLite para correr la app SIN servidor MySQL (pruebas locales, CI,
+perfiles y benchmarks). Se activa con DB_BACKEND=sqlite en conexion.py.
+
+Imita lo que el resto del código usa de mysql.connector:
+  - connect() -> conexión con cursor(dictionary=, buffered=), commit/rollback,
+    ping(), in_transaction y unread_result.
+  - Paramstyle %s / %(nombre)s -> ? / :nombre.
+  - Vistas de information_schema (tables, columns, table_constraints,
+    key_column_usage, statistics) armadas con los pragma de SQLite, para que
+    esquema.py cargue el catálogo con sus mismas consultas.
+  - Funciones NOW(), CURDATE(), DATABASE(), CONCAT(), CONCAT_WS() y traducción de
+    INSERT IGNORE, ON DUPLICATE KEY UPDATE, GROUP_CONCAT(... SEPARATOR ...),
+    FOR UPDATE, EXPLAIN y la DDL de CREATE TABLE / ADD INDEX.
+  - Errores de sqlite3 convertidos a los de mysql.connector.errors, así los
+    `except Error` de las vistas siguen funcionando.
+  - DECIMAL / DATE / DATETIME se leen como Decimal / date / datetime.
+
+Con ruta ":memory:" la base vive en memoria (compartida entre las conexiones
+del pool) y se crea con database/sqlite.sql; con un archivo, se crea la
+primera vez que está vacío. No es un MySQL: la concurrencia es de un
+escritor a la vez y FOR UPDATE bloquea toda la base hasta el commit.
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Tuple
+
+from mysql.connector import errors
+
+ESQUEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "database", "sqlite.sql")
+
+# ===== Tipos Python <-> SQLite =====
+def _a_decimal(b: bytes):
+    try:
+        return Decimal(b.decode())
+    except InvalidOperation:
+        return b.decode()
+
+def _a_fecha_hora(b: bytes):
+    s = b.decode()
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        return s
+
+def _a_fecha(b: bytes):
+    s = b.decode()
+    try:
+        return date.fromisoformat(s[:10])
+    except ValueError:
+        return s
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda v: v.strftime("%Y-%m-%d %H:%M:%S"))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_converter("DECIMAL", _a_decimal)
+sqlite3.register_converter("DATETIME", _a_fecha_hora)
+sqlite3.register_converter("TIMESTAMP", _a_fecha_hora)
+sqlite3.register_converter("DATE", _a_fecha)
+
+# ===== Funciones de MySQL =====
+def _concat(*partes):
+    if any(p is None for p in partes):
+        return None         # como MySQL: CONCAT con un NULL da NULL
+    return "".join(str(p) for p in partes)
+
+def _concat_ws(sep, *partes):
+    if sep is None:
+        return None
+    return str(sep).join(str(p) for p in partes if p is not None)   # salta los NULL, como MySQL
+
+def _crc32(v):
+    return None if v is None else zlib.crc32(str(v).encode())
+
+def _funciones(raw: sqlite3.Connection) -> None:
+    raw.create_function("NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    raw.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    raw.create_function("DATABASE", 0, lambda: "main")
+    raw.create_function("CONCAT", -1, _concat, deterministic=True)
+    raw.create_function("CONCAT_WS", -1, _concat_ws, deterministic=True)
+    raw.create_function("CRC32", 1, _crc32, deterministic=True)
+
+# ===== information_schema (vistas TEMP por conexión) =====
+_TABLAS_USUARIO = "m.type='table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'"
+
+_VISTAS = (
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS _is_tables AS
+    SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME, 'BASE TABLE' AS TABLE_TYPE,
+           (SELECT schema_version FROM pragma_schema_version) AS CREATE_TIME
+    FROM sqlite_master m WHERE {_TABLAS_USUARIO}
+    """,
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS _is_columns AS
+    SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION,
+           CASE base WHEN 'integer' THEN 'int' ELSE base END AS DATA_TYPE,
+           CASE base WHEN 'integer' THEN 'int(11)' ELSE lower(tipo) END AS COLUMN_TYPE,
+           CASE WHEN nn OR pk THEN 'NO' ELSE 'YES' END AS IS_NULLABLE,
+           CASE WHEN base='integer' AND pk=1 AND npk=1 THEN 'auto_increment' ELSE '' END AS EXTRA,
+           CASE WHEN base IN ('varchar','char') AND instr(tipo,'(') > 0
+                THEN CAST(substr(tipo, instr(tipo,'(') + 1) AS INTEGER) END AS CHARACTER_MAXIMUM_LENGTH,
+           dflt AS COLUMN_DEFAULT
+    FROM (
+        SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME, p.name AS COLUMN_NAME,
+               p.cid + 1 AS ORDINAL_POSITION, p.type AS tipo, p."notnull" AS nn, p.pk AS pk,
+               p.dflt_value AS dflt,
+               lower(trim(CASE WHEN instr(p.type,'(') > 0
+                               THEN substr(p.type, 1, instr(p.type,'(') - 1) ELSE p.type END)) AS base,
+               (SELECT count(*) FROM pragma_table_info(m.name) WHERE pk > 0) AS npk
+        FROM sqlite_master m JOIN pragma_table_info(m.name) p
+        WHERE {_TABLAS_USUARIO}
+    )
+    """,
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS _is_table_constraints AS
+    SELECT DISTINCT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME,
+           'PRIMARY' AS CONSTRAINT_NAME, 'PRIMARY KEY' AS CONSTRAINT_TYPE
+    FROM sqlite_master m JOIN pragma_table_info(m.name) p
+    WHERE {_TABLAS_USUARIO} AND p.pk > 0
+    UNION ALL
+    SELECT DISTINCT 'main', m.name, 'fk_' || m.name || '_' || f.id, 'FOREIGN KEY'
+    FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+    WHERE {_TABLAS_USUARIO}
+    """,
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS _is_key_column_usage AS
+    SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME, 'PRIMARY' AS CONSTRAINT_NAME,
+           p.name AS COLUMN_NAME, p.pk AS ORDINAL_POSITION,
+           NULL AS REFERENCED_TABLE_NAME, NULL AS REFERENCED_COLUMN_NAME
+    FROM sqlite_master m JOIN pragma_table_info(m.name) p
+    WHERE {_TABLAS_USUARIO} AND p.pk > 0
+    UNION ALL
+    SELECT 'main', m.name, 'fk_' || m.name || '_' || f.id,
+           f."from", f.seq + 1, f."table", f."to"
+    FROM sqlite_master m JOIN pragma_foreign_key_list(m.name) f
+    WHERE {_TABLAS_USUARIO}
+    """,
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS _is_statistics AS
+    SELECT 'main' AS TABLE_SCHEMA, m.name AS TABLE_NAME,
+           CASE WHEN i.origin = 'pk' THEN 'PRIMARY' ELSE i.name END AS INDEX_NAME,
+           1 - i."unique" AS NON_UNIQUE, c.seqno + 1 AS SEQ_IN_INDEX, c.name AS COLUMN_NAME
+    FROM sqlite_master m JOIN pragma_index_list(m.name) i JOIN pragma_index_info(i.name) c
+    WHERE {_TABLAS_USUARIO}
+    """,
+)
+
+# ===== Traducción de SQL (una vez por texto de sentencia) =====
+_RE_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_RE_MARCA   = re.compile(r"\x00(\d+)\x00")
+_RE_PARAM_N = re.compile(r"%\((\w+)\)s")
+_RE_INFO    = re.compile(r"\binformation_schema\s*\.\s*`?(\w+)`?", re.I)
+_RE_IGNORE  = re.compile(r"^\s*INSERT\s+IGNORE\b", re.I)
+_RE_DUP     = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_RE_INS_SEL = re.compile(r"^\s*(INSERT\s+INTO\s+\S+\s*\([^)]*\))\s*(SELECT\b.*)$", re.I | re.S)
+_RE_VALUES  = re.compile(r"\bVALUES\s*\(\s*`?(\w+)`?\s*\)", re.I)
+_RE_GCONCAT = re.compile(r"\bGROUP_CONCAT\s*\((.+?)(?:\s+ORDER\s+BY\s+[^)]+?)?"
+                         r"(?:\s+SEPARATOR\s+(\x00\d+\x00))?\s*\)", re.I | re.S)
+_RE_LOCK    = re.compile(r"\s+(FOR\s+UPDATE|LOCK\s+IN\s+SHARE\s+MODE)\s*;?\s*$", re.I)
+_RE_LIKE    = re.compile(r"\bLIKE\s+(\?|:\w+|\x00\d+\x00)(?!\s+ESCAPE)", re.I)
+_RE_EXPLAIN = re.compile(r"^\s*EXPLAIN\s+(?!QUERY\s+PLAN)", re.I)
+# DDL
+_RE_CREATE  = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?", re.I)
+_RE_OPCION  = re.compile(r"\)\s*((?:ENGINE|DEFAULT\s+CHARSET|CHARSET|COLLATE|AUTO_INCREMENT|ROW_FORMAT)"
+                         r"\s*=?\s*\w+\s*)+;?\s*$", re.I)
+_RE_ON_UPD  = re.compile(r"`?(\w+)`?\s+(?:DATETIME|TIMESTAMP)\b[^,]*?\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP(?:\(\))?", re.I)
+_RE_ON_UPD_Q = re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP(?:\(\))?", re.I)
+_RE_KEY     = re.compile(r",\s*(UNIQUE\s+)?(?:KEY|INDEX)\s+`?(\w+)`?\s*\(([^)]*)\)", re.I)
+_RE_SIN_USO = re.compile(r"\b(?:UNSIGNED|AUTO_INCREMENT)\b", re.I)
+_RE_ADD_IDX = re.compile(r"^\s*ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+(UNIQUE\s+)?(?:KEY|INDEX)\s+`?(\w+)`?\s*\(([^)]*)\)\s*;?\s*$",
+                         re.I | re.S)
+
+def _ddl_crear(sql: str, tabla: str) -> Tuple[str, ...]:
+    """CREATE TABLE de MySQL -> CREATE TABLE de SQLite + índices y triggers aparte."""
+    extras = []
+    for m in _RE_ON_UPD.finditer(sql):
+        col = m.group(1)
+        extras.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_{col} AFTER UPDATE ON {tabla} "
+            f"FOR EACH ROW WHEN NEW.{col} IS OLD.{col} "
+            f"BEGIN UPDATE {tabla} SET {col}=datetime('now','localtime') WHERE rowid=NEW.rowid; END")
+    sql = _RE_ON_UPD_Q.sub("", sql)
+    for m in _RE_KEY.finditer(sql):
+        unico, nombre, cols = m.group(1), m.group(2), m.group(3)
+        extras.insert(0, f"CREATE {'UNIQUE ' if unico else ''}INDEX IF NOT EXISTS {nombre} "
+                         f"ON {tabla} ({cols.replace('`', '')})")
+    sql = _RE_KEY.sub("", sql)
+    sql = _RE_OPCION.sub(")", sql)
+    sql = _RE_SIN_USO.sub("", sql)
+    return (sql,) + tuple(extras)
+
+@lru_cache(maxsize=2048)
+def traducir(sql: str) -> Tuple[Tuple[str, ...], bool]:
+    """
+    (sentencias, bloquear): la sentencia traducida (+ extras de DDL que van
+    después) y si pedía FOR UPDATE (se toma el lock de escritura antes).
+    """
+    literales = []
+    def guardar(m):
+        literales.append(m.group(0))
+        return f"\x00{len(literales) - 1}\x00"
+    t = _RE_LITERAL.sub(guardar, sql)
+
+    t = t.replace("%s", "?")
+    t = _RE_PARAM_N.sub(r":\1", t)
+    t = _RE_INFO.sub(lambda m: "_is_" + m.group(1).lower(), t)
+    t = _RE_IGNORE.sub("INSERT OR IGNORE", t)
+    t = _RE_GCONCAT.sub(lambda m: f"group_concat({m.group(1)}, {m.group(2)})" if m.group(2)
+                        else f"group_concat({m.group(1)})", t)
+    t = _RE_LIKE.sub(lambda m: f"LIKE {m.group(1)} ESCAPE '\\'", t)
+    t = _RE_EXPLAIN.sub("EXPLAIN QUERY PLAN ", t)
+
+    bloquear = False
+    m = _RE_LOCK.search(t)
+    if m:
+        bloquear = m.group(1).upper().startswith("FOR")
+        t = t[:m.start()]
+
+    m = _RE_DUP.search(t)
+    if m:
+        cabeza, actualizar = t[:m.start()], _RE_VALUES.sub(r"excluded.\1", t[m.end():])
+        sel = _RE_INS_SEL.match(cabeza)
+        if sel:
+            # INSERT ... SELECT ... ON CONFLICT es ambiguo en SQLite sin un WHERE propio
+            cabeza = f"{sel.group(1)} SELECT * FROM ({sel.group(2)}) WHERE true"
+        t = f"{cabeza} ON CONFLICT DO UPDATE SET {actualizar}"
+
+    sentencias: Tuple[str, ...] = (t,)
+    m = _RE_CREATE.match(t)
+    if m:
+        sentencias = _ddl_crear(t, m.group(1))
+    else:
+        m = _RE_ADD_IDX.match(t)
+        if m:
+            sentencias = (f"CREATE {'UNIQUE ' if m.group(2) else ''}INDEX IF NOT EXISTS {m.group(3)} "
+                          f"ON {m.group(1)} ({m.group(4).replace('`', '')})",)
+
+    def restaurar(s: str) -> str:
+        return _RE_MARCA.sub(lambda m: literales[int(m.group(1))], s)
+    return tuple(restaurar(s) for s in sentencias), bloquear
+
+# ===== Errores -> mysql.connector.errors =====
+def _error(e: sqlite3.Error) -> errors.Error:
+    msg = str(e)
+    bajo = msg.lower()
+    if isinstance(e, sqlite3.IntegrityError):
+        errno = (1062 if "unique" in bajo else 1452 if "foreign key" in bajo
+                 else 1048 if "not null" in bajo else 3819)
+        return errors.IntegrityError(msg=msg, errno=errno, sqlstate="23000")
+    if bajo.startswith("no such table"):
+        return errors.ProgrammingError(msg=msg, errno=1146, sqlstate="42S02")
+    if bajo.startswith("no such column") or "has no column" in bajo:
+        return errors.ProgrammingError(msg=msg, errno=1054, sqlstate="42S22")
+    if "syntax error" in bajo or isinstance(e, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=msg, errno=1064, sqlstate="42000")
+    if "locked" in bajo or "busy" in bajo:
+        return errors.OperationalError(msg=msg, errno=1205, sqlstate="HY000")
+    if isinstance(e, sqlite3.OperationalError):
+        return errors.OperationalError(msg=msg, errno=2013, sqlstate="HY000")
+    return errors.DatabaseError(msg=msg)
+
+# ===== Cursor y conexión =====
+class Cursor:
+    """Cursor con la interfaz de mysql.connector (tuplas o dicts)."""
+    def __init__(self, cn: "Conexion", dictionary: bool):
+        self._cn = cn
+        self._dict = dictionary
+        self._cur: sqlite3.Cursor | None = None
+        self._nombres: Tuple[str, ...] = ()
+
+    # --- ejecución ---
+    def _preparar(self, sql: str):
+        raw = self._cn._raw
+        if raw is None:
+            raise errors.InterfaceError("La conexión SQLite está cerrada.")
+        sentencias, bloquear = traducir(sql)
+        if bloquear and not raw.in_transaction:
+            raw.execute("BEGIN IMMEDIATE")
+        return raw, sentencias
+
+    def _despues(self, raw, cur, extras):
+        for s in extras:
+            raw.execute(s)
+        self._cur = cur
+        self._nombres = tuple(d[0] for d in cur.description) if cur.description else ()
+
+    def execute(self, sql: str, params: Any = ()):
+        try:
+            raw, sentencias = self._preparar(sql)
+            cur = raw.cursor()
+            cur.execute(sentencias[0], params if params is not None else ())
+            self._despues(raw, cur, sentencias[1:])
+        except sqlite3.Error as e:
+            raise _error(e) from e
+
+    def executemany(self, sql: str, seq_params):
+        try:
+            raw, sentencias = self._preparar(sql)
+            cur = raw.cursor()
+            cur.executemany(sentencias[0], seq_params)
+            self._despues(raw, cur, sentencias[1:])
+        except sqlite3.Error as e:
+            raise _error(e) from e
+
+    # --- resultados ---
+    def _fila(self, r):
+        if r is None or not self._dict:
+            return r
+        return dict(zip(self._nombres, r))
+
+    def fetchone(self):
+        return self._fila(self._cur.fetchone()) if self._cur else None
+
+    def fetchall(self):
+        if not self._cur:
+            return []
+        filas = self._cur.fetchall()
+        return [dict(zip(self._nombres, r)) for r in filas] if self._dict else filas
+
+    def fetchmany(self, size: int = 1):
+        if not self._cur:
+            return []
+        return [self._fila(r) for r in self._cur.fetchmany(size)]
+
+    def __iter__(self):
+        while True:
+            r = self.fetchone()
+            if r is None:
+                return
+            yield r
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount if self._cur else -1
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid if self._cur else None
+
+    @property
+    def description(self):
+        return self._cur.description if self._cur else None
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        return self._nombres
+
+    @property
+    def with_rows(self) -> bool:
+        return bool(self._nombres)
+
+    def close(self):
+        if self._cur is not None:
+            self._cur.close()
+            self._cur = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Conexion:
+    """Conexión con la interfaz de mysql.connector que usa conexion.py."""
+    unread_result = False
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._raw is not None and self._raw.in_transaction
+
+    def cursor(self, dictionary: bool = False, buffered: bool = False, **_):
+        return Cursor(self, dictionary)
+
+    def _llamar(self, metodo: str):
+        if self._raw is None:
+            raise errors.InterfaceError("La conexión SQLite está cerrada.")
+        try:
+            getattr(self._raw, metodo)()
+        except sqlite3.Error as e:
+            raise _error(e) from e
+
+    def commit(self):
+        self._llamar("commit")
+
+    def rollback(self):
+        self._llamar("rollback")
+
+    def ping(self, reconnect: bool = False, **_):
+        if self._raw is None:
+            raise errors.InterfaceError("La conexión SQLite está cerrada.")
+        self._raw.execute("SELECT 1").fetchone()
+
+    def is_connected(self) -> bool:
+        return self._raw is not None
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            raw.close()
+
+# ===== Apertura =====
+_lock = threading.Lock()
+_ancla: dict = {}       # uri -> conexión que mantiene viva la base en memoria
+
+def _uri(ruta: str, nombre: str) -> str:
+    if ruta == ":memory:":
+        return f"file:{nombre}?mode=memory&cache=shared"
+    return f"file:{os.path.abspath(ruta)}"
+
+def _abrir(uri: str, timeout: float) -> sqlite3.Connection:
+    raw = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False,
+                          detect_types=sqlite3.PARSE_DECLTYPES)
+    raw.execute("PRAGMA foreign_keys=ON")
+    _funciones(raw)
+    return raw
+
+def _inicializar(raw: sqlite3.Connection, uri: str, esquema: str) -> None:
+    """Primera conexión a la base: WAL (si es archivo) y tablas desde esquema si está vacía."""
+    if "mode=memory" not in uri:
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+    vacia = raw.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'").fetchone()[0] == 0
+    if vacia and esquema:
+        with open(esquema, encoding="utf-8") as f:
+            raw.executescript(f.read())
+
+def connect(ruta: str = ":memory:", database: str = "repaircell_db",
+            esquema: str = ESQUEMA, timeout: float = 10.0, **_) -> Conexion:
+    """Abre una conexión (la firma acepta el resto de la config de MySQL y la ignora)."""
+    uri = _uri(ruta, database)
+    with _lock:
+        if uri not in _ancla:
+            ancla = _abrir(uri, timeout)
+            _inicializar(ancla, uri, esquema)
+            _ancla[uri] = ancla
+    raw = _abrir(uri, timeout)
+    for v in _VISTAS:
+        raw.execute(v)
+    return Conexion(raw)
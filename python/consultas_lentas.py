@@ -0,0 +1,35 @@
+# python/consultas_lentas.py
+"""
+Reporte de consultas lentas (ver SLOW_QUERY_MS en conexion.py):
+ranking por tiempo total, máximo o cantidad, con el EXPLAIN guardado.
+"""
+from __future__ import annotations
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required
+
+from python.conexion import SLOW_QUERY_MS, consultas_lentas, limpiar_consultas_lentas
+from python.authz import roles_required
+
+bp = Blueprint("consultas_lentas", __name__, url_prefix="/debug")
+
+_ORDENES = {"total_ms": "Tiempo total", "max_ms": "Peor caso", "veces": "Veces"}
+
+@bp.get("/lentas")
+@login_required
+@roles_required("administrador")
+def reporte():
+    orden = request.args.get("orden", "total_ms")
+    if orden not in _ORDENES:
+        orden = "total_ms"
+    return render_template(
+        "debug_lentas.html",
+        filas=consultas_lentas(orden), orden=orden, ordenes=_ORDENES, umbral=SLOW_QUERY_MS,
+    )
+
+@bp.post("/lentas/limpiar")
+@login_required
+@roles_required("administrador")
+def limpiar():
+    limpiar_consultas_lentas()
+    flash("Registro de consultas lentas vaciado.", "info")
+    return redirect(url_for("consultas_lentas.reporte"))
@@ -0,0 +1,171 @@
+# python/esquema.py
+"""
+Catálogo del esquema (columnas, tipos, PK y FKs de TODAS las tablas) en memoria.
+
+Se carga con unas pocas consultas masivas a information_schema y se sirve desde memoria.
+Se recarga:
+  - explícitamente con invalidar(), o
+  - cuando vence SCHEMA_CACHE_TTL y la "firma" del esquema es distinta: nº de
+    tablas y última CREATE_TIME (CREATE/DROP y los ALTER que reconstruyen la
+    tabla), más nº y CRC32 sumado de las columnas (nombre, posición, tipo,
+    nulos, default) y nº de columnas en claves. Así también se notan los ALTER
+    instantáneos (ADD COLUMN en MySQL 8) y dos DDL en el mismo segundo.
+
+Las listas/dicts que se devuelven son compartidas: tratarlas como solo lectura.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+from python.conexion import query, query_one
+
+TTL = int(os.getenv("SCHEMA_CACHE_TTL", "300"))   # seg. entre verificaciones de firma
+
+_SQL_COLUMNAS = """
+    SELECT TABLE_NAME AS TABLE_NAME, COLUMN_NAME AS COLUMN_NAME,
+           DATA_TYPE AS DATA_TYPE, COLUMN_TYPE AS COLUMN_TYPE,
+           IS_NULLABLE AS IS_NULLABLE, EXTRA AS EXTRA,
+           CHARACTER_MAXIMUM_LENGTH AS CHARACTER_MAXIMUM_LENGTH
+    FROM information_schema.columns
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+_SQL_PKS = """
+    SELECT k.TABLE_NAME AS TABLE_NAME, k.COLUMN_NAME AS COLUMN_NAME
+    FROM information_schema.table_constraints t
+    JOIN information_schema.key_column_usage k
+      ON t.CONSTRAINT_NAME=k.CONSTRAINT_NAME
+     AND t.TABLE_SCHEMA=k.TABLE_SCHEMA
+     AND t.TABLE_NAME=k.TABLE_NAME
+    WHERE t.TABLE_SCHEMA = DATABASE() AND t.CONSTRAINT_TYPE='PRIMARY KEY'
+    ORDER BY k.TABLE_NAME, k.ORDINAL_POSITION
+"""
+
+_SQL_FKS = """
+    SELECT TABLE_NAME AS TABLE_NAME, COLUMN_NAME AS COLUMN_NAME,
+           REFERENCED_TABLE_NAME AS REFERENCED_TABLE_NAME,
+           REFERENCED_COLUMN_NAME AS REFERENCED_COLUMN_NAME
+    FROM information_schema.key_column_usage
+    WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+"""
+
+_SQL_FIRMA = """
+    SELECT (SELECT COUNT(*) FROM information_schema.tables
+            WHERE TABLE_SCHEMA = DATABASE()) AS n,
+           (SELECT MAX(CREATE_TIME) FROM information_schema.tables
+            WHERE TABLE_SCHEMA = DATABASE()) AS t,
+           (SELECT COUNT(*) FROM information_schema.key_column_usage
+            WHERE TABLE_SCHEMA = DATABASE()) AS nk,
+           COUNT(*) AS nc,
+           SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE,
+                               IS_NULLABLE, COLUMN_DEFAULT, EXTRA))) AS crc
+    FROM information_schema.columns
+    WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+class _Catalogo:
+    def __init__(self, columnas, pks, fks, firma, version: int):
+        self.columnas: Dict[str, List[Dict[str, Any]]] = columnas
+        self.nombres = {t: {c["COLUMN_NAME"] for c in cols} for t, cols in columnas.items()}
+        self.tipos = {t: {c["COLUMN_NAME"]: (c["DATA_TYPE"] or "").lower() for c in cols}
+                      for t, cols in columnas.items()}
+        self.pks: Dict[str, str] = pks
+        self.fks: Dict[str, Dict[str, Dict[str, str]]] = fks
+        self.referenciadas = {(i["ref_table"], i["ref_col"]) for m in fks.values() for i in m.values()}
+        self.firma = firma
+        self.version = version
+        self.verificado_en = time.monotonic()
+
+_actual: _Catalogo | None = None
+_version = 0
+_lock = threading.Lock()
+
+def _firma():
+    r = query_one(_SQL_FIRMA)
+    return (r["n"], str(r["t"]), r["nk"], r["nc"], str(r["crc"])) if r else None
+
+def _leer() -> _Catalogo:
+    global _version
+    firma = _firma()
+
+    columnas: Dict[str, List[Dict[str, Any]]] = {}
+    for r in query(_SQL_COLUMNAS):
+        t = r.pop("TABLE_NAME")
+        columnas.setdefault(t, []).append(r)
+
+    pks: Dict[str, str] = {}
+    for r in query(_SQL_PKS):
+        pks.setdefault(r["TABLE_NAME"], r["COLUMN_NAME"])   # primera columna de la PK
+
+    fks: Dict[str, Dict[str, Dict[str, str]]] = {}
+    for r in query(_SQL_FKS):
+        fks.setdefault(r["TABLE_NAME"], {})[r["COLUMN_NAME"]] = {
+            "ref_table": r["REFERENCED_TABLE_NAME"],
+            "ref_col": r["REFERENCED_COLUMN_NAME"],
+        }
+    _version += 1
+    return _Catalogo(columnas, pks, fks, firma, _version)
+
+def cargar() -> None:
+    """Carga (o recarga) el catálogo completo. Se llama al arrancar la app."""
+    global _actual
+    with _lock:
+        _actual = _leer()
+
+def invalidar() -> None:
+    """Descarta el catálogo; la próxima lectura lo recarga (p.ej. tras un ALTER)."""
+    global _actual
+    with _lock:
+        _actual = None
+
+def _catalogo() -> _Catalogo:
+    global _actual
+    cat = _actual
+    if cat is not None and time.monotonic() - cat.verificado_en < TTL:
+        return cat
+    with _lock:
+        cat = _actual
+        if cat is not None and time.monotonic() - cat.verificado_en < TTL:
+            return cat      # otro hilo ya verificó
+        if cat is not None and _firma() == cat.firma:
+            cat.verificado_en = time.monotonic()
+            return cat
+        _actual = _leer()
+        return _actual
+
+# ---------- consultas ----------
+def version() -> int:
+    """Número que cambia cada vez que se recarga el esquema (para caches derivados)."""
+    return _catalogo().version
+
+def columnas(tabla: str) -> List[Dict[str, Any]]:
+    """
+    Columnas en orden (dicts con COLUMN_NAME, DATA_TYPE, COLUMN_TYPE,
+    IS_NULLABLE, EXTRA, CHARACTER_MAXIMUM_LENGTH).
+    """
+    return _catalogo().columnas.get(tabla, [])
+
+def nombres(tabla: str) -> set[str]:
+    """Conjunto de nombres de columna."""
+    return _catalogo().nombres.get(tabla, set())
+
+def tiene_columna(tabla: str, columna: str) -> bool:
+    return columna in nombres(tabla)
+
+def tipo(tabla: str, columna: str) -> str | None:
+    """DATA_TYPE en minúsculas (p.ej. 'datetime') o None si no existe."""
+    return _catalogo().tipos.get(tabla, {}).get(columna)
+
+def pk(tabla: str) -> str | None:
+    return _catalogo().pks.get(tabla)
+
+def fks(tabla: str) -> Dict[str, Dict[str, str]]:
+    """{columna: {'ref_table': ..., 'ref_col': ...}}"""
+    return _catalogo().fks.get(tabla, {})
+
+def es_referenciada(tabla: str, columna: str) -> bool:
+    """¿Alguna FK del esquema apunta a tabla.columna?"""
+    return (tabla, columna) in _catalogo().referenciadas
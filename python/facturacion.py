@@ -1,32 +1,35 @@
 # python/facturacion.py
 from __future__ import annotations
+import re
+import click
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from mysql.connector import Error
-from python.conexion import get_conn
+from python.conexion import get_conn, request_conn
 from python.authz import roles_required
+from python import esquema, catalogo, idempotencia, saldos
 import decimal, os
 
 bp = Blueprint("facturacion", __name__, url_prefix="/facturacion")
 
+LOTE         = int(os.getenv("FACTURA_LOTE", "100"))       # órdenes por transacción en la emisión por lote
+LOTE_WEB_MAX = int(os.getenv("FACTURA_LOTE_WEB_MAX", "2000"))  # órdenes por solicitud en /facturacion/lote
+
 def _iva_pct() -> decimal.Decimal:
     try:
         return decimal.Decimal(os.getenv("IVA_PORCENTAJE", "15")) / decimal.Decimal(100)
     except Exception:
         return decimal.Decimal("0.15")
 
-# ---------- utilidades ----------
-def _row_name(r):
-    """leer COLUMN_NAME venga como tupla o dict"""
-    if isinstance(r, (tuple, list)): return r[0]
-    return r.get("COLUMN_NAME")
+def _totales(subtotal: decimal.Decimal, pagado: decimal.Decimal):
+    """(base, iva, total): se factura lo que no cubrieron los abonos, más IVA."""
+    base = subtotal - pagado
+    iva = base * _iva_pct() if subtotal > pagado else decimal.Decimal("0")
+    return base, iva, base + iva
 
-def _cols(cur, table: str) -> set[str]:
-    cur.execute("""
-        SELECT COLUMN_NAME FROM information_schema.columns
-        WHERE table_schema=DATABASE() AND table_name=%s
-    """, (table,))
-    return { _row_name(r) for r in cur.fetchall() }
+# ---------- utilidades ----------
+def _cols(table: str) -> set[str]:
+    return esquema.nombres(table)
 
 def _first(cols: set[str], candidates: list[str], default: str|None=None):
     for c in candidates:
@@ -34,8 +37,8 @@ def _first(cols: set[str], candidates: list[str], default: str|None=None):
     return default
 
 # --- introspección ligera ---
-def _orden_cols(cur):
-    cols = _cols(cur, "orden_trabajo")
+def _orden_cols():
+    cols = _cols("orden_trabajo")
     return {
         "desc":            _first(cols, ["descripcion","detalle","observaciones","diagnostico"]),
         "estado":          _first(cols, ["estado"]),
@@ -43,127 +46,218 @@ def _orden_cols(cur):
         "fecha_recepcion": _first(cols, ["fecha_recepcion","fecha_ingreso"])
     }
 
-def _cliente_cols(cur):
-    cols = _cols(cur, "cliente")
+def _cliente_cols():
+    cols = _cols("cliente")
     return {
         "identificacion":  _first(cols, ["identificacion","cedula"]),
         "tel":             _first(cols, ["telefono","celular"]),
     }
 
-def _cat_servicio(cur):
+# --- carga del "espacio de facturación" de una OT ---
+_SQL_CABECERA: tuple = (None, None)     # (versión del esquema, sql); se reemplaza el par entero
+
+def _sql_cabecera() -> str:
+    """SELECT de la cabecera, resuelto una vez por versión del esquema."""
+    global _SQL_CABECERA
+    ver = esquema.version()
+    vigente, sql = _SQL_CABECERA
+    if vigente != ver:
+        oc = _orden_cols(); cc = _cliente_cols()
+        sql = f"""
+            SELECT o.id_orden,
+                   {('o.'+oc['desc']) if oc['desc'] else 'NULL'} AS descripcion,
+                   {('o.'+oc['estado']) if oc['estado'] else 'NULL'} AS estado,
+                   {('o.'+oc['creado_en']) if oc['creado_en'] else 'NULL'} AS creado_en,
+                   {('o.'+oc['fecha_recepcion']) if oc['fecha_recepcion'] else 'NULL'} AS fecha_recepcion,
+                   o.id_cliente,
+                   CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cli_nombre,
+                   {('c.'+cc['identificacion']) if cc['identificacion'] else 'NULL'} AS cli_identificacion,
+                   {('c.'+cc['tel']) if cc['tel'] else 'NULL'} AS cli_tel,
+                   c.email AS cli_email
+            FROM orden_trabajo o
+            JOIN cliente c ON c.id_cliente=o.id_cliente
+            WHERE o.id_orden=%s
+        """
+        _SQL_CABECERA = (ver, sql)
+    return sql
+
+# Servicios, repuestos y abonos en UNA sola ida y vuelta (t = S/R/A)
+_SQL_LINEAS = """
+    SELECT 'S' AS t, id_detalle_servicio AS id, descripcion, cantidad, precio_unitario,
+           NULL AS monto, NULL AS fecha, NULL AS metodo
+    FROM detalle_servicio WHERE id_orden=%s
+    UNION ALL
+    SELECT 'R' AS t, id_detalle_repuesto AS id, descripcion, cantidad, precio_unitario,
+           NULL, NULL, NULL
+    FROM detalle_repuesto WHERE id_orden=%s
+    UNION ALL
+    SELECT 'A' AS t, id_abono AS id, NULL, NULL, NULL,
+           monto, creado_en, metodo
+    FROM abono WHERE id_orden=%s
+    ORDER BY t, fecha, id
+"""
+
+def _cargar_factura(cur, id_orden: int):
     """
-    Devuelve (id_col, label_col, price_col, rows) de cat_servicio.
-    Soporta: id_servicio | nombre/descripcion | precio_base/precio_ref/precio_unitario/precio
+    (ot, servicios, repuestos, abonos) con 2 consultas sobre el mismo cursor
+    (dict), o None si la OT no existe.
+    """
+    cur.execute(_sql_cabecera(), (id_orden,))
+    ot = cur.fetchone()
+    if not ot:
+        return None
+    cur.execute(_SQL_LINEAS, (id_orden, id_orden, id_orden))
+    servicios, repuestos, abonos = [], [], []
+    for r in cur.fetchall():
+        if r["t"] == "S":
+            servicios.append({"id": r["id"], "descripcion": r["descripcion"],
+                              "cantidad": r["cantidad"], "precio_unitario": r["precio_unitario"]})
+        elif r["t"] == "R":
+            repuestos.append({"id": r["id"], "descripcion": r["descripcion"],
+                              "cantidad": r["cantidad"], "precio_unitario": r["precio_unitario"]})
+        else:
+            abonos.append({"id_abono": r["id"], "monto": r["monto"],
+                           "fecha": r["fecha"], "metodo": r["metodo"]})
+    return ot, servicios, repuestos, abonos
+
+# ---------- emisión por lote ----------
+def _en(n: int) -> str:
+    return ", ".join(["%s"] * n)
+
+def _emitir_bloque(cur, ids: list, id_usuario: int):
     """
-    cols = _cols(cur, "cat_servicio")
-    if not cols: return (None, None, None, [])
-
-    idc   = _first(cols, [c for c in cols if c.startswith("id_")], None) or "id_servicio"
-    label = _first(cols, ["nombre","descripcion"]) or next(iter(cols))
-    price = _first(cols, ["precio_base","precio_ref","precio_unitario","precio","valor","monto"])
-
-    # construir SELECT seguro
-    sel = [f"{idc} AS id", f"{label} AS d"]
-    if price:
-        sel.append(f"{price} AS p")
-    else:
-        sel.append("0 AS p")
-
-    # filtrar por activo si existe
-    where = "WHERE activo=1" if "activo" in cols else ""
-    cur.execute(f"SELECT {', '.join(sel)} FROM cat_servicio {where} ORDER BY d")
-    rows = cur.fetchall()
-    return (idc, label, price or "p", rows)
-
-def _repuesto_cat(cur):
+    Factura las órdenes `ids` en la transacción de `cur` (el que llama hace
+    commit/rollback): totales de todas en una sentencia, filas bloqueadas,
+    y comprobantes / estado / mov_caja con una sentencia multi-fila cada uno.
+    Devuelve (emitidas, rechazadas); las rechazadas no tocan la base.
     """
-    Devuelve (id_col, label_col, price_col, rows) de repuesto.
-    Soporta: id_repuesto | nombre/descripcion | precio_unitario/precio_base/precio
+    oc = _orden_cols()
+    saldos.recalcular_varias(ids, cur)      # misma regla que emitir_post: totales recalculados
+    # mismo bloqueo que emitir_post (fila de orden_saldo): no se cruzan con una emisión individual
+    cur.execute(f"""
+        SELECT o.id_orden, {('o.'+oc['estado']) if oc['estado'] else 'NULL'} AS estado,
+               s.subtotal, s.pagado
+        FROM orden_trabajo o
+        JOIN orden_saldo s ON s.id_orden = o.id_orden
+        WHERE o.id_orden IN ({_en(len(ids))})
+        FOR UPDATE
+    """, tuple(ids))
+    filas = {r["id_orden"]: r for r in cur.fetchall()}
+
+    facturar, rechazadas = [], []
+    for i in ids:
+        r = filas.get(i)
+        if r is None:
+            rechazadas.append((i, "No existe la orden."))
+        elif r["estado"] == "FACTURADA":
+            rechazadas.append((i, "Ya estaba facturada."))
+        elif not r["subtotal"] or r["subtotal"] <= 0:
+            rechazadas.append((i, "Sin servicios ni repuestos que facturar."))
+        else:
+            facturar.append((i,) + _totales(r["subtotal"], r["pagado"]))
+    if not facturar:
+        return [], rechazadas
+
+    n = len(facturar)
+    ids_ok = tuple(f[0] for f in facturar)
+    cur.execute(
+        "INSERT INTO comprobante (id_orden, tipo, subtotal, iva, total, creado_por) VALUES "
+        + ", ".join(["(%s, 'FACTURA', %s, %s, %s, %s)"] * n),
+        tuple(v for i, base, iva, total in facturar for v in (i, str(base), str(iva), str(total), id_usuario)))
+    # el comprobante recién insertado es el último de cada orden (filas bloqueadas arriba)
+    cur.execute(f"""
+        SELECT id_orden, MAX(id_comprobante) AS id_comprobante
+        FROM comprobante WHERE id_orden IN ({_en(n)}) GROUP BY id_orden
+    """, ids_ok)
+    comp = {r["id_orden"]: r["id_comprobante"] for r in cur.fetchall()}
+
+    if oc["estado"]:
+        cur.execute(f"UPDATE orden_trabajo SET {oc['estado']}='FACTURADA' WHERE id_orden IN ({_en(n)})", ids_ok)
+    if esquema.nombres("mov_caja"):
+        cur.execute(
+            "INSERT INTO mov_caja (tipo, monto, motivo, id_orden, id_comprobante, creado_por) VALUES "
+            + ", ".join(["('INGRESO', %s, %s, %s, %s, %s)"] * n),
+            tuple(v for i, _, _, total in facturar
+                  for v in (str(total), f"Factura OT #{i}", i, comp[i], id_usuario)))
+    return [(i, comp[i], total) for i, _, _, total in facturar], rechazadas
+
+def emitir_lote(ids, id_usuario: int, lote: int = LOTE, avance=None) -> dict:
     """
-    cols = _cols(cur, "repuesto")
-    if not cols: return (None, None, None, [])
+    Emite la factura de cada orden de `ids`, de a `lote` órdenes por
+    transacción. Si la base rechaza un bloque se reintenta orden por orden:
+    el error queda en la orden que lo causó y el resto se factura.
+    avance(hechas, total, emitidas, fallidas) se llama tras cada bloque.
 
-    idc   = _first(cols, [c for c in cols if c.startswith("id_")], None) or "id_repuesto"
-    label = _first(cols, ["nombre","descripcion"]) or next(iter(cols))
-    price = _first(cols, ["precio_unitario","precio_base","precio","valor","monto"])
+    {"emitidas": [(id_orden, id_comprobante, total)], "fallidas": [(id_orden, motivo)]}
+    """
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    lote = max(1, lote)
+    emitidas, fallidas = [], []
+    cn = get_conn(); cur = cn.cursor(dictionary=True)
 
-    sel = [f"{idc} AS id", f"{label} AS d"]
-    if price:
-        sel.append(f"{price} AS p")
-    else:
-        sel.append("0 AS p")
+    def intentar(bloque):
+        try:
+            e, f = _emitir_bloque(cur, bloque, id_usuario)
+            cn.commit()
+        except Error as ex:
+            cn.rollback()
+            if len(bloque) == 1:
+                return [], [(bloque[0], str(ex))]
+            e, f = [], []
+            for i in bloque:
+                e1, f1 = intentar([i])
+                e += e1; f += f1
+        return e, f
 
-    where = "WHERE activo=1" if "activo" in cols else ""
-    cur.execute(f"SELECT {', '.join(sel)} FROM repuesto {where} ORDER BY d")
-    rows = cur.fetchall()
-    return (idc, label, price or "p", rows)
+    try:
+        for k in range(0, len(ids), lote):
+            e, f = intentar(ids[k:k + lote])
+            emitidas += e; fallidas += f
+            if avance:
+                avance(min(k + lote, len(ids)), len(ids), len(emitidas), len(fallidas))
+    finally:
+        cur.close(); cn.close()
+    return {"emitidas": emitidas, "fallidas": fallidas}
+
+def _ids_de(texto: str) -> list:
+    """'12, 13\n14 #15' -> [12, 13, 14, 15]"""
+    return [int(x) for x in re.findall(r"\d+", texto or "")]
+
+def _pendientes_cliente(cur, id_cliente: int) -> list:
+    """Órdenes del cliente que aún no están facturadas (más antiguas primero). `cur` sin dictionary."""
+    estado = _orden_cols()["estado"]
+    cur.execute(f"""
+        SELECT id_orden FROM orden_trabajo
+        WHERE id_cliente=%s {f"AND {estado} <> 'FACTURADA'" if estado else ''}
+        ORDER BY id_orden
+    """, (id_cliente,))
+    return [r[0] for r in cur.fetchall()]
 
 # ---------- vistas ----------
 @bp.get("/emitir/<int:id_orden>")
 @login_required
 @roles_required("administrador", "facturador")
 def emitir_form(id_orden: int):
-    cn = get_conn()
-    cur_i = cn.cursor()               # introspección (tuplas)
-    cur   = cn.cursor(dictionary=True)
-
-    oc = _orden_cols(cur_i); cc = _cliente_cols(cur_i)
+    # Detalle sobre la conexión del request y un único cursor; catálogos desde memoria
+    cn = request_conn()
+    cur = cn.cursor(dictionary=True)
 
-    cur.execute(f"""
-        SELECT o.id_orden,
-               {('o.'+oc['desc']) if oc['desc'] else 'NULL'} AS descripcion,
-               {('o.'+oc['estado']) if oc['estado'] else 'NULL'} AS estado,
-               {('o.'+oc['creado_en']) if oc['creado_en'] else 'NULL'} AS creado_en,
-               {('o.'+oc['fecha_recepcion']) if oc['fecha_recepcion'] else 'NULL'} AS fecha_recepcion,
-               o.id_cliente,
-               CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cli_nombre,
-               {('c.'+cc['identificacion']) if cc['identificacion'] else 'NULL'} AS cli_identificacion,
-               {('c.'+cc['tel']) if cc['tel'] else 'NULL'} AS cli_tel,
-               c.email AS cli_email
-        FROM orden_trabajo o
-        JOIN cliente c ON c.id_cliente=o.id_cliente
-        WHERE o.id_orden=%s
-    """, (id_orden,))
-    ot = cur.fetchone()
-    if not ot:
-        cur.close(); cur_i.close(); cn.close()
+    datos = _cargar_factura(cur, id_orden)
+    if not datos:
+        cur.close(); cn.close()
         flash("No existe la Orden indicada.", "warning")
         return redirect(url_for("index"))
+    ot, servicios, repuestos, abonos = datos
 
-    # detalle servicios
-    cur.execute("""
-        SELECT id_detalle_servicio AS id, descripcion, cantidad, precio_unitario
-        FROM detalle_servicio WHERE id_orden=%s
-    """, (id_orden,))
-    servicios = cur.fetchall()
-
-    # detalle repuestos
-    cur.execute("""
-        SELECT id_detalle_repuesto AS id, descripcion, cantidad, precio_unitario
-        FROM detalle_repuesto WHERE id_orden=%s
-    """, (id_orden,))
-    repuestos = cur.fetchall()
-
-    # abonos
-    cur.execute("""
-        SELECT id_abono, monto, creado_en AS fecha, metodo
-        FROM abono WHERE id_orden=%s ORDER BY creado_en
-    """, (id_orden,))
-    abonos = cur.fetchall()
-
-    # catálogos (usar cursor de tuplas para introspección fiable)
-    sid, sdesc, sprice, cat_serv = _cat_servicio(cn.cursor())
-    rid, rdesc, rprice, cat_rep  = _repuesto_cat(cn.cursor())
-
-    cur.close(); cur_i.close(); cn.close()
+    # totales mantenidos en orden_saldo (no se vuelven a sumar las líneas)
+    t = saldos.leer(id_orden, cur)
+    cur.close(); cn.close()
 
-    dinero = lambda v: decimal.Decimal(str(v or 0))
-    subtotal_servicios = sum(dinero(s["cantidad"]) * dinero(s["precio_unitario"]) for s in servicios) if servicios else decimal.Decimal("0")
-    subtotal_repuestos = sum(dinero(r["cantidad"]) * dinero(r["precio_unitario"]) for r in repuestos) if repuestos else decimal.Decimal("0")
-    subtotal = subtotal_servicios + subtotal_repuestos
-    pagado   = sum(dinero(a["monto"]) for a in abonos) if abonos else decimal.Decimal("0")
-    iva      = (subtotal - pagado) * _iva_pct() if subtotal > pagado else decimal.Decimal("0")
-    total    = (subtotal - pagado) + iva
+    subtotal_servicios = t["subtotal_servicios"]
+    subtotal_repuestos = t["subtotal_repuestos"]
+    subtotal = t["subtotal"]
+    pagado   = t["pagado"]
+    _, iva, total = _totales(subtotal, pagado)
 
     return render_template(
         "facturacion_emitir.html",
@@ -172,7 +266,7 @@ def emitir_form(id_orden: int):
         subtotal_servicios=subtotal_servicios, subtotal_repuestos=subtotal_repuestos,
         abonos=abonos, subtotal=subtotal, pagado=pagado, iva=iva, total=total,
         iva_pct=int(_iva_pct()*100),
-        cat_serv=cat_serv, cat_rep=cat_rep,
+        cat_serv=catalogo.activos("cat_servicio"), cat_rep=catalogo.activos("repuesto"),
         no_servicios=(len(servicios)==0), no_repuestos=(len(repuestos)==0), no_abonos=(len(abonos)==0)
     )
 
@@ -185,23 +279,12 @@ def agregar_servicio(id_orden:int):
     cant    = request.form.get("srv_cant", type=float) or 1.0
     precio  = request.form.get("srv_precio", type=float) or 0.0
 
-    # si viene id, pero sin desc/precio, tomar del catálogo
+    # si viene id, pero sin desc/precio, tomar del catálogo (en memoria)
     if srv_id and (not desc or precio <= 0):
-        cn = get_conn(); ci = cn.cursor()
-        try:
-            cols = _cols(ci, "cat_servicio")
-            label = _first(cols, ["descripcion","nombre"]) or next(iter(cols))
-            price = _first(cols, ["precio_base","precio_ref","precio_unitario","precio","valor","monto"])
-            if price:
-                ci.execute(f"SELECT {label}, {price} FROM cat_servicio WHERE id_servicio=%s", (srv_id,))
-            else:
-                ci.execute(f"SELECT {label}, 0 FROM cat_servicio WHERE id_servicio=%s", (srv_id,))
-            r = ci.fetchone()
-            if r:
-                if not desc:   desc = r[0]
-                if precio<=0:  precio = float(r[1] or 0)
-        finally:
-            ci.close(); cn.close()
+        r = catalogo.item("cat_servicio", srv_id)
+        if r:
+            if not desc:   desc = r["t"] or r["d"]
+            if precio<=0:  precio = float(r["p"] or 0)
 
     if not desc:
         flash("Selecciona o escribe un servicio.", "warning")
@@ -213,6 +296,7 @@ def agregar_servicio(id_orden:int):
             INSERT INTO detalle_servicio (id_orden, descripcion, cantidad, precio_unitario)
             VALUES (%s, %s, %s, %s)
         """, (id_orden, desc, str(cant), str(precio)))
+        saldos.recalcular(id_orden, cur)
         cn.commit()
         flash("Servicio agregado.", "success")
     except Error as e:
@@ -232,21 +316,10 @@ def agregar_repuesto(id_orden:int):
     precio  = request.form.get("rep_precio", type=float) or 0.0
 
     if rep_id and (not desc or precio <= 0):
-        cn = get_conn(); ci = cn.cursor()
-        try:
-            cols = _cols(ci, "repuesto")
-            label = _first(cols, ["descripcion","nombre"]) or next(iter(cols))
-            price = _first(cols, ["precio_unitario","precio_base","precio","valor","monto"])
-            if price:
-                ci.execute(f"SELECT {label}, {price} FROM repuesto WHERE id_repuesto=%s", (rep_id,))
-            else:
-                ci.execute(f"SELECT {label}, 0 FROM repuesto WHERE id_repuesto=%s", (rep_id,))
-            r = ci.fetchone()
-            if r:
-                if not desc:   desc = r[0]
-                if precio<=0:  precio = float(r[1] or 0)
-        finally:
-            ci.close(); cn.close()
+        r = catalogo.item("repuesto", rep_id)
+        if r:
+            if not desc:   desc = r["t"] or r["d"]
+            if precio<=0:  precio = float(r["p"] or 0)
 
     if not desc:
         flash("Selecciona o escribe un repuesto.", "warning")
@@ -258,6 +331,7 @@ def agregar_repuesto(id_orden:int):
             INSERT INTO detalle_repuesto (id_orden, descripcion, cantidad, precio_unitario)
             VALUES (%s, %s, %s, %s)
         """, (id_orden, desc, str(cant), str(precio)))
+        saldos.recalcular(id_orden, cur)
         cn.commit()
         flash("Repuesto agregado.", "success")
     except Error as e:
@@ -270,28 +344,21 @@ def agregar_repuesto(id_orden:int):
 @bp.post("/emitir/<int:id_orden>")
 @login_required
 @roles_required("administrador", "facturador")
+@idempotencia.idempotente      # doble clic / reenvío: el mismo comprobante, no otro
 def emitir_post(id_orden: int):
-    cn = get_conn(); cur = cn.cursor()
+    cn = get_conn(); cur = cn.cursor(dictionary=True)
     try:
-        cur.execute("""
-            SELECT COALESCE(SUM(cantidad * precio_unitario),0)
-            FROM (
-                SELECT cantidad, precio_unitario FROM detalle_servicio WHERE id_orden=%s
-                UNION ALL
-                SELECT cantidad, precio_unitario FROM detalle_repuesto WHERE id_orden=%s
-            ) x
-        """, (id_orden, id_orden))
-        subtotal = decimal.Decimal(str(cur.fetchone()[0] or 0))
-        cur.execute("SELECT COALESCE(SUM(monto),0) FROM abono WHERE id_orden=%s", (id_orden,))
-        pagado = decimal.Decimal(str(cur.fetchone()[0] or 0))
-
-        iva = (subtotal - pagado) * _iva_pct() if subtotal > pagado else decimal.Decimal("0")
-        total = (subtotal - pagado) + iva
+        # se factura sobre los totales recalculados de las líneas, igual que en el lote
+        # (orden_saldo puede estar vieja si algo escribió líneas por fuera de la app);
+        # la fila resumen queda bloqueada hasta el commit: nadie agrega líneas a mitad
+        saldos.recalcular(id_orden, cur)
+        t = saldos.leer(id_orden, cur, para_actualizar=True)
+        base, iva, total = _totales(t["subtotal"], t["pagado"])
 
         cur.execute("""
             INSERT INTO comprobante (id_orden, tipo, subtotal, iva, total, creado_por)
             VALUES (%s, 'FACTURA', %s, %s, %s, %s)
-        """, (id_orden, str(subtotal - pagado), str(iva), str(total), int(current_user.id)))
+        """, (id_orden, str(base), str(iva), str(total), int(current_user.id)))
         id_comp = cur.lastrowid
 
         try: cur.execute("UPDATE orden_trabajo SET estado=%s WHERE id_orden=%s", ("FACTURADA", id_orden))
@@ -305,6 +372,7 @@ def emitir_post(id_orden: int):
         except Error: pass
 
         cn.commit()
+        idempotencia.confirmar()
         flash(f"Factura emitida (Comprobante #{id_comp}).", "success")
         return redirect(url_for("facturacion.imprimir", id_comprobante=id_comp))
 
@@ -320,7 +388,7 @@ def emitir_post(id_orden: int):
 @login_required
 @roles_required("administrador", "facturador")
 def imprimir(id_comprobante: int):
-    cn = get_conn(); cur = cn.cursor(dictionary=True)
+    cn = request_conn(); cur = cn.cursor(dictionary=True)
     cur.execute("""
         SELECT comp.id_comprobante, comp.tipo, comp.subtotal, comp.iva, comp.total, comp.creado_en,
                o.id_orden, CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cli_nombre,
@@ -347,3 +415,76 @@ def imprimir(id_comprobante: int):
 
     cur.close(); cn.close()
     return render_template("facturacion_imprimir.html", data=data, items=items, iva_pct=int(_iva_pct()*100))
+
+# ---------- emisión por lote: vista y CLI ----------
+@bp.get("/lote")
+@login_required
+@roles_required("administrador", "facturador")
+def lote_form():
+    return render_template("facturacion_lote.html", res=None, limite=LOTE_WEB_MAX)
+
+@bp.post("/lote")
+@login_required
+@roles_required("administrador", "facturador")
+def lote_post():
+    """
+    Factura varias órdenes (lista de números o todas las pendientes de un
+    cliente). Repetirla es inocua: las ya facturadas se informan y se saltan.
+    """
+    ids = _ids_de(request.form.get("ids"))
+    id_cliente = request.form.get("id_cliente", type=int)
+    if id_cliente:
+        cn = request_conn(); cur = cn.cursor()
+        ids += _pendientes_cliente(cur, id_cliente)
+        cur.close(); cn.close()
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        flash("Indica los números de orden o un cliente con órdenes pendientes.", "warning")
+        return redirect(url_for("facturacion.lote_form"))
+    if len(ids) > LOTE_WEB_MAX:
+        flash(f"Son {len(ids)} órdenes; desde la web se facturan hasta {LOTE_WEB_MAX} por vez "
+              f"(para más: flask facturacion emitir-lote).", "warning")
+        return redirect(url_for("facturacion.lote_form"))
+
+    res = emitir_lote(ids, int(current_user.id))
+    if res["emitidas"]:
+        flash(f"{len(res['emitidas'])} factura(s) emitida(s).", "success")
+    if res["fallidas"]:
+        flash(f"{len(res['fallidas'])} orden(es) sin facturar; revisa el detalle.", "warning")
+    return render_template("facturacion_lote.html", res=res, limite=LOTE_WEB_MAX,
+                           total=sum((t for _, _, t in res["emitidas"]), decimal.Decimal("0")))
+
+@bp.cli.command("emitir-lote")
+@click.argument("ids", nargs=-1, type=int)
+@click.option("--archivo", type=click.File("r"), help="Números de orden (separados por espacios, comas o líneas); '-' lee stdin.")
+@click.option("--cliente", type=int, help="Agrega todas las órdenes sin facturar de este cliente.")
+@click.option("--lote", type=int, default=LOTE, show_default=True, help="Órdenes por transacción.")
+@click.option("--usuario", default=lambda: os.getenv("ADMIN_BOOT_USER", "admin"), help="Login que queda como creado_por.")
+def emitir_lote_cli(ids, archivo, cliente, lote, usuario):
+    """Emite facturas de muchas órdenes (cierre de mes): flask facturacion emitir-lote 101 102 --cliente 7"""
+    ids = list(ids) + (_ids_de(archivo.read()) if archivo else [])
+    cn = get_conn(); cur = cn.cursor()
+    try:
+        cur.execute("SELECT id_usuario FROM usuario WHERE usuario_login=%s", (usuario,))
+        fila = cur.fetchone()
+        if cliente:
+            ids += _pendientes_cliente(cur, cliente)
+    finally:
+        cur.close(); cn.close()
+    if not fila:
+        raise click.UsageError(f"No existe el usuario {usuario!r}.")
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise click.UsageError("No hay órdenes para facturar.")
+
+    click.echo(f"Facturando {len(ids)} órdenes de a {lote}...")
+    def avance(hechas, total, n_ok, n_mal):
+        click.echo(f"  {hechas}/{total}  emitidas {n_ok}  con error {n_mal}")
+    res = emitir_lote(ids, fila[0], lote, avance)
+
+    for i, motivo in res["fallidas"]:
+        click.echo(f"  OT #{i}: {motivo}", err=True)
+    total = sum((t for _, _, t in res["emitidas"]), decimal.Decimal("0"))
+    click.echo(f"Emitidas: {len(res['emitidas'])}  Total: {total:.2f}  Sin facturar: {len(res['fallidas'])}")
+    if res["fallidas"]:
+        raise SystemExit(1)
@@ -0,0 +1,148 @@
+# python/fk_opciones.py
+"""
+Opciones (id, label) para los <select> de FKs de los formularios genéricos.
+
+- La expresión de etiqueta de cada tabla se resuelve una vez por versión del esquema.
+- La lista de opciones queda en un cache LRU hasta que la tabla se escribe
+  desde la app (invalidar(tabla)) o vence FK_OPCIONES_TTL.
+- Si la tabla tiene más de FK_OPCIONES_MAX filas, opciones() devuelve None y
+  el formulario busca por páginas en /fk/<tabla>/<columna>.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, List
+
+from flask import Blueprint, request, jsonify, abort
+from flask_login import login_required
+
+from python.conexion import query, query_one
+from python.cache import CacheLRU
+from python import esquema
+
+OPCIONES_MAX = int(os.getenv("FK_OPCIONES_MAX", "500"))      # más filas => búsqueda paginada
+BUSQUEDA_LIMITE = 20
+BUSQUEDA_LIMITE_MAX = 100
+
+_opciones = CacheLRU("fk_opciones",
+                     maximo=int(os.getenv("FK_OPCIONES_CACHE", "64")),
+                     ttl=float(os.getenv("FK_OPCIONES_TTL", "600")))
+_etiquetas: tuple = (None, {})     # (versión del esquema, {tabla: expr}); se reemplaza entero
+
+bp = Blueprint("fk", __name__, url_prefix="/fk")
+
+# ---------- etiquetas ----------
+_PREFS = {
+    "identificacion", "cedula", "dni", "documento",
+    "nombre_completo", "nombre", "razon_social",
+    "descripcion", "detalle", "modelo", "marca",
+    "email", "usuario_login",
+}
+_TEXTO = ("varchar", "text", "char")
+
+def _pick_label_column(tabla: str) -> str:
+    """Primera columna de texto "bonita"; si no hay, cualquier texto; si no, la primera."""
+    cols = esquema.columnas(tabla)
+    for c in cols:
+        if c["DATA_TYPE"] in _TEXTO and c["COLUMN_NAME"] in _PREFS:
+            return c["COLUMN_NAME"]
+    for c in cols:
+        if c["DATA_TYPE"] in _TEXTO:
+            return c["COLUMN_NAME"]
+    return cols[0]["COLUMN_NAME"] if cols else "id"
+
+def _resolver_etiqueta(tabla: str) -> str:
+    """
+    Expresión SQL de la etiqueta. Para personas (nombres/apellidos + documento):
+    'Nombres Apellidos - Documento'; si no hay nombres, solo el documento.
+    """
+    doc_col = next((c for c in ("identificacion", "cedula", "dni", "documento")
+                    if esquema.tiene_columna(tabla, c)), None)
+    if doc_col:
+        if esquema.tiene_columna(tabla, "nombres") or esquema.tiene_columna(tabla, "apellidos"):
+            nombre_expr = "CONCAT(COALESCE(nombres,''),' ',COALESCE(apellidos,''))"
+            return f"CONCAT({nombre_expr}, ' - ', `{doc_col}`)"
+        return f"`{doc_col}`"
+    return f"`{_pick_label_column(tabla)}`"
+
+def etiqueta(tabla: str) -> str:
+    """Expresión de etiqueta cacheada por (versión del esquema, tabla)."""
+    global _etiquetas
+    ver = esquema.version()
+    vigente, exprs = _etiquetas
+    if vigente != ver:
+        exprs = {}
+        _etiquetas = (ver, exprs)
+    expr = exprs.get(tabla)
+    if expr is None:
+        expr = exprs[tabla] = _resolver_etiqueta(tabla)
+    return expr
+
+def _where_activo(tabla: str) -> str:
+    return "`activo`=1" if esquema.tiene_columna(tabla, "activo") else "1=1"
+
+# ---------- opciones ----------
+def opciones(tabla: str, ref_col: str) -> List[Dict[str, Any]] | None:
+    """
+    Lista completa [{id, label}] si la tabla es chica; None si supera
+    FK_OPCIONES_MAX (usar la búsqueda paginada).
+    """
+    clave = (tabla, ref_col)
+    rows = _opciones.get(clave, default=False)
+    if rows is not False:
+        return rows
+    # Conteo acotado: no recorre más de OPCIONES_MAX+1 filas
+    n = query_one(
+        f"SELECT COUNT(*) AS n FROM (SELECT 1 FROM `{tabla}` WHERE {_where_activo(tabla)} LIMIT %s) x",
+        (OPCIONES_MAX + 1,),
+    )["n"]
+    if n > OPCIONES_MAX:
+        rows = None
+    else:
+        rows = query(
+            f"SELECT `{ref_col}` AS id, {etiqueta(tabla)} AS label "
+            f"FROM `{tabla}` WHERE {_where_activo(tabla)} ORDER BY label"
+        )
+    _opciones.set(clave, rows)
+    return rows
+
+def opcion(tabla: str, ref_col: str, valor) -> Dict[str, Any] | None:
+    """Una sola opción (para mostrar el valor actual cuando la tabla es grande)."""
+    if valor in (None, ""):
+        return None
+    return query_one(
+        f"SELECT `{ref_col}` AS id, {etiqueta(tabla)} AS label FROM `{tabla}` WHERE `{ref_col}`=%s",
+        (valor,),
+    )
+
+def buscar(tabla: str, ref_col: str, q: str, despues=None, limite: int = BUSQUEDA_LIMITE):
+    """Página de opciones cuya etiqueta contiene q, ordenadas por id (cursor = último id)."""
+    where, params = [_where_activo(tabla)], []
+    if q:
+        esc = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append(f"{etiqueta(tabla)} LIKE %s"); params.append(f"%{esc}%")
+    if despues not in (None, ""):
+        where.append(f"`{ref_col}` > %s"); params.append(despues)
+    rows = query(
+        f"SELECT `{ref_col}` AS id, {etiqueta(tabla)} AS label FROM `{tabla}` "
+        f"WHERE {' AND '.join(where)} ORDER BY `{ref_col}` LIMIT %s",
+        tuple(params) + (limite + 1,),
+    )
+    hay_mas = len(rows) > limite
+    rows = rows[:limite]
+    return {"items": rows, "siguiente": rows[-1]["id"] if (hay_mas and rows) else None}
+
+def invalidar(tabla: str) -> None:
+    """Llamar después de escribir en `tabla` desde la app."""
+    _opciones.borrar_si(lambda k: k[0] == tabla)
+
+# ---------- búsqueda para tablas grandes ----------
+@bp.get("/<tabla>/<columna>")
+@login_required
+def api_buscar(tabla: str, columna: str):
+    # Solo columnas que son destino de alguna FK (no exponer tablas arbitrarias)
+    if not esquema.es_referenciada(tabla, columna):
+        abort(404)
+    limite = min(max(request.args.get("limite", type=int) or BUSQUEDA_LIMITE, 1), BUSQUEDA_LIMITE_MAX)
+    return jsonify(buscar(tabla, columna,
+                          (request.args.get("q") or "").strip(),
+                          request.args.get("despues"), limite))
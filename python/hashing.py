@@ -0,0 +1,136 @@
+# python/hashing.py
+"""
+Hash de contraseñas fuera del hilo del request.
+
+- HASH_METODO: método de werkzeug con su costo, p.ej. "scrypt:32768:8:1"
+  (defecto de werkzeug) o "pbkdf2:sha256:600000". Bajarlo o subirlo no rompe
+  los hashes guardados: cada uno lleva su método.
+- HASH_PROCESOS > 0: generar/verificar corren en un pool de procesos acotado
+  (el CPU del hash no compite con los hilos de Flask); con 0 corren en el
+  hilo que llama (hashlib suelta el GIL durante scrypt/pbkdf2).
+- HASH_COLA: hashes en vuelo como máximo (por defecto 4 por proceso); si está
+  lleno se espera hasta HASH_ESPERA seg. y después HashOcupado.
+- verificar() dice además si el hash quedó viejo (otro método/costo) y trae
+  el nuevo, para que el login lo reemplace sin pedir nada al usuario.
+"""
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+METODO   = os.getenv("HASH_METODO", "scrypt")
+PROCESOS = int(os.getenv("HASH_PROCESOS", "0"))
+COLA     = int(os.getenv("HASH_COLA", "0")) or max(1, PROCESOS) * 4
+ESPERA   = float(os.getenv("HASH_ESPERA", "5"))
+
+class HashOcupado(RuntimeError):
+    """Demasiados hashes en vuelo (no hubo lugar dentro de HASH_ESPERA)."""
+
+# ---------- trabajo (corre en el proceso hijo; funciones de módulo para poder picklear) ----------
+def metodo_de(h: str) -> str:
+    """'scrypt:32768:8:1$sal$hex' -> 'scrypt:32768:8:1'."""
+    return (h or "").split("$", 1)[0]
+
+def _generar(password: str, metodo: str) -> str:
+    return generate_password_hash(password, method=metodo)
+
+def _verificar(h: str, password: str, metodo_actual: str) -> Tuple[bool, str | None]:
+    if not check_password_hash(h, password):
+        return False, None
+    if metodo_de(h) == metodo_actual:
+        return True, None
+    return True, generate_password_hash(password, method=metodo_actual)
+
+# ---------- hasher ----------
+def _contexto():
+    """
+    fork donde existe: spawn/forkserver vuelven a ejecutar el __main__ en cada
+    hijo (con `python app.py`, un create_app() por proceso). Para no heredar
+    locks tomados por otros hilos, create_app() llama a precalentar() antes de
+    servir, con el proceso todavía en un solo hilo.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+class _Hasher:
+    def __init__(self, metodo: str, procesos: int, cola: int, espera: float):
+        self.metodo = metodo
+        # método completo con su costo ("scrypt" -> "scrypt:32768:8:1"), para comparar hashes
+        self.metodo_completo = metodo_de(generate_password_hash("", method=metodo))
+        self.procesos = max(0, procesos)
+        self.espera = espera
+        self._cupos = threading.BoundedSemaphore(max(1, cola))
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _ejecutor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.procesos, mp_context=_contexto())
+        return self._pool
+
+    def _correr(self, fn, *args):
+        if not self._cupos.acquire(timeout=self.espera):
+            raise HashOcupado(f"Más de {self._cupos._initial_value} hashes en vuelo.")
+        try:
+            if not self.procesos:
+                return fn(*args)
+            try:
+                return self._ejecutor().submit(fn, *args).result()
+            except BrokenProcessPool:
+                with self._lock:          # un hijo murió: se recrea el pool en el próximo uso
+                    self._pool = None
+                return fn(*args)
+        finally:
+            self._cupos.release()
+
+    def generar(self, password: str) -> str:
+        return self._correr(_generar, password, self.metodo)
+
+    def verificar(self, h: str, password: str) -> Tuple[bool, str | None]:
+        return self._correr(_verificar, h, password, self.metodo_completo)
+
+    def precalentar(self) -> None:
+        """Levanta los procesos del pool ahora (y no en el primer login, desde un hilo del servidor)."""
+        if self.procesos:
+            list(self._ejecutor().map(metodo_de, [""] * self.procesos))
+
+    def cerrar(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+_hasher: _Hasher | None = None
+_hasher_lock = threading.Lock()
+
+def _actual() -> _Hasher:
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = _Hasher(METODO, PROCESOS, COLA, ESPERA)
+    return _hasher
+
+def generar(password: str) -> str:
+    """Hash nuevo con HASH_METODO."""
+    return _actual().generar(password)
+
+def verificar(h: str, password: str) -> Tuple[bool, str | None]:
+    """
+    (coincide, hash_nuevo). hash_nuevo no es None cuando la contraseña es
+    correcta pero el hash guardado usa otro método/costo: guardarlo.
+    """
+    if not h:
+        return False, None
+    return _actual().verificar(h, password)
+
+def precalentar() -> None:
+    _actual().precalentar()
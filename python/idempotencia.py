@@ -0,0 +1,157 @@
+# python/idempotencia.py
+"""
+Idempotencia de POST que crean cosas (orden.crear, facturacion.emitir_post).
+
+El formulario lleva una clave única (campo oculto `_idem`, generado al
+dibujarlo con clave_idempotencia(); un cliente de API puede mandar la
+cabecera Idempotency-Key). El primer POST con esa clave corre la vista; si
+la vista llama a confirmar() (después del commit) se guarda su redirect y
+sus mensajes flash. Un reenvío con la misma clave y los mismos datos
+dentro de IDEM_VENTANA seg. no vuelve a insertar: recibe el mismo redirect.
+
+- Doble clic: el segundo POST espera hasta IDEM_ESPERA seg. a que termine
+  el primero y repite su resultado. Si el primero falló (no confirmó), el
+  segundo corre normalmente: reintentar tras un error sigue funcionando.
+- La clave se combina con el usuario, el endpoint y una huella de los
+  datos: volver atrás, cambiar el formulario y reenviarlo con la misma
+  clave es otra operación.
+- Almacén en memoria por proceso, acotado a IDEM_MAX claves (LRU).
+- Sin clave la vista corre como siempre.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import flash, g, redirect, request, session, url_for
+from flask_login import current_user
+
+VENTANA = float(os.getenv("IDEM_VENTANA", "600"))
+MAX     = int(os.getenv("IDEM_MAX", "10000"))
+ESPERA  = float(os.getenv("IDEM_ESPERA", "15"))
+
+CAMPO   = "_idem"
+CABECERA = "Idempotency-Key"
+_RE_CLAVE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def clave_idempotencia() -> str:
+    """Clave nueva para un formulario (uso en plantillas)."""
+    return uuid.uuid4().hex
+
+# ---------- almacén ----------
+class _Entrada:
+    __slots__ = ("marca", "listo", "resultado")
+
+    def __init__(self):
+        self.marca = time.monotonic()
+        self.listo = threading.Event()
+        self.resultado = None           # (status, location, flashes) si la vista confirmó
+
+class _Almacen:
+    def __init__(self, maximo: int, ventana: float):
+        self.maximo = max(1, maximo)
+        self.ventana = ventana
+        self._d: "OrderedDict[tuple, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._cont = {"nuevas": 0, "repetidas": 0, "esperas": 0, "ocupadas": 0}
+
+    def tomar(self, clave: tuple):
+        """(entrada, nueva). Las entradas van en orden de creación: vencen desde el frente."""
+        ahora = time.monotonic()
+        with self._lock:
+            while self._d:
+                k, e = next(iter(self._d.items()))
+                if ahora - e.marca < self.ventana:
+                    break
+                del self._d[k]
+            e = self._d.get(clave)
+            if e is not None:
+                return e, False
+            e = self._d[clave] = _Entrada()
+            if len(self._d) > self.maximo:
+                self._d.popitem(last=False)
+            self._cont["nuevas"] += 1
+            return e, True
+
+    def terminar(self, clave: tuple, e: _Entrada, resultado) -> None:
+        e.resultado = resultado
+        if resultado is None:           # falló o no confirmó: la clave queda libre para reintentar
+            with self._lock:
+                if self._d.get(clave) is e:
+                    del self._d[clave]
+        e.listo.set()
+
+    def sumar(self, evento: str) -> None:
+        with self._lock:
+            self._cont[evento] += 1
+
+    def estado(self) -> dict:
+        with self._lock:
+            return dict(self._cont, claves=len(self._d))
+
+_almacen = _Almacen(MAX, VENTANA)
+
+def estado() -> dict:
+    """Claves guardadas y contadores (para /metrics)."""
+    return _almacen.estado()
+
+# ---------- decorador ----------
+def _clave() -> tuple | None:
+    c = (request.headers.get(CABECERA) or request.form.get(CAMPO) or "").strip()
+    if not _RE_CLAVE.match(c):
+        return None
+    datos = sorted((k, v) for k, v in request.form.items(multi=True) if k != CAMPO)
+    huella = hashlib.blake2b(repr(datos).encode(), digest_size=16).hexdigest()
+    usuario = current_user.get_id() if current_user.is_authenticated else None
+    return (usuario, request.endpoint, c, huella)
+
+def confirmar() -> None:
+    """La vista llama esto tras el commit: su respuesta se repite a los reenvíos."""
+    g._idem_confirmado = True
+
+def _repetir(resultado):
+    status, location, flashes = resultado
+    for categoria, mensaje in flashes:
+        flash(mensaje, categoria)
+    flash("Esta solicitud ya se había procesado; no se volvió a registrar.", "info")
+    return redirect(location, code=status)
+
+def idempotente(vista):
+    """Decorador para POST: repite el resultado confirmado de la primera solicitud con la misma clave."""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave = _clave()
+        if clave is None:
+            return vista(*args, **kwargs)
+
+        while True:
+            e, nueva = _almacen.tomar(clave)
+            if nueva:
+                break
+            if not e.listo.is_set():
+                _almacen.sumar("esperas")
+            if not e.listo.wait(ESPERA):
+                _almacen.sumar("ocupadas")
+                flash("La solicitud anterior todavía se está procesando. Revisa antes de reintentar.", "warning")
+                return redirect(request.referrer or url_for("index"))
+            if e.resultado is not None:
+                _almacen.sumar("repetidas")
+                return _repetir(e.resultado)
+            # la primera falló y liberó la clave: esta corre de nuevo
+
+        antes = len(session.get("_flashes", []))
+        g._idem_confirmado = False
+        resultado = None
+        try:
+            resp = vista(*args, **kwargs)
+            if g.get("_idem_confirmado") and 300 <= getattr(resp, "status_code", 0) < 400:
+                resultado = (resp.status_code, resp.location, list(session.get("_flashes", [])[antes:]))
+            return resp
+        finally:
+            _almacen.terminar(clave, e, resultado)
+    return envoltura
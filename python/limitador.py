@@ -0,0 +1,167 @@
+# python/limitador.py
+"""
+Limitador de intentos de login del lado del servidor (token bucket).
+
+Cada clave ("ip:<dir>", "usuario:<login>") tiene un balde de `capacidad`
+fichas que se recarga a razón de una cada `recarga` seg.; cada intento gasta
+una. Se consulta antes de reCAPTCHA, la DB y el hash, así que borrar la
+cookie ya no da intentos gratis. Cada operación es O(1).
+
+Almacenes:
+- memoria (por defecto): dict acotado (LRU de LIMITE_CLAVES) por proceso.
+- LIMITE_ARCHIVO=/ruta: tabla hash de tamaño fijo en un archivo mapeado en
+  memoria (mmap), compartida por todos los procesos de la máquina (gunicorn
+  -w N) con flock. Cada clave se guarda como un hash de 8 bytes; si su zona
+  está llena se pisa la entrada más vieja.
+"""
+from __future__ import annotations
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+ARCHIVO = os.getenv("LIMITE_ARCHIVO", "")
+CLAVES  = int(os.getenv("LIMITE_CLAVES", "65536"))      # entradas (memoria) / ranuras (archivo)
+
+# (capacidad, seg. por ficha)
+POR_IP      = (int(os.getenv("LIMITE_IP_CAPACIDAD", "20")), float(os.getenv("LIMITE_IP_RECARGA", "30")))
+POR_USUARIO = (int(os.getenv("LIMITE_USUARIO_CAPACIDAD", "3")), float(os.getenv("LIMITE_USUARIO_RECARGA", "100")))
+
+Estado = Optional[Tuple[float, float]]          # (fichas, marca de tiempo) o None si la clave no existe
+
+# ---------- almacenes ----------
+class _Memoria:
+    def __init__(self, maximo: int):
+        self.maximo = max(1, maximo)
+        self._d: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def actualizar(self, clave: str, fn: Callable[[Estado], Tuple[Estado, object]]):
+        with self._lock:
+            nuevo, res = fn(self._d.get(clave))
+            if nuevo is None:
+                self._d.pop(clave, None)
+            else:
+                self._d[clave] = nuevo
+                self._d.move_to_end(clave)
+                if len(self._d) > self.maximo:
+                    self._d.popitem(last=False)
+            return res
+
+class _Archivo:
+    """Ranuras de 24 bytes: hash (u64, 0 = libre), fichas (f64), marca (f64)."""
+    _FMT = struct.Struct("<Qdd")
+    SONDEO = 8                                  # ranuras revisadas por clave
+
+    def __init__(self, ruta: str, ranuras: int):
+        self.ranuras = max(self.SONDEO, ranuras)
+        largo = self.ranuras * self._FMT.size
+        self._fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != largo:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != largo:     # otro proceso pudo crearlo ya
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, largo)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, largo)
+        self._lock = threading.Lock()           # flock no excluye hilos del mismo proceso
+
+    @staticmethod
+    def _hash(clave: str) -> int:
+        # estable entre procesos (hash() de Python cambia por proceso)
+        return int.from_bytes(hashlib.blake2b(clave.encode(), digest_size=8).digest(), "little") or 1
+
+    def actualizar(self, clave: str, fn: Callable[[Estado], Tuple[Estado, object]]):
+        h = self._hash(clave)
+        base = h % self.ranuras
+        fmt, mm = self._FMT, self._mm
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                lugar, viejo = None, None
+                for i in range(self.SONDEO):
+                    off = ((base + i) % self.ranuras) * fmt.size
+                    hh, fichas, marca = fmt.unpack_from(mm, off)
+                    if hh == h:
+                        lugar, estado = off, (fichas, marca)
+                        break
+                    if hh == 0 and lugar is None:
+                        lugar = off
+                    if viejo is None or marca < viejo[1]:
+                        viejo = (off, marca)
+                else:
+                    estado = None
+                nuevo, res = fn(estado)
+                if nuevo is None:
+                    if estado is not None:      # borrar solo la propia; sin estado no se toca nada
+                        fmt.pack_into(mm, lugar, 0, 0.0, 0.0)
+                else:
+                    if lugar is None:
+                        lugar = viejo[0]        # zona llena al insertar: se pisa la entrada más vieja
+                    fmt.pack_into(mm, lugar, h, nuevo[0], nuevo[1])
+                return res
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+def _store():
+    global _almacen
+    if _almacen is None:
+        with _almacen_lock:
+            if _almacen is None:
+                _almacen = _Archivo(ARCHIVO, CLAVES) if ARCHIVO else _Memoria(CLAVES)
+    return _almacen
+
+# ---------- token bucket ----------
+def _recargar(estado: Estado, capacidad: int, recarga: float, ahora: float) -> float:
+    if estado is None:
+        return float(capacidad)
+    fichas, marca = estado
+    return min(float(capacidad), fichas + max(0.0, ahora - marca) / recarga)
+
+def tomar(clave: str, capacidad: int, recarga: float) -> float:
+    """Gasta una ficha. Devuelve 0 si hubo, o los seg. hasta la próxima (sin gastar)."""
+    ahora = time.time()
+    def fn(estado):
+        fichas = _recargar(estado, capacidad, recarga, ahora)
+        if fichas >= 1.0:
+            return (fichas - 1.0, ahora), 0.0
+        return (fichas, ahora), (1.0 - fichas) * recarga
+    return _store().actualizar(clave, fn)
+
+def espera(clave: str, capacidad: int, recarga: float) -> float:
+    """Seg. hasta que haya una ficha (0 = se puede intentar). No gasta."""
+    ahora = time.time()
+    def fn(estado):
+        fichas = _recargar(estado, capacidad, recarga, ahora)
+        return estado, (0.0 if fichas >= 1.0 else (1.0 - fichas) * recarga)
+    return _store().actualizar(clave, fn)
+
+def reiniciar(clave: str) -> None:
+    """Balde lleno otra vez (p.ej. tras un login correcto)."""
+    _store().actualizar(clave, lambda estado: (None, None))
+
+def devolver(clave: str, capacidad: int, recarga: float) -> None:
+    """Reintegra una ficha (sin pasar la capacidad)."""
+    ahora = time.time()
+    def fn(estado):
+        if estado is None:
+            return None, None
+        return (min(float(capacidad), _recargar(estado, capacidad, recarga, ahora) + 1.0), ahora), None
+    _store().actualizar(clave, fn)
+
+# ---------- claves del login ----------
+def clave_ip(ip: str | None) -> str:
+    return f"ip:{ip or '-'}"
+
+def clave_usuario(login: str) -> str:
+    return f"usuario:{login.strip().lower()}"
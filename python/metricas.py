@@ -0,0 +1,304 @@
+# python/metricas.py
+"""
+Métricas en formato de texto de Prometheus en /metrics.
+
+- Latencia por endpoint (histograma), requests y errores 5xx por blueprint.
+- Latencia de SQL por tabla y operación (histograma, vía observador de conexion).
+- Estado del pool de conexiones y aciertos/fallos de los caches en memoria.
+- Cola de la bitácora diferida (sesion/auditoria): profundidad y descartes.
+
+Apagado por defecto. METRICAS=1 lo activa, y /metrics exige
+METRICAS_TOKEN (Authorization: Bearer <token>); sin token solo se registra
+con METRICAS_ABIERTO=1 (p.ej. detrás de una red interna).
+
+Cada hilo suma en su propio dict (sin locks en el camino del request); /metrics
+junta los de todos los hilos. Lo de los hilos que terminaron se funde en un
+acumulador común, así la lista no crece con el servidor de un hilo por
+request. Con varios procesos (gunicorn -w N) definir METRICAS_DIR: cada
+proceso vuelca su foto ahí cada METRICAS_VOLCADO seg. y /metrics suma las
+de todos.
+"""
+from __future__ import annotations
+import atexit
+import glob
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from flask import Blueprint, Response, g, request
+
+from python.conexion import agregar_observador, pool_stats
+from python import cache, bitacora, idempotencia
+
+ACTIVO  = bool(int(os.getenv("METRICAS", "0")))
+DIR     = os.getenv("METRICAS_DIR", "")
+VOLCADO = float(os.getenv("METRICAS_VOLCADO", "5"))
+TOKEN   = os.getenv("METRICAS_TOKEN", "")          # Authorization: Bearer <token>
+ABIERTO = bool(int(os.getenv("METRICAS_ABIERTO", "0")))   # servir /metrics sin token
+
+_HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SQL_BUCKETS  = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# nombre -> (tipo, ayuda, buckets)
+_DEF = {
+    "http_request_duration_seconds": ("histogram", "Latencia de requests por endpoint", _HTTP_BUCKETS),
+    "http_requests_total":           ("counter",   "Requests por blueprint y clase de estado", None),
+    "http_errors_total":             ("counter",   "Respuestas 5xx por blueprint", None),
+    "db_query_duration_seconds":     ("histogram", "Latencia de sentencias SQL por tabla y operación", _SQL_BUCKETS),
+    "db_pool_conexiones":            ("gauge",     "Conexiones del pool por estado", None),
+    "db_pool_esperas_total":         ("counter",   "Veces que se esperó una conexión libre", None),
+    "cache_aciertos_total":          ("counter",   "Aciertos de caches en memoria", None),
+    "cache_fallos_total":            ("counter",   "Fallos de caches en memoria", None),
+    "cache_tamano":                  ("gauge",     "Entradas en caches en memoria", None),
+    "bitacora_cola":                 ("gauge",     "Eventos de sesion/auditoria esperando escritura", None),
+    "bitacora_spool":                ("gauge",     "Eventos pendientes en el spool local", None),
+    "bitacora_eventos_total":        ("counter",   "Eventos de sesion/auditoria por destino", None),
+    "bitacora_lotes_total":          ("counter",   "Lotes escritos en la base", None),
+    "bitacora_fallos_total":         ("counter",   "Lotes que fallaron al escribir", None),
+    "idempotencia_claves":           ("gauge",     "Claves de idempotencia guardadas", None),
+    "idempotencia_eventos_total":    ("counter",   "POST con clave de idempotencia por resultado", None),
+}
+
+Clave = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# ---------- agregación por hilo ----------
+_local = threading.local()
+_hilos: list = []                       # [(hilo, datos)] de los hilos vivos
+_muertos = {"c": {}, "h": {}}           # lo que sumaron los hilos que ya terminaron
+_lock = threading.Lock()
+
+def _sumar(acc: dict, d: dict) -> None:
+    for k, v in dict(d["c"]).items():              # dict() copia atómica bajo el GIL
+        acc["c"][k] = acc["c"].get(k, 0.0) + v
+    for k, fila in dict(d["h"]).items():
+        a = acc["h"].setdefault(k, [0] * (len(fila) - 1) + [0.0])
+        for i, v in enumerate(list(fila)):
+            a[i] += v
+
+def _podar() -> None:
+    """Funde en _muertos los hilos que terminaron (ya no escriben). Con _lock tomado."""
+    vivos = []
+    for hilo, d in _hilos:
+        if hilo.is_alive():
+            vivos.append((hilo, d))
+        else:
+            _sumar(_muertos, d)
+    _hilos[:] = vivos
+
+def _datos() -> dict:
+    d = getattr(_local, "d", None)
+    if d is None:
+        d = _local.d = {"c": {}, "h": {}}
+        with _lock:                 # una vez por hilo (el servidor con hilos crea uno por request)
+            _podar()
+            _hilos.append((threading.current_thread(), d))
+    return d
+
+def contar(nombre: str, etiquetas: dict, valor: float = 1.0) -> None:
+    c = _datos()["c"]
+    k = (nombre, tuple(sorted(etiquetas.items())))
+    c[k] = c.get(k, 0.0) + valor
+
+def observar(nombre: str, etiquetas: dict, segundos: float) -> None:
+    h = _datos()["h"]
+    k = (nombre, tuple(sorted(etiquetas.items())))
+    buckets = _DEF[nombre][2]
+    fila = h.get(k)
+    if fila is None:
+        fila = h[k] = [0] * (len(buckets) + 1) + [0.0]   # cuentas por bucket (+Inf) y suma
+    i = 0
+    while i < len(buckets) and segundos > buckets[i]:
+        i += 1
+    fila[i] += 1
+    fila[-1] += segundos
+
+# ---------- fotos (proceso actual y otros procesos) ----------
+def _foto_local() -> dict:
+    """{"c": {clave: v}, "h": {clave: [...]}, "g": {clave: v}} de este proceso."""
+    acc: dict = {"c": {}, "h": {}}
+    with _lock:
+        _podar()
+        _sumar(acc, _muertos)
+        hilos = [d for _, d in _hilos]
+    for d in hilos:
+        _sumar(acc, d)
+    c: Dict[Clave, float] = acc["c"]
+    h: Dict[Clave, list] = acc["h"]
+
+    gauges: Dict[Clave, float] = {}
+    st = pool_stats()
+    for estado in ("abiertas", "libres", "en_uso"):
+        gauges[("db_pool_conexiones", (("estado", estado),))] = st[estado]
+    c[("db_pool_esperas_total", ())] = st["esperas"]
+    for ca in cache.todas():
+        s = ca.stats(); et = (("cache", s["nombre"]),)
+        c[("cache_aciertos_total", et)] = c.get(("cache_aciertos_total", et), 0) + s["aciertos"]
+        c[("cache_fallos_total", et)] = c.get(("cache_fallos_total", et), 0) + s["fallos"]
+        gauges[("cache_tamano", et)] = gauges.get(("cache_tamano", et), 0) + s["tamano"]
+    b = bitacora.estado()
+    gauges[("bitacora_cola", ())] = b["cola"]
+    gauges[("bitacora_spool", ())] = b["spool"]
+    for destino in ("encolados", "escritos", "descartados", "al_spool"):
+        c[("bitacora_eventos_total", (("destino", destino),))] = b[destino]
+    c[("bitacora_lotes_total", ())] = b["lotes"]
+    c[("bitacora_fallos_total", ())] = b["fallos"]
+    ide = idempotencia.estado()
+    gauges[("idempotencia_claves", ())] = ide["claves"]
+    for evento in ("nuevas", "repetidas", "esperas", "ocupadas"):
+        c[("idempotencia_eventos_total", (("evento", evento),))] = ide[evento]
+    return {"c": c, "h": h, "g": gauges}
+
+def _a_json(foto: dict) -> dict:
+    return {t: [[k[0], list(k[1]), v] for k, v in m.items()] for t, m in foto.items()}
+
+def _de_json(data: dict) -> dict:
+    return {t: {(n, tuple(tuple(e) for e in et)): v for n, et, v in data.get(t, [])}
+            for t in ("c", "h", "g")}
+
+def _archivo(pid: int) -> str:
+    return os.path.join(DIR, f"metricas-{pid}.json")
+
+_ultimo_volcado = 0.0
+
+def _volcar(forzar: bool = False) -> None:
+    """Escribe la foto de este proceso en METRICAS_DIR (reemplazo atómico)."""
+    global _ultimo_volcado
+    ahora = time.monotonic()
+    if not DIR or (not forzar and ahora - _ultimo_volcado < VOLCADO):
+        return
+    _ultimo_volcado = ahora
+    tmp = _archivo(os.getpid()) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_a_json(_foto_local()), f)
+    os.replace(tmp, _archivo(os.getpid()))
+
+def _vivo(ruta: str) -> bool:
+    try:
+        os.kill(int(os.path.basename(ruta)[len("metricas-"):-len(".json")]), 0)
+        return True
+    except (ValueError, ProcessLookupError):
+        return False
+    except OSError:
+        return True     # existe pero es de otro usuario
+
+def _foto_total() -> dict:
+    total = _foto_local()
+    if not DIR:
+        return total
+    propio = _archivo(os.getpid())
+    for ruta in glob.glob(os.path.join(DIR, "metricas-*.json")):
+        if ruta == propio:
+            continue
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                otra = _de_json(json.load(f))
+        except (OSError, ValueError):
+            continue
+        # de un proceso que ya terminó se conservan contadores, no gauges
+        for t in (("c", "g") if _vivo(ruta) else ("c",)):
+            for k, v in otra[t].items():
+                total[t][k] = total[t].get(k, 0) + v
+        for k, fila in otra["h"].items():
+            acc = total["h"].setdefault(k, [0] * (len(fila) - 1) + [0.0])
+            for i, v in enumerate(fila):
+                acc[i] += v
+    return total
+
+# ---------- exposición ----------
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _lbl(et, extra=()) -> str:
+    pares = list(et) + list(extra)
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in pares) + "}" if pares else ""
+
+def _num(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+def exponer() -> str:
+    foto = _foto_total()
+    por_nombre: Dict[str, list] = {}
+    for t in ("c", "g", "h"):
+        for k, v in foto[t].items():
+            por_nombre.setdefault(k[0], []).append((k[1], v))
+    out = []
+    for nombre, (tipo, ayuda, buckets) in _DEF.items():
+        series = por_nombre.get(nombre)
+        if not series:
+            continue
+        out.append(f"# HELP {nombre} {ayuda}")
+        out.append(f"# TYPE {nombre} {tipo}")
+        for et, v in sorted(series):
+            if tipo != "histogram":
+                out.append(f"{nombre}{_lbl(et)} {_num(v)}")
+                continue
+            acum = 0
+            for b, n in zip(buckets, v[:-2]):
+                acum += n
+                out.append(f"{nombre}_bucket{_lbl(et, [('le', b)])} {acum}")
+            acum += v[-2]
+            out.append(f"{nombre}_bucket{_lbl(et, [('le', '+Inf')])} {acum}")
+            out.append(f"{nombre}_sum{_lbl(et)} {_num(v[-1])}")
+            out.append(f"{nombre}_count{_lbl(et)} {acum}")
+    return "\n".join(out) + "\n"
+
+# ---------- SQL ----------
+_RE_TABLA = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?([\w.]+)`?", re.I)
+
+@lru_cache(maxsize=1024)
+def _tabla_op(norm: str) -> Tuple[str, str]:
+    op = (norm.split(None, 1) or ["?"])[0].upper()
+    if op not in ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+        return "-", op      # DDL, SET, etc.
+    m = _RE_TABLA.search(norm)
+    return (m.group(1).lower() if m else "-"), op
+
+def _observar_sql(ev: dict) -> None:
+    tabla, op = _tabla_op(ev["norm"])
+    observar("db_query_duration_seconds", {"tabla": tabla, "op": op}, ev["ms"] / 1000.0)
+
+# ---------- Flask ----------
+bp = Blueprint("metricas", __name__)
+
+@bp.get("/metrics")
+def metrics():
+    if TOKEN and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {TOKEN}"):
+        return Response("forbidden\n", status=403, mimetype="text/plain")
+    return Response(exponer(), mimetype="text/plain; version=0.0.4")
+
+def _inicio():
+    g._metricas_t0 = time.perf_counter()
+
+def _fin(response):
+    t0 = g.get("_metricas_t0")
+    if t0 is not None and request.endpoint != "metricas.metrics":
+        seg = time.perf_counter() - t0
+        ep = request.endpoint or "sin_ruta"
+        bp_nombre = request.blueprint or "app"
+        observar("http_request_duration_seconds", {"endpoint": ep, "metodo": request.method}, seg)
+        contar("http_requests_total", {"blueprint": bp_nombre, "estado": f"{response.status_code // 100}xx"})
+        if response.status_code >= 500:
+            contar("http_errors_total", {"blueprint": bp_nombre})
+        _volcar()
+    return response
+
+def init_app(app) -> None:
+    """Registra /metrics y los hooks si METRICAS=1 (y hay token o METRICAS_ABIERTO=1)."""
+    if not ACTIVO:
+        return
+    if not TOKEN and not ABIERTO:
+        app.logger.warning("METRICAS=1 sin METRICAS_TOKEN: /metrics no se registra "
+                           "(METRICAS_ABIERTO=1 para servirlo sin autenticación)")
+        return
+    if DIR:
+        os.makedirs(DIR, exist_ok=True)
+        atexit.register(_volcar, True)
+    agregar_observador(_observar_sql)
+    app.before_request(_inicio)
+    app.after_request(_fin)
+    app.register_blueprint(bp)
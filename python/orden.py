@@ -1,41 +1,40 @@
 # python/orden.py
 from __future__ import annotations
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import os
+from datetime import date, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from mysql.connector import Error
-from decimal import Decimal
-from python.conexion import get_conn
+from python.conexion import get_conn, request_conn
 from python.authz import roles_required
+from python import busqueda, esquema, fk_opciones, idempotencia, saldos
 
 bp = Blueprint("orden", __name__, url_prefix="/orden")
 
+BUSQUEDA_LIMITE     = 20    # resultados por página en /orden/api/*
+BUSQUEDA_LIMITE_MAX = 100
+
+LISTADO_PAGINA      = int(os.getenv("ORDEN_LISTADO_PAGINA", "50"))   # filas por página en /orden/
+LISTADO_PAGINA_MAX  = 200
+CONTEO_MAX          = int(os.getenv("ORDEN_CONTEO_MAX", "1000"))     # tope de los contadores del tablero
+ESTADOS = ("ABIERTA", "EN_PROCESO", "FACTURADA", "ENTREGADA")
+
 # -------- helpers ----------
-def _cols(cur, table: str) -> set[str]:
-    cur.execute("""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_schema = DATABASE() AND table_name=%s
-    """, (table,))
-    return {r[0] for r in cur.fetchall()}
+def _cols(table: str) -> set[str]:
+    return esquema.nombres(table)
 
-def _col_type(cur, table: str, column: str) -> str | None:
-    cur.execute("""
-        SELECT DATA_TYPE
-        FROM information_schema.columns
-        WHERE table_schema = DATABASE() AND table_name=%s AND column_name=%s
-    """, (table, column))
-    r = cur.fetchone()
-    return r[0] if r else None
-
-def _equipo_cols(cur):
-    cols = _cols(cur, "equipo")
+def _col_type(table: str, column: str) -> str | None:
+    return esquema.tipo(table, column)
+
+def _equipo_cols():
+    cols = _cols("equipo")
     imei   = next((c for c in ("imei","imei1","imei_equipo","n_imei") if c in cols), None)
     serie  = next((c for c in ("serie","serial","nro_serie","num_serie","numero_serie") if c in cols), None)
     modelo = "modelo" if "modelo" in cols else next((c for c in ("modelo_equipo","modelo_device") if c in cols), None)
     return imei, serie, modelo
 
-def _orden_cols(cur):
-    cols = _cols(cur, "orden_trabajo")
+def _orden_cols():
+    cols = _cols("orden_trabajo")
     desc_col = next((c for c in (
         "descripcion","detalle","detalles","observacion","observaciones",
         "comentario","comentarios","diagnostico","problema","descripcion_ot",
@@ -52,8 +51,8 @@ def _orden_cols(cur):
         "creado_en":       next((c for c in ("creado_en","created_at","fecha_creacion") if c in cols), None),
     }
 
-def _abono_cols(cur):
-    cols = _cols(cur, "abono")
+def _abono_cols():
+    cols = _cols("abono")
     return {
         "fecha":      next((c for c in ("creado_en","fecha","fecha_abono","created_at") if c in cols), None),
         "id_usuario": "id_usuario" if "id_usuario" in cols else None,
@@ -80,54 +79,450 @@ def _usuarios_tecnicos(cur):
         """)
     return cur.fetchall()
 
+# -------- sentencias precompiladas ----------
+# Se resuelven una vez por versión del esquema y se reutilizan; cada una es
+# (sql, claves) donde `claves` indica qué valor va en cada %s.
+# (versión, {clave: sentencia}): al cambiar el esquema se reemplaza el par
+# entero en una sola asignación; nunca se vacía ni recorre el dict que otro
+# request puede estar leyendo.
+_SQL: tuple = (None, {})
+
+def _fn_fecha(table: str, column: str) -> str:
+    """NOW() para datetime/timestamp, CURDATE() para date."""
+    return "NOW()" if (_col_type(table, column) or "") in ("timestamp", "datetime") else "CURDATE()"
+
+def _sql_insert_equipo(con_modelo: bool, con_imei: bool, con_serie: bool):
+    i, s, m = _equipo_cols()
+    cols, claves = ["id_cliente"], ["id_cliente"]
+    if m and con_modelo: cols.append(m); claves.append("modelo")
+    if i and con_imei:   cols.append(i); claves.append("imei")
+    if s and con_serie:  cols.append(s); claves.append("serie")
+    return (f"INSERT INTO equipo ({', '.join(cols)}) VALUES ({', '.join(['%s']*len(cols))})",
+            tuple(claves))
+
+def _sql_insert_ot(con_tecnico: bool, con_prestado: bool):
+    ordc = _orden_cols()
+    cols, ph, claves = ["id_cliente"], ["%s"], ["id_cliente"]
+    if "id_equipo" in ordc["cols_set"]:
+        cols += ["id_equipo"]; ph += ["%s"]; claves += ["id_equipo"]
+    if ordc["desc_col"]:
+        cols += [ordc["desc_col"]]; ph += ["%s"]; claves += ["descripcion"]
+    if ordc["estado"]:
+        cols += ["estado"]; ph += ["%s"]; claves += ["estado"]
+    if ordc["creado_por"]:
+        cols += ["creado_por"]; ph += ["%s"]; claves += ["creado_por"]
+    if ordc["tecnico_col"] and con_tecnico:
+        cols += [ordc["tecnico_col"]]; ph += ["%s"]; claves += ["id_tecnico"]
+    if ordc["prestado_id"] and con_prestado:
+        cols += [ordc["prestado_id"]]; ph += ["%s"]; claves += ["equipo_prestado_id"]
+    if ordc["fecha_recepcion"]:
+        cols += [ordc["fecha_recepcion"]]
+        ph   += [_fn_fecha("orden_trabajo", ordc["fecha_recepcion"])]  # función SQL directa, sin placeholder
+    return (f"INSERT INTO orden_trabajo ({', '.join(cols)}) VALUES ({', '.join(ph)})",
+            tuple(claves))
+
+def _sql_insert_abono():
+    abcols = _abono_cols()
+    cols, ph, claves = ["id_orden", "monto"], ["%s", "%s"], ["id_orden", "monto"]
+    if abcols["id_usuario"]:
+        cols += ["id_usuario"]; ph += ["%s"]; claves += ["id_usuario"]
+    if abcols["fecha"]:
+        cols += [abcols["fecha"]]; ph += [_fn_fecha("abono", abcols["fecha"])]
+    return (f"INSERT INTO abono ({', '.join(cols)}) VALUES ({', '.join(ph)})",
+            tuple(claves))
+
+def _sql_buscar_equipos(con_cliente: bool, con_texto: bool):
+    i, s, m = _equipo_cols()
+    campos = ["e.id_equipo","e.id_cliente","CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cliente"]
+    campos.append(f"e.{m} AS modelo" if m else "NULL AS modelo")
+    campos.append(f"e.{i} AS imei" if i else "NULL AS imei")
+    campos.append(f"e.{s} AS serie" if s else "NULL AS serie")
+    where, claves = ["e.id_equipo > %s"], ["despues"]
+    if con_cliente:
+        where.append("e.id_cliente = %s"); claves.append("id_cliente")
+    texto = [f"e.{c} LIKE %s" for c in (i, s, m) if c]
+    if con_texto and texto:
+        where.append("(" + " OR ".join(texto) + ")"); claves += ["patron"] * len(texto)
+    return (f"""
+        SELECT {', '.join(campos)}
+        FROM equipo e
+        LEFT JOIN cliente c ON c.id_cliente=e.id_cliente
+        WHERE {' AND '.join(where)}
+        ORDER BY e.id_equipo
+        LIMIT %s
+    """, tuple(claves) + ("limite",))
+
+def _sql_print_header():
+    ordc = _orden_cols()       # columnas reales de orden_trabajo
+    i, s, m = _equipo_cols()   # imei/serie/modelo reales en equipo
+
+    # Equipo principal a mostrar
+    eq_sel = []
+    if m: eq_sel.append(f"e.{m} AS eq_modelo")
+    if i: eq_sel.append(f"e.{i} AS eq_imei")
+    if s: eq_sel.append(f"e.{s} AS eq_serie")
+    eq_sel = (", " + ", ".join(eq_sel)) if eq_sel else ""
+
+    # Equipo prestado (si existe en tu esquema)
+    prest_join, prest_sel = "", ""
+    if ordc.get("prestado_id"):
+        prest_join = f"LEFT JOIN equipo ep ON ep.id_equipo = o.{ordc['prestado_id']}"
+        p = []
+        if m: p.append(f"ep.{m} AS prest_modelo")
+        if i: p.append(f"ep.{i} AS prest_imei")
+        if s: p.append(f"ep.{s} AS prest_serie")
+        prest_sel = (", " + ", ".join(p)) if p else ""
+
+    # Técnico (si hay columna)
+    tec_sel = ""
+    if ordc.get("tecnico_col"):
+        tec_sel = f", (SELECT u.usuario_login FROM usuario u WHERE u.id_usuario=o.{ordc['tecnico_col']}) AS tecnico_login"
+
+    # Fecha de recepción (o creado_en como fallback)
+    rec_sel = ""
+    if ordc.get("fecha_recepcion"):
+        rec_sel = f", o.{ordc['fecha_recepcion']} AS fecha_recepcion"
+    elif ordc.get("creado_en"):
+        rec_sel = f", o.{ordc['creado_en']} AS fecha_recepcion"
+
+    # Descripción y creado_en protegidos con alias fijos
+    desc_expr   = f"o.{ordc['desc_col']} AS descripcion" if ordc.get('desc_col') else "NULL AS descripcion"
+    creado_expr = f"o.{ordc['creado_en']} AS creado_en" if ordc.get('creado_en') else "NULL AS creado_en"
+
+    return (f"""
+        SELECT o.id_orden,
+               {desc_expr},
+               o.estado,
+               {creado_expr},
+               CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cli_nombre,
+               c.identificacion AS cli_cedula,
+               c.telefono AS cli_tel,
+               c.email AS cli_email
+               {rec_sel}{tec_sel}{eq_sel}{prest_sel}
+        FROM orden_trabajo o
+        JOIN cliente c ON c.id_cliente=o.id_cliente
+        LEFT JOIN equipo e ON e.id_equipo=o.id_equipo
+        {prest_join}
+        WHERE o.id_orden=%s
+    """, ("id_orden",))
+
+def _sql_print_abonos():
+    ab_fecha = _abono_cols()["fecha"] or "fecha"
+    return (f"""
+        SELECT {ab_fecha} AS creado_en,
+               monto,
+               metodo,
+               referencia,
+               estado,
+               observacion
+        FROM abono
+        WHERE id_orden=%s
+        ORDER BY {ab_fecha} ASC
+    """, ("id_orden",))
+
+# -------- listado / tablero ----------
+# Filtros de la página como una tupla de flags (variante de la sentencia):
+# (estado, técnico, cliente, desde, hasta)
+def _where_listado(filtros: tuple):
+    ordc = _orden_cols()
+    con_estado, con_tecnico, con_cliente, con_desde, con_hasta = filtros
+    f, tec = ordc["creado_en"], ordc["tecnico_col"]
+    where, claves = [], []
+    if con_estado and ordc["estado"]:
+        where.append("o.estado = %s"); claves.append("estado")
+    if con_tecnico and tec:
+        where.append(f"o.{tec} = %s"); claves.append("id_tecnico")
+    if con_cliente:
+        where.append("o.id_cliente = %s"); claves.append("id_cliente")
+    if f and con_desde:
+        where.append(f"o.{f} >= %s"); claves.append("desde")
+    if f and con_hasta:
+        where.append(f"o.{f} < %s"); claves.append("hasta")
+    return where, claves
+
+def _sql_listado_ids(filtros: tuple, con_cursor: bool):
+    """
+    Fase 1: solo (fecha, id) de la página, recorriendo uno de los índices
+    (estado|id_tecnico|id_cliente, creado_en, id_orden) de
+    database/orden_indices.sql sin tocar las filas. Cursor: (fecha, id) de la
+    última fila de la página anterior.
+    """
+    f = _orden_cols()["creado_en"]
+    where, claves = _where_listado(filtros)
+    if f:
+        if con_cursor:
+            where.append(f"(o.{f} < %s OR (o.{f} = %s AND o.id_orden < %s))")
+            claves += ["cur_fecha", "cur_fecha", "cur_id"]
+        campos, orden = f"o.{f} AS fecha, o.id_orden", f"o.{f} DESC, o.id_orden DESC"
+    else:
+        if con_cursor:
+            where.append("o.id_orden < %s"); claves.append("cur_id")
+        campos, orden = "NULL AS fecha, o.id_orden", "o.id_orden DESC"
+    return (f"""
+        SELECT {campos}
+        FROM orden_trabajo o
+        {('WHERE ' + ' AND '.join(where)) if where else ''}
+        ORDER BY {orden}
+        LIMIT %s
+    """, tuple(claves) + ("limite",))
+
+def _sql_listado_filas(n: int):
+    """Fase 2: datos de las n órdenes de la página por PK (cliente, equipo, técnico, saldo)."""
+    ordc = _orden_cols()
+    _, _, m = _equipo_cols()
+    tec = ordc["tecnico_col"]
+    desc  = f"o.{ordc['desc_col']}" if ordc["desc_col"] else "NULL"
+    fecha = f"o.{ordc['creado_en']}" if ordc["creado_en"] else "NULL"
+    return (f"""
+        SELECT o.id_orden, {('o.estado' if ordc['estado'] else 'NULL')} AS estado,
+               {fecha} AS creado_en, {desc} AS descripcion,
+               o.id_cliente, CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cliente,
+               {(f'e.{m}' if m else 'NULL')} AS equipo,
+               {('u.usuario_login' if tec else 'NULL')} AS tecnico,
+               s.subtotal, s.pagado, s.saldo
+        FROM orden_trabajo o
+        JOIN cliente c ON c.id_cliente = o.id_cliente
+        LEFT JOIN equipo e ON e.id_equipo = o.id_equipo
+        {(f'LEFT JOIN usuario u ON u.id_usuario = o.{tec}' if tec else '')}
+        LEFT JOIN orden_saldo s ON s.id_orden = o.id_orden
+        WHERE o.id_orden IN ({', '.join(['%s'] * n)})
+    """, ("ids",))
+
+def _sql_conteos(filtros: tuple):
+    """
+    Órdenes por estado con los demás filtros, cada conteo cortado en
+    CONTEO_MAX (el tablero muestra "1000+"): el costo no crece con la tabla.
+    """
+    where, claves = _where_listado((False,) + filtros[1:])
+    partes = []
+    for _ in ESTADOS:
+        w = " AND ".join(["o.estado = %s"] + where)
+        partes.append(f"SELECT %s AS estado, COUNT(*) AS n FROM "
+                      f"(SELECT 1 FROM orden_trabajo o WHERE {w} LIMIT %s) x")
+    # claves de UNA parte; el llamador las repite por estado (ver _conteos)
+    return " UNION ALL ".join(partes), tuple(claves) + ("tope",)
+
+_CONSTRUCTORES = {
+    "insert equipo": _sql_insert_equipo,
+    "insert OT":     _sql_insert_ot,
+    "insert abono":  _sql_insert_abono,
+    "buscar equipos": _sql_buscar_equipos,
+    "print header":  _sql_print_header,
+    "print abonos":  _sql_print_abonos,
+    "listado ids":   _sql_listado_ids,
+    "listado filas": _sql_listado_filas,
+    "conteos":       _sql_conteos,
+}
+
+def _sql(nombre: str, *variante):
+    """(sql, claves) de la sentencia `nombre` para la versión actual del esquema."""
+    global _SQL
+    ver = esquema.version()
+    vigente, sentencias = _SQL
+    if vigente != ver:
+        sentencias = {}
+        _SQL = (ver, sentencias)   # cambió el esquema: descartar las viejas
+    clave = (nombre,) + variante
+    stmt = sentencias.get(clave)
+    if stmt is None:
+        stmt = sentencias[clave] = _CONSTRUCTORES[nombre](*variante)
+    return stmt
+
+def _params(claves: tuple, datos: dict) -> tuple:
+    return tuple(datos[k] for k in claves)
+
+# -------- búsqueda (typeahead) ----------
+def _patron_like(q: str, modo: str) -> str:
+    """'abc' -> 'abc%' (prefijo) o '%abc%' (contiene), escapando comodines."""
+    esc = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{esc}%" if modo == "contiene" else f"{esc}%"
+
+def _args_busqueda():
+    q       = (request.args.get("q") or "").strip()
+    modo    = "contiene" if request.args.get("modo") == "contiene" else "prefijo"
+    limite  = min(max(request.args.get("limite", type=int) or BUSQUEDA_LIMITE, 1), BUSQUEDA_LIMITE_MAX)
+    despues = request.args.get("despues", type=int) or 0   # cursor: último id visto
+    return q, modo, limite, despues
+
+def _pagina(rows: list, limite: int, id_key: str):
+    """Recorta a `limite` y calcula el cursor de la siguiente página (o None)."""
+    hay_mas = len(rows) > limite
+    rows = rows[:limite]
+    return {"items": rows, "siguiente": rows[-1][id_key] if (hay_mas and rows) else None}
+
+def _args_listado():
+    estado = request.args.get("estado")
+    estado = estado if estado in ESTADOS else None
+    def _fecha(nombre):
+        try:
+            return date.fromisoformat(request.args.get(nombre) or "")
+        except ValueError:
+            return None
+    antes = request.args.get("antes") or ""          # cursor: "<fecha ISO>_<id>" o "_<id>"
+    fecha, _, cur_id = antes.rpartition("_")
+    cursor = (fecha.replace("T", " ") or None, int(cur_id)) if cur_id.isdigit() else None
+    return {
+        "estado": estado,
+        "id_tecnico": request.args.get("id_tecnico", type=int),
+        "id_cliente": request.args.get("id_cliente", type=int),
+        "desde": _fecha("desde"),
+        "hasta": _fecha("hasta"),
+        "cursor": cursor,
+        "q": (request.args.get("q") or "").strip()[:100],
+        "pag": max(request.args.get("pag", type=int) or 1, 1),   # con q: página por relevancia
+        "limite": min(max(request.args.get("limite", type=int) or LISTADO_PAGINA, 1), LISTADO_PAGINA_MAX),
+    }
+
+def _conteos(cur, filtros: tuple, datos: dict) -> dict:
+    sql, claves = _sql("conteos", filtros)
+    params = []
+    for est in ESTADOS:
+        params += [est, est] + list(_params(claves, {**datos, "tope": CONTEO_MAX}))
+    cur.execute(sql, tuple(params))
+    return {r["estado"]: r["n"] for r in cur.fetchall()}
+
 # ----------------- vistas -----------------
+@bp.get("/")
+@login_required
+@roles_required("administrador", "facturador")
+def listado():
+    """
+    Tablero de órdenes: contadores por estado y listado paginado por cursor
+    (más recientes primero) con filtros de estado, técnico, cliente y fechas.
+    Con `q`: búsqueda de texto (python/busqueda.py) ordenada por relevancia,
+    con los mismos filtros y paginada por número de página.
+    """
+    a = _args_listado()
+    filtros = (bool(a["estado"]), bool(a["id_tecnico"]), bool(a["id_cliente"]),
+               bool(a["desde"]), bool(a["hasta"]))
+    datos = {
+        "estado": a["estado"], "id_tecnico": a["id_tecnico"], "id_cliente": a["id_cliente"],
+        "desde": a["desde"].isoformat() + " 00:00:00" if a["desde"] else None,
+        "hasta": (a["hasta"] + timedelta(days=1)).isoformat() + " 00:00:00" if a["hasta"] else None,
+        "cur_fecha": a["cursor"][0] if a["cursor"] else None,
+        "cur_id": a["cursor"][1] if a["cursor"] else None,
+        "limite": a["limite"] + 1,
+    }
+    cn = request_conn(); cur = cn.cursor(dictionary=True)
+
+    if a["q"]:
+        where, claves = _where_listado(filtros)
+        pagina = busqueda.buscar(cur, a["q"], where, _params(claves, datos),
+                                 a["limite"] + 1, (a["pag"] - 1) * a["limite"])
+    else:
+        sql, claves = _sql("listado ids", filtros, a["cursor"] is not None)
+        cur.execute(sql, _params(claves, datos))
+        pagina = cur.fetchall()
+    hay_mas = len(pagina) > a["limite"]
+    pagina = pagina[:a["limite"]]
+
+    filas = []
+    if pagina:
+        ids = [r["id_orden"] for r in pagina]
+        sql, _ = _sql("listado filas", len(ids))
+        cur.execute(sql, tuple(ids))
+        por_id = {r["id_orden"]: r for r in cur.fetchall()}
+        filas = [por_id[i] for i in ids if i in por_id]
+        for r in filas:
+            if r["saldo"] is None:          # orden anterior a orden_saldo: relleno perezoso
+                r.update(saldos.leer(r["id_orden"], cur))
+
+    siguiente = None
+    if hay_mas and a["q"]:
+        siguiente = a["pag"] + 1
+    elif hay_mas and pagina:
+        ult = pagina[-1]
+        fecha = ult["fecha"]
+        fecha = fecha.isoformat(sep="T") if hasattr(fecha, "isoformat") else (str(fecha).replace(" ", "T") if fecha else "")
+        siguiente = f"{fecha}_{ult['id_orden']}"
+
+    conteos = {} if a["q"] else _conteos(cur, filtros, datos)
+    cur.close()
+    cur2 = cn.cursor()
+    tecnicos = _usuarios_tecnicos(cur2)
+    cur2.close(); cn.close()
+
+    filtros_url = {k: (v.isoformat() if hasattr(v, "isoformat") else v)
+                   for k, v in a.items() if k in ("q", "id_tecnico", "id_cliente", "desde", "hasta") and v}
+    return render_template("orden_listado.html", filas=filas, conteos=conteos, estados=ESTADOS,
+                           conteo_max=CONTEO_MAX, tecnicos=tecnicos, a=a, filtros_url=filtros_url,
+                           siguiente=siguiente, limite=a["limite"],
+                           q_corta=bool(a["q"]) and not busqueda.terminos(a["q"]),
+                           min_largo=busqueda.MIN_LARGO)
+
+
 @bp.get("/nueva")
 @login_required
 @roles_required("administrador", "facturador")
 def nueva():
-    cn = get_conn()
-    cur = cn.cursor(dictionary=True)
+    # Clientes y equipos NO se cargan aquí: el formulario los busca
+    # incrementalmente en /orden/api/clientes y /orden/api/equipos.
+    cn = request_conn()
+    cur3 = cn.cursor()
+    tecnicos = _usuarios_tecnicos(cur3)
+    cur3.close(); cn.close()
+    ordc = _orden_cols()
 
-    # clientes
-    cur.execute("""
+    return render_template("orden_nueva.html",
+                           tecnicos=tecnicos, ordc=ordc,
+                           busqueda_limite=BUSQUEDA_LIMITE)
+
+@bp.get("/api/clientes")
+@login_required
+@roles_required("administrador", "facturador")
+def api_clientes():
+    """
+    Busca clientes por nombres/apellidos/identificación.
+    ?q=texto&modo=prefijo|contiene&limite=20&despues=<id_cliente>
+    """
+    q, modo, limite, despues = _args_busqueda()
+    where, params = ["id_cliente > %s"], [despues]
+    if q:
+        patron = _patron_like(q, modo)
+        where.append("(nombres LIKE %s OR apellidos LIKE %s OR identificacion LIKE %s"
+                     " OR CONCAT(nombres,' ',COALESCE(apellidos,'')) LIKE %s)")
+        params += [patron] * 4
+
+    cn = request_conn(); cur = cn.cursor(dictionary=True)
+    cur.execute(f"""
         SELECT id_cliente,
                CONCAT(nombres,' ',COALESCE(apellidos,'')) AS nombre,
                identificacion
         FROM cliente
-        ORDER BY nombre
-    """)
-    clientes = cur.fetchall()
-
-    # equipos
-    cur2 = cn.cursor()
-    i, s, m = _equipo_cols(cur2)
-    cur2.close()
-
-    campos = ["e.id_equipo","e.id_cliente","CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cliente"]
-    if m: campos.append(f"e.{m} AS modelo")
-    if i: campos.append(f"e.{i} AS imei")
-    if s: campos.append(f"e.{s} AS serie")
-    cur.execute(f"""
-        SELECT {', '.join(campos)}
-        FROM equipo e
-        LEFT JOIN cliente c ON c.id_cliente=e.id_cliente
-        ORDER BY cliente, {m or 'e.id_equipo'}
-    """)
-    equipos = cur.fetchall()
-
-    cur3 = cn.cursor()
-    tecnicos = _usuarios_tecnicos(cur3)
-    ordc = _orden_cols(cur3)
-    cur3.close()
+        WHERE {' AND '.join(where)}
+        ORDER BY id_cliente
+        LIMIT %s
+    """, tuple(params) + (limite + 1,))
+    rows = cur.fetchall()
+    cur.close(); cn.close()
+    return jsonify(_pagina(rows, limite, "id_cliente"))
 
+@bp.get("/api/equipos")
+@login_required
+@roles_required("administrador", "facturador")
+def api_equipos():
+    """
+    Busca equipos por IMEI/serie/modelo, opcionalmente de un cliente.
+    ?q=texto&id_cliente=1&modo=prefijo|contiene&limite=20&despues=<id_equipo>
+    """
+    q, modo, limite, despues = _args_busqueda()
+    id_cliente = request.args.get("id_cliente", type=int)
+
+    sql, claves = _sql("buscar equipos", bool(id_cliente), bool(q))
+    params = _params(claves, {
+        "despues": despues, "id_cliente": id_cliente,
+        "patron": _patron_like(q, modo), "limite": limite + 1,
+    })
+    cn = request_conn(); cur = cn.cursor(dictionary=True)
+    cur.execute(sql, params)
+    rows = cur.fetchall()
     cur.close(); cn.close()
-    return render_template("orden_nueva.html",
-                           clientes=clientes, equipos=equipos,
-                           tecnicos=tecnicos, ordc=ordc)
+    return jsonify(_pagina(rows, limite, "id_equipo"))
 
 @bp.post("/crear")
 @login_required
 @roles_required("administrador", "facturador")
+@idempotencia.idempotente      # doble clic / reenvío: misma orden, no una nueva
 def crear():
     id_cliente  = request.form.get("id_cliente", type=int)
     id_equipo   = request.form.get("id_equipo", type=int)  # opcional
@@ -147,60 +542,40 @@ def crear():
 
     cn = get_conn(); cur = cn.cursor()
     try:
-        ordc   = _orden_cols(cur)
-        abcols = _abono_cols(cur)
-        i, s, m  = _equipo_cols(cur)
-
         # Crear “equipo prestado rápido” si aplica
         if prestar and not equipo_prestado_id and (prest_modelo or prest_imei or prest_serie):
-            cols_e, vals_e = ["id_cliente"], [id_cliente]
-            if m and prest_modelo: cols_e.append(m); vals_e.append(prest_modelo)
-            if i and prest_imei:   cols_e.append(i); vals_e.append(prest_imei)
-            if s and prest_serie:  cols_e.append(s); vals_e.append(prest_serie)
-            cur.execute(f"INSERT INTO equipo ({', '.join(cols_e)}) VALUES ({', '.join(['%s']*len(vals_e))})", vals_e)
+            sql, claves = _sql("insert equipo", bool(prest_modelo), bool(prest_imei), bool(prest_serie))
+            cur.execute(sql, _params(claves, {
+                "id_cliente": id_cliente, "modelo": prest_modelo,
+                "imei": prest_imei, "serie": prest_serie,
+            }))
             equipo_prestado_id = cur.lastrowid
 
         # INSERT OT (con creado_por y fecha_recepcion autom.)
-        cols, ph, vals = ["id_cliente"], ["%s"], [id_cliente]
-        if "id_equipo" in ordc["cols_set"]:
-            cols += ["id_equipo"];  ph += ["%s"]; vals += [id_equipo]
-        if ordc["desc_col"]:
-            cols += [ordc["desc_col"]]; ph += ["%s"]; vals += [descripcion]
-        if ordc["estado"]:
-            cols += ["estado"]; ph += ["%s"]; vals += ["ABIERTA"]
-        if ordc["creado_por"]:
-            cols += ["creado_por"]; ph += ["%s"]; vals += [int(current_user.id)]
-        if ordc["tecnico_col"] and id_tecnico:
-            cols += [ordc["tecnico_col"]]; ph += ["%s"]; vals += [id_tecnico]
-        if ordc["prestado_id"] and equipo_prestado_id:
-            cols += [ordc["prestado_id"]]; ph += ["%s"]; vals += [equipo_prestado_id]
-        if ordc["fecha_recepcion"]:
-            tipo = _col_type(cur, "orden_trabajo", ordc["fecha_recepcion"]) or ""
-            fn = "NOW()" if tipo in ("timestamp","datetime") else "CURDATE()"
-            cols += [ordc["fecha_recepcion"]]
-            ph   += [fn]  # función SQL directa, sin placeholder
-
-        cur.execute(
-            f"INSERT INTO orden_trabajo ({', '.join(cols)}) VALUES ({', '.join(ph)})",
-            vals
-        )
+        sql, claves = _sql("insert OT", bool(id_tecnico), bool(equipo_prestado_id))
+        cur.execute(sql, _params(claves, {
+            "id_cliente": id_cliente, "id_equipo": id_equipo, "descripcion": descripcion,
+            "estado": "ABIERTA", "creado_por": int(current_user.id),
+            "id_tecnico": id_tecnico, "equipo_prestado_id": equipo_prestado_id,
+        }))
         id_orden = cur.lastrowid
 
         # Abono opcional
         if abono_monto and abono_monto > 0:
-            ab_cols, ab_ph, ab_vals = ["id_orden","monto"], ["%s","%s"], [id_orden, str(abono_monto)]
-            if abcols["id_usuario"]:
-                ab_cols += ["id_usuario"]; ab_ph += ["%s"]; ab_vals += [int(current_user.id)]
-            if abcols["fecha"]:
-                t = _col_type(cur, "abono", abcols["fecha"]) or ""
-                fn = "NOW()" if t in ("timestamp","datetime") else "CURDATE()"
-                ab_cols += [abcols["fecha"]]; ab_ph += [fn]
-            cur.execute(
-                f"INSERT INTO abono ({', '.join(ab_cols)}) VALUES ({', '.join(ab_ph)})",
-                ab_vals
-            )
+            sql, claves = _sql("insert abono")
+            cur.execute(sql, _params(claves, {
+                "id_orden": id_orden, "monto": str(abono_monto), "id_usuario": int(current_user.id),
+            }))
+
+        # Fila resumen de totales desde el inicio (listados y saldo sin sumar detalle)
+        saldos.recalcular(id_orden, cur)
+        # Documento de búsqueda (descripción + cliente + equipo), en la misma transacción
+        busqueda.indexar(id_orden, cur)
 
         cn.commit()
+        idempotencia.confirmar()
+        fk_opciones.invalidar("orden_trabajo")
+        fk_opciones.invalidar("equipo")
         flash(f"Orden creada (# {id_orden}).", "success")
         return redirect(url_for("orden.imprimir", id_orden=id_orden))
 
@@ -235,65 +610,11 @@ def imprimir_qs():
 @login_required
 @roles_required("administrador", "facturador")
 def imprimir(id_orden: int):
-    cn = get_conn(); cur = cn.cursor(dictionary=True)
-
-    # Descubrir columnas reales
-    cur2 = cn.cursor()
-    ordc = _orden_cols(cur2)       # columnas reales de orden_trabajo
-    i, s, m = _equipo_cols(cur2)   # imei/serie/modelo reales en equipo
-    abcols = _abono_cols(cur2)     # fecha real en abono
-    cur2.close()
-
-    # Equipo principal a mostrar
-    eq_sel = []
-    if m: eq_sel.append(f"e.{m} AS eq_modelo")
-    if i: eq_sel.append(f"e.{i} AS eq_imei")
-    if s: eq_sel.append(f"e.{s} AS eq_serie")
-    eq_sel = (", " + ", ".join(eq_sel)) if eq_sel else ""
-
-    # Equipo prestado (si existe en tu esquema)
-    prest_join, prest_sel = "", ""
-    if ordc.get("prestado_id"):
-        prest_join = f"LEFT JOIN equipo ep ON ep.id_equipo = o.{ordc['prestado_id']}"
-        p = []
-        if m: p.append(f"ep.{m} AS prest_modelo")
-        if i: p.append(f"ep.{i} AS prest_imei")
-        if s: p.append(f"ep.{s} AS prest_serie")
-        prest_sel = (", " + ", ".join(p)) if p else ""
-
-    # Técnico (si hay columna)
-    tec_sel = ""
-    if ordc.get("tecnico_col"):
-        tec_sel = f", (SELECT u.usuario_login FROM usuario u WHERE u.id_usuario=o.{ordc['tecnico_col']}) AS tecnico_login"
-
-    # Fecha de recepción (o creado_en como fallback)
-    rec_sel = ""
-    if ordc.get("fecha_recepcion"):
-        rec_sel = f", o.{ordc['fecha_recepcion']} AS fecha_recepcion"
-    elif ordc.get("creado_en"):
-        rec_sel = f", o.{ordc['creado_en']} AS fecha_recepcion"
-
-    # Descripción y creado_en protegidos con alias fijos
-    desc_expr   = f"o.{ordc['desc_col']} AS descripcion" if ordc.get('desc_col') else "NULL AS descripcion"
-    creado_expr = f"o.{ordc['creado_en']} AS creado_en" if ordc.get('creado_en') else "NULL AS creado_en"
+    cn = request_conn(); cur = cn.cursor(dictionary=True)
 
     # ---- Cabecera de la orden ----
-    cur.execute(f"""
-        SELECT o.id_orden,
-               {desc_expr},
-               o.estado,
-               {creado_expr},
-               CONCAT(c.nombres,' ',COALESCE(c.apellidos,'')) AS cli_nombre,
-               c.identificacion AS cli_cedula,
-               c.telefono AS cli_tel,
-               c.email AS cli_email
-               {rec_sel}{tec_sel}{eq_sel}{prest_sel}
-        FROM orden_trabajo o
-        JOIN cliente c ON c.id_cliente=o.id_cliente
-        LEFT JOIN equipo e ON e.id_equipo=o.id_equipo
-        {prest_join}
-        WHERE o.id_orden=%s
-    """, (id_orden,))
+    sql, _ = _sql("print header")
+    cur.execute(sql, (id_orden,))
     ot = cur.fetchone()
     if not ot:
         cur.close(); cn.close()
@@ -331,29 +652,14 @@ def imprimir(id_orden: int):
     items = cur.fetchall()
 
     # ---- Abonos ----
-    ab_fecha = abcols["fecha"] or "fecha"
-    cur.execute(
-        f"""
-        SELECT {ab_fecha} AS creado_en,
-               monto,
-               metodo,
-               referencia,
-               estado,
-               observacion
-        FROM abono
-        WHERE id_orden=%s
-        ORDER BY {ab_fecha} ASC
-        """,
-        (id_orden,)
-    )
+    sql, _ = _sql("print abonos")
+    cur.execute(sql, (id_orden,))
     abonos = cur.fetchall()
 
+    # ---- Totales (mantenidos en orden_saldo) ----
+    t = saldos.leer(id_orden, cur)
     cur.close(); cn.close()
-
-    # ---- Totales ----
-    subtotal = sum(Decimal(str(i["subtotal"])) for i in items) if items else Decimal("0")
-    pagado   = sum(Decimal(str(a["monto"])) for a in abonos) if abonos else Decimal("0")
-    saldo    = subtotal - pagado
+    subtotal, pagado, saldo = t["subtotal"], t["pagado"], t["saldo"]
 
     return render_template(
         "orden_imprimir.html",
@@ -2,12 +2,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Any, Tuple
-import re
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from flask_login import login_required, current_user
 
-from python.conexion import query, query_one, execute
+from python.conexion import query_one, execute, al_confirmar
+from python import esquema, fk_opciones, codec
 
 bp = Blueprint("orden_trabajo", __name__, template_folder="../templates")
 
@@ -17,10 +17,6 @@ AUDIT_COLS = {"creado_en", "creado_por", "actualizado_en", "actualizado_por"}
 # =========================
 #  Infra POO
 # =========================
-def _db() -> str:
-    r = query_one("SELECT DATABASE() AS db")
-    return r["db"]
-
 @dataclass
 class Column:
     name: str
@@ -46,22 +42,12 @@ class Spec:
 class TableMeta:
     def __init__(self, table: str):
         self.table = table
-        self.schema = _db()
         self.columns: List[Column] = self._load_columns()
-        self.pk: str | None = self._load_pk()
+        self.pk: str | None = esquema.pk(table)
 
     def _load_columns(self) -> List[Column]:
-        rows = query(
-            """
-            SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, EXTRA, CHARACTER_MAXIMUM_LENGTH
-            FROM information_schema.columns
-            WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s
-            ORDER BY ORDINAL_POSITION
-            """,
-            (self.schema, self.table),
-        )
         out: List[Column] = []
-        for r in rows:
+        for r in esquema.columnas(self.table):
             out.append(
                 Column(
                     name=r["COLUMN_NAME"],
@@ -74,145 +60,29 @@ class TableMeta:
             )
         return out
 
-    def _load_pk(self) -> str | None:
-        r = query_one(
-            """
-            SELECT k.COLUMN_NAME AS pk
-            FROM information_schema.table_constraints t
-            JOIN information_schema.key_column_usage k
-              ON t.CONSTRAINT_NAME=k.CONSTRAINT_NAME
-             AND t.TABLE_SCHEMA=k.TABLE_SCHEMA
-             AND t.TABLE_NAME=k.TABLE_NAME
-            WHERE t.TABLE_SCHEMA=%s AND t.TABLE_NAME=%s
-              AND t.CONSTRAINT_TYPE='PRIMARY KEY'
-            LIMIT 1
-            """,
-            (self.schema, self.table),
-        )
-        return r["pk"] if r else None
-
-    @staticmethod
-    def _parse_enum(column_type: str) -> List[str]:
-        m = re.match(r"enum\((.+)\)", (column_type or "").lower())
-        if not m:
-            return []
-        return [s.strip().strip("'") for s in m.group(1).split(",")]
-
     def spec_for(self, col: Column) -> Spec:
-        dt, ctype, extra = col.data_type, col.column_type, (col.extra or "").lower()
-        spec = Spec(kind="input", type="text", step=None, options=None, is_ai="auto_increment" in extra, nullable=col.is_nullable)
-
-        if dt in ("tinyint", "smallint", "mediumint", "int", "bigint"):
-            if dt == "tinyint" and re.match(r"tinyint\(1\)", ctype):
-                spec.kind, spec.type = "checkbox", None
-            else:
-                spec.type = "number"
-        elif dt in ("decimal", "float", "double"):
-            spec.type, spec.step = "number", "any"
-        elif dt == "date":
-            spec.type = "date"
-        elif dt in ("datetime", "timestamp"):
-            spec.type = "datetime-local"
-        elif dt.endswith("text"):
-            spec.kind, spec.type = "textarea", None
-        elif ctype.startswith("enum("):
-            spec.kind, spec.type, spec.options = "select", None, self._parse_enum(ctype)
-        return spec
+        """Spec nuevo desde la tabla precompilada (sin regex por request)."""
+        return Spec(**codec.tabla(self.table)[col.name].spec)
 
 class FKHelper:
     def __init__(self, table: str):
         self.table = table
-        self.schema = _db()
-        self.map = self._load_fks()  # {col: {'ref_table':..., 'ref_col':...}}
-
-    def _load_fks(self) -> Dict[str, Dict[str, str]]:
-        rows = query(
-            """
-            SELECT COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
-            FROM information_schema.key_column_usage
-            WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND REFERENCED_TABLE_NAME IS NOT NULL
-            """,
-            (self.schema, self.table),
-        )
-        m: Dict[str, Dict[str, str]] = {}
-        for r in rows:
-            m[r["COLUMN_NAME"]] = {
-                "ref_table": r["REFERENCED_TABLE_NAME"],
-                "ref_col": r["REFERENCED_COLUMN_NAME"],
-            }
-        return m
+        self.map = esquema.fks(table)  # {col: {'ref_table':..., 'ref_col':...}}
 
-    def _label_col(self, ref_table: str) -> str:
-        cols = query(
-            """
-            SELECT COLUMN_NAME, DATA_TYPE
-            FROM information_schema.columns
-            WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s
-            ORDER BY ORDINAL_POSITION
-            """,
-            (self.schema, ref_table),
-        )
-        prefs = {"nombre_completo", "nombre", "razon_social", "descripcion", "detalle", "modelo", "marca", "usuario_login", "email"}
-        for c in cols:
-            if c["DATA_TYPE"] in ("varchar", "text", "char") and c["COLUMN_NAME"] in prefs:
-                return c["COLUMN_NAME"]
-        for c in cols:
-            if c["DATA_TYPE"] in ("varchar", "text", "char"):
-                return c["COLUMN_NAME"]
-        return cols[0]["COLUMN_NAME"] if cols else "id"
-
-    def options(self, ref_table: str, ref_col: str) -> List[Dict[str, Any]]:
-        has_activo = query_one(
-            """
-            SELECT 1 AS ok FROM information_schema.columns
-            WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND COLUMN_NAME='activo' LIMIT 1
-            """,
-            (self.schema, ref_table),
-        )
-        label_col = self._label_col(ref_table)
-        where = "WHERE `activo`=1" if has_activo else ""
-        return query(f"SELECT `{ref_col}` AS id, `{label_col}` AS label FROM `{ref_table}` {where} ORDER BY label")
+    def options(self, ref_table: str, ref_col: str) -> List[Dict[str, Any]] | None:
+        """Opciones cacheadas; None si la tabla es grande (búsqueda paginada)."""
+        return fk_opciones.opciones(ref_table, ref_col)
 
 class FormCodec:
-    @staticmethod
-    def to_form(col: Column, val: Any) -> Any:
-        if val is None:
-            return ""
-        if col.data_type in ("datetime", "timestamp"):
-            s = str(val).replace(" ", "T")
-            return s[:16]
-        if col.data_type == "tinyint" and re.match(r"tinyint\(1\)", col.column_type or ""):
-            return bool(val)
-        return val
-
-    @staticmethod
-    def to_sql(col: Column, form: Dict[str, Any]) -> Any:
-        name = col.name
-        raw = form.get(name)
-
-        # checkbox
-        if col.data_type == "tinyint" and re.match(r"tinyint\(1\)", col.column_type or ""):
-            return 1 if form.get(name) in ("on", "1", "true", "True") else 0
+    """Conversión fila <-> form con los conversores precompilados por columna."""
+    def __init__(self, table: str):
+        self.cols = codec.tabla(table)
 
-        # vacíos
-        if raw in (None, ""):
-            return None if col.is_nullable else ""
+    def to_form(self, col: Column, val: Any) -> Any:
+        return self.cols[col.name].a_form(val)
 
-        if col.data_type in ("tinyint", "smallint", "mediumint", "int", "bigint"):
-            try:
-                return int(raw)
-            except:
-                return 0
-        if col.data_type in ("decimal", "float", "double"):
-            try:
-                return float(raw)
-            except:
-                return 0.0
-        if col.data_type in ("date", "datetime", "timestamp"):
-            if "T" in raw:
-                raw = raw.replace("T", " ") + ":00"
-            return raw
-        return raw
+    def to_sql(self, col: Column, form: Dict[str, Any]) -> Any:
+        return self.cols[col.name].a_sql(form)
 
 # =========================
 #  Vistas
@@ -230,17 +100,21 @@ def form():
         row = query_one(f"SELECT * FROM `{TABLE}` WHERE `{meta.pk}`=%s", (record_id,))
         if not row:
             abort(404, "Registro no encontrado.")
+        fc = FormCodec(TABLE)
         for c in meta.columns:
-            values[c.name] = FormCodec.to_form(c, row[c.name])
+            values[c.name] = fc.to_form(c, row[c.name])
 
     specs: Dict[str, Spec] = {c.name: meta.spec_for(c) for c in meta.columns}
 
     # Para columnas FK, las mostramos como select con opciones (id,label)
-    fk_options: Dict[str, List[Dict[str, Any]]] = {}
+    fk_options: Dict[str, List[Dict[str, Any]] | None] = {}
+    fk_actual: Dict[str, Dict[str, Any] | None] = {}
     for col_name, info in fkh.map.items():
         specs[col_name].kind = "select"
         specs[col_name].options = None
         fk_options[col_name] = fkh.options(info["ref_table"], info["ref_col"])
+        if fk_options[col_name] is None:
+            fk_actual[col_name] = fk_opciones.opcion(info["ref_table"], info["ref_col"], values.get(col_name))
 
     mode = "edit" if record_id else "create"
     return render_template(
@@ -254,6 +128,7 @@ def form():
         audit_cols=AUDIT_COLS,
         fks=fkh.map,
         fk_options=fk_options,
+        fk_actual=fk_actual,
     )
 
 @bp.post("/guardar")
@@ -265,7 +140,8 @@ def guardar():
     # Columnas editables (sin AI y sin auditoría)
     edit_cols: List[Column] = [c for c in meta.columns if (not c.is_ai) and (c.name not in AUDIT_COLS)]
     names = [c.name for c in edit_cols]
-    vals  = [FormCodec.to_sql(c, request.form) for c in edit_cols]
+    fc = FormCodec(TABLE)
+    vals  = [fc.to_sql(c, request.form) for c in edit_cols]
 
     try:
         if record_id and meta.pk:
@@ -278,6 +154,7 @@ def guardar():
                 f"UPDATE `{TABLE}` SET {sets} WHERE `{meta.pk}`=%s",
                 tuple(vals + [record_id]),
             )
+            al_confirmar(lambda: fk_opciones.invalidar(TABLE))
             flash("Orden de trabajo actualizada correctamente.", "success")
         else:
             insert_names = list(names)
@@ -293,6 +170,7 @@ def guardar():
                 f"INSERT INTO `{TABLE}` ({cols_sql}) VALUES ({ph})",
                 tuple(insert_vals)
             )
+            al_confirmar(lambda: fk_opciones.invalidar(TABLE))
             flash(f"Orden de trabajo creada correctamente (ID {new_id}).", "success")
 
     except Exception as e:
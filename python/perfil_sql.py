@@ -0,0 +1,67 @@
+# python/perfil_sql.py
+"""
+Perfil de SQL por request (activar con SQL_PERFIL=1).
+
+- Cada sentencia del request (texto normalizado, ms, filas) queda en g.
+- La respuesta lleva la cabecera  X-SQL: n=<sentencias>; ms=<total>
+- Si la misma sentencia normalizada corre más de SQL_N1_UMBRAL veces en un
+  request se registra una advertencia (patrón N+1).
+- /debug/sql (solo administrador) muestra los últimos requests perfilados.
+
+Desactivado no se registra nada: los cursores quedan sin envoltura.
+"""
+from __future__ import annotations
+import os
+import time
+from collections import Counter, deque
+
+from flask import Blueprint, current_app, g, has_request_context, render_template, request
+from flask_login import login_required
+
+from python.conexion import agregar_observador
+from python.authz import roles_required
+
+ACTIVO    = bool(int(os.getenv("SQL_PERFIL", "0")))
+N1_UMBRAL = int(os.getenv("SQL_N1_UMBRAL", "5"))
+
+_historial: deque = deque(maxlen=int(os.getenv("SQL_PERFIL_HISTORIAL", "50")))
+
+bp = Blueprint("perfil_sql", __name__, url_prefix="/debug")
+
+def _anotar(ev: dict) -> None:
+    if has_request_context():
+        g.setdefault("_sql_perfil", []).append(ev)
+
+def _resumir(response):
+    evs = g.get("_sql_perfil") or []
+    total_ms = sum(e["ms"] for e in evs)
+    response.headers["X-SQL"] = f"n={len(evs)}; ms={total_ms:.1f}"
+
+    repetidas = [(norm, n) for norm, n in Counter(e["norm"] for e in evs).most_common()
+                 if n > N1_UMBRAL]
+    for norm, n in repetidas:
+        current_app.logger.warning("Posible N+1 en %s: %d veces: %s", request.path, n, norm[:200])
+
+    if request.endpoint != "perfil_sql.panel":
+        _historial.appendleft({
+            "cuando": time.strftime("%H:%M:%S"),
+            "metodo": request.method, "ruta": request.full_path.rstrip("?"),
+            "status": response.status_code, "n": len(evs), "ms": total_ms,
+            "repetidas": repetidas,
+            "sentencias": [(e["norm"], e["ms"], e["filas"]) for e in evs],
+        })
+    return response
+
+@bp.get("/sql")
+@login_required
+@roles_required("administrador")
+def panel():
+    return render_template("debug_sql.html", historial=list(_historial), umbral=N1_UMBRAL)
+
+def init_app(app) -> None:
+    """Registra el perfil si SQL_PERFIL=1; si no, no toca nada."""
+    if not ACTIVO:
+        return
+    agregar_observador(_anotar)
+    app.after_request(_resumir)
+    app.register_blueprint(bp)
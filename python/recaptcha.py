@@ -0,0 +1,173 @@
+# python/recaptcha.py
+"""
+Verificación de reCAPTCHA contra siteverify con:
+
+- una sesión HTTP persistente (keep-alive, pool de conexiones) en vez de una
+  conexión nueva por login;
+- un plazo corto y configurable (RECAPTCHA_TIMEOUT) para no retener el hilo
+  del request si Google (o la red) está lenta;
+- un cortacircuitos: tras RECAPTCHA_FALLOS fallas seguidas no se llama al
+  servicio durante RECAPTCHA_PAUSA seg.; luego pasa una sola prueba;
+- modo diferido opcional (RECAPTCHA_ASYNC=1): iniciar() lanza la verificación
+  en un pool de hilos acotado y el login hace su consulta a la DB mientras
+  tanto; resultado() espera como máximo el plazo.
+
+RECAPTCHA_URL permite apuntar a un servidor local de prueba
+(python -m bench.recaptcha_stub).
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturoVencido
+
+import requests
+from requests.adapters import HTTPAdapter
+
+URL      = os.getenv("RECAPTCHA_URL", "https://www.google.com/recaptcha/api/siteverify")
+TIMEOUT  = float(os.getenv("RECAPTCHA_TIMEOUT", "2"))     # seg. de plazo total por verificación
+FALLOS   = int(os.getenv("RECAPTCHA_FALLOS", "5"))        # fallas seguidas que abren el circuito
+PAUSA    = float(os.getenv("RECAPTCHA_PAUSA", "30"))      # seg. con el circuito abierto
+CONEXIONES = int(os.getenv("RECAPTCHA_CONEXIONES", "10")) # keep-alive simultáneas
+ASYNC    = bool(int(os.getenv("RECAPTCHA_ASYNC", "0")))
+HILOS    = int(os.getenv("RECAPTCHA_HILOS", "8"))         # verificaciones en vuelo (modo diferido)
+
+# Resultados posibles
+OK = "ok"
+INVALIDO = "invalido"             # Google respondió: token inválido / vencido
+NO_DISPONIBLE = "no_disponible"   # red, plazo vencido, 5xx o circuito abierto
+
+# ---------- sesión HTTP ----------
+_sesion: requests.Session | None = None
+_sesion_lock = threading.Lock()
+
+def _http() -> requests.Session:
+    global _sesion
+    if _sesion is None:
+        with _sesion_lock:
+            if _sesion is None:
+                s = requests.Session()
+                ad = HTTPAdapter(pool_connections=1, pool_maxsize=CONEXIONES, max_retries=0)
+                s.mount("https://", ad)
+                s.mount("http://", ad)
+                _sesion = s
+    return _sesion
+
+# ---------- cortacircuitos ----------
+class _Circuito:
+    def __init__(self, fallos: int, pausa: float):
+        self.fallos_max = max(1, fallos)
+        self.pausa = pausa
+        self.seguidos = 0
+        self.abierto_hasta = 0.0
+        self.probando = False
+        self.aperturas = 0
+        self.rechazados = 0
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """¿Se puede llamar al servicio? Con el circuito vencido deja pasar UNA prueba."""
+        with self._lock:
+            if self.seguidos < self.fallos_max:
+                return True
+            if time.monotonic() >= self.abierto_hasta and not self.probando:
+                self.probando = True
+                return True
+            self.rechazados += 1
+            return False
+
+    def exito(self) -> None:
+        with self._lock:
+            self.seguidos = 0
+            self.probando = False
+
+    def falla(self) -> None:
+        with self._lock:
+            self.seguidos += 1
+            self.probando = False
+            if self.seguidos >= self.fallos_max:
+                if self.abierto_hasta <= time.monotonic():
+                    self.aperturas += 1
+                self.abierto_hasta = time.monotonic() + self.pausa
+
+    def estado(self) -> dict:
+        with self._lock:
+            abierto = self.seguidos >= self.fallos_max
+            return {"abierto": abierto, "fallos_seguidos": self.seguidos,
+                    "reabre_en": round(max(0.0, self.abierto_hasta - time.monotonic()), 1) if abierto else 0.0,
+                    "aperturas": self.aperturas, "rechazados": self.rechazados}
+
+_circuito = _Circuito(FALLOS, PAUSA)
+
+# ---------- verificación ----------
+def verificar(token: str, ip: str | None = None, secret: str | None = None) -> str:
+    """OK / INVALIDO / NO_DISPONIBLE. Nunca lanza excepción."""
+    secret = secret if secret is not None else os.getenv("RECAPTCHA_SECRET", "")
+    if not token or not secret:
+        return INVALIDO
+    if not _circuito.permitir():
+        return NO_DISPONIBLE
+    datos = {"secret": secret, "response": token}
+    if ip:
+        datos["remoteip"] = ip
+    try:
+        r = _http().post(URL, data=datos, timeout=TIMEOUT)
+        if r.status_code >= 500:
+            raise requests.HTTPError(f"siteverify respondió {r.status_code}")
+        ok = bool(r.json().get("success"))
+    except (requests.RequestException, ValueError):
+        _circuito.falla()
+        return NO_DISPONIBLE
+    _circuito.exito()
+    return OK if ok else INVALIDO
+
+# ---------- modo diferido ----------
+_pool: ThreadPoolExecutor | None = None
+_en_vuelo = threading.BoundedSemaphore(max(1, HILOS))
+
+def _ejecutor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _sesion_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=max(1, HILOS), thread_name_prefix="recaptcha")
+    return _pool
+
+def _hecho(valor: str) -> Future:
+    f: Future = Future()
+    f.set_result(valor)
+    return f
+
+def _verificar_y_liberar(token, ip, secret) -> str:
+    try:
+        return verificar(token, ip, secret)
+    finally:
+        _en_vuelo.release()
+
+def iniciar(token: str, ip: str | None = None) -> Future:
+    """
+    Lanza la verificación. Con RECAPTCHA_ASYNC=1 corre en el pool de hilos y
+    vuelve enseguida (si ya hay HILOS en vuelo: NO_DISPONIBLE, sin encolar);
+    si no, verifica aquí mismo y devuelve el resultado ya resuelto.
+    """
+    secret = os.getenv("RECAPTCHA_SECRET", "")
+    if not ASYNC:
+        return _hecho(verificar(token, ip, secret))
+    if not _en_vuelo.acquire(blocking=False):
+        return _hecho(NO_DISPONIBLE)
+    try:
+        return _ejecutor().submit(_verificar_y_liberar, token, ip, secret)
+    except RuntimeError:          # pool cerrado (apagado del proceso)
+        _en_vuelo.release()
+        return _hecho(NO_DISPONIBLE)
+
+def resultado(fut: Future) -> str:
+    """Espera el resultado de iniciar() como máximo RECAPTCHA_TIMEOUT seg."""
+    try:
+        return fut.result(timeout=TIMEOUT)
+    except FuturoVencido:
+        return NO_DISPONIBLE
+
+def estado() -> dict:
+    """Estado del cortacircuitos (diagnóstico)."""
+    return _circuito.estado()
@@ -1,8 +1,8 @@
 # python/registro.py
 from __future__ import annotations
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from werkzeug.security import generate_password_hash
 from mysql.connector import Error, InterfaceError, DatabaseError
+from python import hashing
 from python.conexion import get_conn   # conexión central a MariaDB
 
 bp = Blueprint("registro", __name__, url_prefix="/registro")
@@ -39,7 +39,11 @@ def crear():
         flash("La contraseña debe tener al menos 8 caracteres.", "warning")
         return redirect(url_for("registro.form"))
 
-    hash_password = generate_password_hash(pwd)
+    try:
+        hash_password = hashing.generar(pwd)
+    except hashing.HashOcupado:
+        flash("El servidor está ocupado. Intenta de nuevo en unos segundos.", "warning")
+        return redirect(url_for("registro.form"))
 
     # ---- Conexión central
     try:
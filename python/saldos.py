@@ -0,0 +1,145 @@
+# python/saldos.py
+"""
+Totales por orden de trabajo en la tabla resumen `orden_saldo`
+(subtotal de servicios / repuestos, pagado y saldo).
+
+- recalcular() se llama en la MISMA transacción que inserta/edita líneas de
+  detalle o abonos: un INSERT ... SELECT ... ON DUPLICATE KEY UPDATE que suma
+  solo las filas de esa orden (lecturas con bloqueo en InnoDB, así dos
+  transacciones concurrentes sobre la misma orden no se pisan).
+- leer() devuelve la fila resumen; si la orden es anterior a la tabla la
+  calcula en ese momento (relleno perezoso).
+"""
+from __future__ import annotations
+from decimal import Decimal
+from typing import Any, Dict
+
+from python.conexion import query_one, execute
+from python import esquema
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS orden_saldo (
+      id_orden            INT           NOT NULL PRIMARY KEY,
+      subtotal_servicios  DECIMAL(12,2) NOT NULL DEFAULT 0,
+      subtotal_repuestos  DECIMAL(12,2) NOT NULL DEFAULT 0,
+      subtotal            DECIMAL(12,2) NOT NULL DEFAULT 0,
+      pagado              DECIMAL(12,2) NOT NULL DEFAULT 0,
+      saldo               DECIMAL(12,2) NOT NULL DEFAULT 0,
+      actualizado_en      DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+      KEY ix_orden_saldo_saldo (saldo)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+_CERO = {"subtotal_servicios": Decimal("0"), "subtotal_repuestos": Decimal("0"),
+         "subtotal": Decimal("0"), "pagado": Decimal("0"), "saldo": Decimal("0")}
+
+_SQL: tuple = (None, None)     # (versión del esquema, sql); se reemplaza el par entero
+
+def asegurar_tabla() -> None:
+    """Crea orden_saldo si no existe (misma DDL que database/orden_saldo.sql)."""
+    execute(DDL)
+
+def _expr_linea(tabla: str) -> str:
+    """Importe de una línea según las columnas reales (cantidad*precio o subtotal)."""
+    cols = esquema.nombres(tabla)
+    precio = next((c for c in ("precio_unitario", "precio_unit") if c in cols), None)
+    if precio and "cantidad" in cols:
+        return f"COALESCE(cantidad,0)*COALESCE({precio},0)"
+    if "subtotal" in cols:
+        return "COALESCE(subtotal,0)"
+    return "0"
+
+def _sql_recalcular() -> str:
+    global _SQL
+    ver = esquema.version()
+    vigente, sql = _SQL
+    if vigente != ver:
+        sql = f"""
+            INSERT INTO orden_saldo
+              (id_orden, subtotal_servicios, subtotal_repuestos, subtotal, pagado, saldo)
+            SELECT %s, s.t, r.t, s.t + r.t, a.t, s.t + r.t - a.t
+            FROM (SELECT COALESCE(SUM({_expr_linea('detalle_servicio')}),0) AS t
+                  FROM detalle_servicio WHERE id_orden=%s) s,
+                 (SELECT COALESCE(SUM({_expr_linea('detalle_repuesto')}),0) AS t
+                  FROM detalle_repuesto WHERE id_orden=%s) r,
+                 (SELECT COALESCE(SUM(monto),0) AS t
+                  FROM abono WHERE id_orden=%s) a
+            ON DUPLICATE KEY UPDATE
+              subtotal_servicios=VALUES(subtotal_servicios),
+              subtotal_repuestos=VALUES(subtotal_repuestos),
+              subtotal=VALUES(subtotal), pagado=VALUES(pagado), saldo=VALUES(saldo)
+        """
+        _SQL = (ver, sql)
+    return sql
+
+def recalcular(id_orden: int, cur=None) -> None:
+    """
+    Recalcula la fila resumen de la orden. Con `cur` usa esa transacción;
+    sin él, la conexión del request (se confirma con el resto del request).
+    """
+    if not id_orden:
+        return
+    params = (id_orden,) * 4
+    if cur is not None:
+        cur.execute(_sql_recalcular(), params)
+    else:
+        execute(_sql_recalcular(), params)
+
+def _sql_varias(n: int | None) -> str:
+    """INSERT ... SELECT de los totales de TODAS las órdenes (n=None) o de n ids (IN)."""
+    en = f"IN ({', '.join(['%s'] * n)})" if n else None
+    sub = f"WHERE id_orden {en}" if en else ""
+    return f"""
+        INSERT INTO orden_saldo
+          (id_orden, subtotal_servicios, subtotal_repuestos, subtotal, pagado, saldo)
+        SELECT o.id_orden, COALESCE(s.t,0), COALESCE(r.t,0), COALESCE(s.t,0) + COALESCE(r.t,0),
+               COALESCE(a.t,0), COALESCE(s.t,0) + COALESCE(r.t,0) - COALESCE(a.t,0)
+        FROM orden_trabajo o
+        LEFT JOIN (SELECT id_orden, SUM({_expr_linea('detalle_servicio')}) AS t
+                   FROM detalle_servicio {sub} GROUP BY id_orden) s ON s.id_orden=o.id_orden
+        LEFT JOIN (SELECT id_orden, SUM({_expr_linea('detalle_repuesto')}) AS t
+                   FROM detalle_repuesto {sub} GROUP BY id_orden) r ON r.id_orden=o.id_orden
+        LEFT JOIN (SELECT id_orden, SUM(monto) AS t
+                   FROM abono {sub} GROUP BY id_orden) a ON a.id_orden=o.id_orden
+        {f"WHERE o.id_orden {en}" if en else ""}
+        ON DUPLICATE KEY UPDATE
+          subtotal_servicios=VALUES(subtotal_servicios),
+          subtotal_repuestos=VALUES(subtotal_repuestos),
+          subtotal=VALUES(subtotal), pagado=VALUES(pagado), saldo=VALUES(saldo)
+    """
+
+def reconstruir(cur) -> int:
+    """Recalcula TODAS las órdenes en una sola sentencia (cargas masivas, migraciones)."""
+    cur.execute(_sql_varias(None))
+    return cur.rowcount
+
+def recalcular_varias(ids: list, cur) -> None:
+    """Recalcula las órdenes `ids` en una sola sentencia, en la transacción de `cur`."""
+    if ids:
+        cur.execute(_sql_varias(len(ids)), tuple(ids) * 4)
+
+_SQL_LEER = """
+    SELECT subtotal_servicios, subtotal_repuestos, subtotal, pagado, saldo
+    FROM orden_saldo WHERE id_orden=%s
+"""
+
+def _fila(sql: str, id_orden: int, cur):
+    if cur is None:
+        return query_one(sql, (id_orden,))
+    cur.execute(sql, (id_orden,))
+    filas = cur.fetchall()          # consume todo: el cursor se reutiliza enseguida
+    return filas[0] if filas else None
+
+def leer(id_orden: int, cur=None, para_actualizar: bool = False) -> Dict[str, Any]:
+    """
+    {subtotal_servicios, subtotal_repuestos, subtotal, pagado, saldo} en Decimal.
+    `cur` debe ser un cursor de diccionario; para_actualizar agrega FOR UPDATE.
+    """
+    sql = _SQL_LEER + (" FOR UPDATE" if para_actualizar else "")
+    fila = _fila(sql, id_orden, cur)
+    if fila is None:
+        recalcular(id_orden, cur)
+        fila = _fila(sql, id_orden, cur)
+    if fila is None:
+        return dict(_CERO)
+    return {k: Decimal(str(v if v is not None else 0)) for k, v in fila.items()}
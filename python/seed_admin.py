@@ -1,6 +1,6 @@
 # python/seed_admin.py
-from werkzeug.security import generate_password_hash
 from mysql.connector import Error
+from python import hashing
 from python.conexion import get_conn
 
 def _ensure_role(cur, nombre: str) -> int:
@@ -19,7 +19,7 @@ def _ensure_user_admin(cur, login: str, email: str, plain_pwd: str) -> int:
         cur.execute("UPDATE usuario SET activo=1 WHERE id_usuario=%s", (row[0],))
         return row[0]
 
-    hash_pwd = generate_password_hash(plain_pwd)
+    hash_pwd = hashing.generar(plain_pwd)
     cur.execute(
         """
         INSERT INTO usuario (nombre_completo, usuario_login, email, hash_password, activo, mfa_habilitado)
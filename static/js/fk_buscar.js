@@ -0,0 +1,33 @@
+// Búsqueda paginada para selects de FK con tablas grandes.
+// Uso: <input data-fk-buscar="/fk/tabla/col" data-fk-select="id_del_select">
+document.querySelectorAll('[data-fk-buscar]').forEach(inp => {
+  const sel = document.getElementById(inp.dataset.fkSelect);
+  if (!sel) return;
+  const mas = document.createElement('button');
+  mas.type = 'button';
+  mas.className = 'btn btn-link btn-sm px-0 d-none';
+  mas.textContent = 'Cargar más…';
+  sel.after(mas);
+
+  let timer = null, ctrl = null, cursor = null;
+  async function cargar(append) {
+    if (ctrl) ctrl.abort();
+    ctrl = new AbortController();
+    const params = new URLSearchParams({q: inp.value.trim()});
+    if (append && cursor) params.set('despues', cursor);
+    try {
+      const r = await fetch(`${inp.dataset.fkBuscar}?${params}`, {signal: ctrl.signal, headers: {'Accept': 'application/json'}});
+      if (!r.ok) return;
+      const data = await r.json();
+      if (!append) {
+        sel.innerHTML = '';
+        sel.add(new Option(data.items.length ? '-- Selecciona --' : '-- Sin resultados --', ''));
+      }
+      data.items.forEach(o => sel.add(new Option(o.label, o.id)));
+      cursor = data.siguiente;
+      mas.classList.toggle('d-none', !cursor);
+    } catch (e) { /* abortada por una búsqueda más nueva */ }
+  }
+  inp.addEventListener('input', () => { clearTimeout(timer); timer = setTimeout(() => cargar(false), 250); });
+  mas.addEventListener('click', () => cargar(true));
+});